@@ -0,0 +1,207 @@
+"""
+Write-behind buffer for DeviceActivityLog audit rows
+
+IoT endpoints log every request (including failed authentication). Instead of
+an INSERT on the request path, entries are queued in-process and written by a
+background thread with bulk_create every N entries or M milliseconds.
+
+Settings:
+    DEVICE_ACTIVITY_LOG_MODE: 'buffered' (default) or 'sync' (write immediately,
+        useful for tests and management commands); read on every entry, so
+        override_settings applies to the process-wide buffer
+    DEVICE_ACTIVITY_LOG_BATCH_SIZE: Flush after this many queued entries (default 200)
+    DEVICE_ACTIVITY_LOG_FLUSH_MS: Flush at least this often (default 500)
+    DEVICE_ACTIVITY_LOG_QUEUE_SIZE: Maximum queued entries (default 10000)
+    DEVICE_ACTIVITY_LOG_OVERFLOW: What to do when the queue is full:
+        'drop_newest' (default), 'drop_oldest' or 'sync'
+
+Row timestamps are set when the batch is written, so they can lag the request
+by up to the flush interval.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'sync')
+
+
+class ActivityLogBuffer:
+    """Queue DeviceActivityLog entries and flush them in batches"""
+
+    def __init__(self, mode=None, batch_size=None, flush_interval_ms=None,
+                 max_queue=None, overflow_policy=None):
+        self._mode = mode
+        self.batch_size = batch_size or getattr(settings, 'DEVICE_ACTIVITY_LOG_BATCH_SIZE', 200)
+        self.flush_interval = (flush_interval_ms or getattr(settings, 'DEVICE_ACTIVITY_LOG_FLUSH_MS', 500)) / 1000.0
+        self.max_queue = max_queue or getattr(settings, 'DEVICE_ACTIVITY_LOG_QUEUE_SIZE', 10000)
+        self.overflow_policy = overflow_policy or getattr(settings, 'DEVICE_ACTIVITY_LOG_OVERFLOW', 'drop_newest')
+
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {self.overflow_policy}")
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def mode(self):
+        """'buffered' or 'sync' (DEVICE_ACTIVITY_LOG_MODE unless set on the buffer)"""
+        return self._mode or getattr(settings, 'DEVICE_ACTIVITY_LOG_MODE', 'buffered')
+
+    def log(self, **fields):
+        """
+        Record one activity log entry
+
+        Args:
+            **fields: DeviceActivityLog field values
+        """
+        if self.mode == 'sync':
+            self._write([fields])
+            return
+
+        self._ensure_started()
+
+        try:
+            self._queue.put_nowait(fields)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == 'sync':
+            self._write([fields])
+        elif self.overflow_policy == 'drop_oldest':
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(fields)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self.dropped += 1
+
+    def flush(self):
+        """Write everything currently queued"""
+        batch = self._drain()
+        while batch:
+            self._write(batch)
+            batch = self._drain()
+
+    def shutdown(self, timeout=5.0):
+        """Stop the flusher thread and write any remaining entries"""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        """Return buffer counters"""
+        return {
+            'mode': self.mode,
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+    def _ensure_started(self):
+        """Start the flusher thread (again after a fork)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # Entries inherited from the parent process belong to the parent
+                self._queue = queue.Queue(maxsize=self.max_queue)
+            self._stop.clear()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='device-activity-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Flusher loop: write a batch when full or when the interval elapses"""
+        try:
+            while not self._stop.is_set():
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                    if self._stop.is_set():
+                        break
+
+                if batch:
+                    close_old_connections()
+                    self._write(batch)
+        finally:
+            connection.close()
+
+    def _drain(self):
+        """Pull up to one batch of entries off the queue without blocking"""
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, entries):
+        """Insert a batch of entries with a single bulk_create"""
+        from .models_iot import DeviceActivityLog
+
+        try:
+            DeviceActivityLog.objects.bulk_create(
+                [DeviceActivityLog(**fields) for fields in entries],
+                batch_size=self.batch_size
+            )
+            self.written += len(entries)
+        except Exception as e:
+            self.failed += len(entries)
+            logger.error(f"Failed to write {len(entries)} device activity log entries: {str(e)}")
+
+
+# Process-wide buffer used by the IoT API views (created on first use)
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_activity_log_buffer():
+    """Return the process-wide buffer, configuring it from settings on first use"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ActivityLogBuffer()
+                atexit.register(_buffer.shutdown)
+    return _buffer
+
+
+def log_device_activity(**fields):
+    """Queue a DeviceActivityLog entry through the process-wide buffer"""
+    get_activity_log_buffer().log(**fields)
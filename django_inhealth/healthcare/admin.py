@@ -5,7 +5,7 @@ from .models import (
     Hospital, UserProfile, Patient, Department, Provider, Nurse, OfficeAdministrator, Encounter, VitalSign,
     Diagnosis, Prescription, Allergy, MedicalHistory, SocialHistory, FamilyHistory,
     Message, LabTest, Notification, InsuranceInformation, Billing, BillingItem, Payment, Device,
-    NotificationPreferences, VitalSignAlertResponse, AIProposedTreatmentPlan, DoctorTreatmentPlan, AuthenticationConfig
+    NotificationPreferences, VitalSignAlertResponse, AlertEvaluationJob, AlertTimingSpan, PendingDigestAlert, HourlyVitalRollup, DailyVitalRollup, VitalRollupCheckpoint, AIProposedTreatmentPlan, DoctorTreatmentPlan, AuthenticationConfig
 )
 
 
@@ -359,7 +359,7 @@ class NotificationPreferencesAdmin(admin.ModelAdmin):
 
 @admin.register(VitalSignAlertResponse)
 class VitalSignAlertResponseAdmin(admin.ModelAdmin):
-    list_display = ['alert_id', 'patient', 'alert_type', 'patient_response_status', 'auto_escalated', 'doctor_notified', 'nurse_notified', 'ems_notified', 'created_at']
+    list_display = ['alert_id', 'patient', 'alert_type', 'patient_response_status', 'occurrence_count', 'auto_escalated', 'doctor_notified', 'nurse_notified', 'ems_notified', 'created_at']
     list_filter = ['patient_response_status', 'alert_type', 'auto_escalated', 'doctor_notified', 'nurse_notified', 'ems_notified']
     search_fields = ['patient__first_name', 'patient__last_name', 'response_token']
     raw_id_fields = ['vital_sign', 'patient']
@@ -394,6 +394,46 @@ class VitalSignAlertResponseAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(AlertEvaluationJob)
+class AlertEvaluationJobAdmin(admin.ModelAdmin):
+    list_display = ['job_id', 'vital_sign', 'status', 'attempts', 'alert_triggered', 'enqueued_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'alert_triggered']
+    search_fields = ['dedupe_key', 'locked_by']
+    raw_id_fields = ['vital_sign']
+    readonly_fields = ['dedupe_key', 'received_at', 'enqueued_at', 'started_at', 'finished_at', 'locked_by', 'last_error']
+    date_hierarchy = 'enqueued_at'
+
+
+@admin.register(AlertTimingSpan)
+class AlertTimingSpanAdmin(admin.ModelAdmin):
+    list_display = ['span_id', 'vital_sign', 'alert_response', 'stage', 'channel', 'alert_type', 'duration_ms', 'success', 'started_at']
+    list_filter = ['stage', 'channel', 'alert_type', 'success']
+    raw_id_fields = ['vital_sign', 'alert_response']
+    date_hierarchy = 'started_at'
+
+
+@admin.register(HourlyVitalRollup)
+@admin.register(DailyVitalRollup)
+class VitalRollupAdmin(admin.ModelAdmin):
+    list_display = ['rollup_id', 'patient', 'period_start', 'reading_count', 'critical_count', 'last_recorded_at', 'updated_at']
+    raw_id_fields = ['patient']
+    date_hierarchy = 'period_start'
+
+
+@admin.register(VitalRollupCheckpoint)
+class VitalRollupCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_vital_signs_id', 'updated_at']
+
+
+@admin.register(PendingDigestAlert)
+class PendingDigestAlertAdmin(admin.ModelAdmin):
+    list_display = ['pending_id', 'user', 'patient_name', 'alert_type', 'summary', 'created_at']
+    list_filter = ['alert_type']
+    search_fields = ['user__username', 'patient_name']
+    raw_id_fields = ['user', 'patient']
+    date_hierarchy = 'created_at'
+
+
 @admin.register(AIProposedTreatmentPlan)
 class AIProposedTreatmentPlanAdmin(admin.ModelAdmin):
     list_display = ['proposal_id', 'patient', 'provider', 'status', 'ai_model_name', 'generation_time_seconds', 'created_at']
@@ -0,0 +1,352 @@
+"""
+Alert Fan-out Benchmark
+
+Support code for the benchmark_alert_fanout command, which measures how many
+vital alerts per second process_vital_alerts can handle and how long each
+channel takes to deliver, without contacting a real mail server or Twilio:
+
+    - SMTPSink is a local SMTP server that accepts and discards every message,
+      so email still goes through a real SMTP conversation
+    - StandInBackend replaces the notification dispatcher's backend; email goes
+      to the sink (or is simulated), SMS and WhatsApp are simulated by waiting
+      for a configurable per-channel latency in place of the Twilio API call
+    - synthetic patients, encounters and critical vital signs are created for
+      the run and deleted afterwards
+
+Run it against a development or staging database: the active nurse roster of
+the database is notified (through the stand-in backend) like for real alerts.
+"""
+import math
+import queue
+import socketserver
+import threading
+import time
+import uuid
+from datetime import date
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.smtp import EmailBackend
+from django.db import close_old_connections, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import alert_timing
+from .models import Encounter, Notification, Patient, Provider, VitalSign
+
+# Critical readings cycled through the synthetic vital signs (warning, critical, emergency)
+CRITICAL_READINGS = [
+    {'heart_rate': 125, 'blood_pressure_systolic': 165, 'blood_pressure_diastolic': 102},
+    {'heart_rate': 145, 'oxygen_saturation': 88, 'blood_pressure_systolic': 185, 'blood_pressure_diastolic': 118},
+    {'heart_rate': 185, 'oxygen_saturation': 82, 'blood_pressure_systolic': 215, 'blood_pressure_diastolic': 135},
+]
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP conversation: accept every command and message"""
+
+    def handle(self):
+        self.reply('220 inhealth-benchmark SMTP sink')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-inhealth-benchmark')
+                self.reply('250 8BITMIME')
+            elif command.startswith('DATA'):
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line.rstrip(b'\r\n') == b'.':
+                        break
+                self.server.sink.record_message()
+                self.reply('250 OK')
+            elif command.startswith('QUIT'):
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+    def reply(self, text):
+        self.wfile.write((text + '\r\n').encode('ascii'))
+
+
+class SMTPSink:
+    """Local SMTP server that accepts and discards messages"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = socketserver.ThreadingTCPServer((host, port), _SMTPSinkHandler)
+        self._server.daemon_threads = True
+        self._server.sink = self
+        self._thread = None
+        self._lock = threading.Lock()
+        self.host, self.port = self._server.server_address[:2]
+        self.messages = 0
+
+    def record_message(self):
+        with self._lock:
+            self.messages += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StandInBackend:
+    """Notification backend that never leaves the machine"""
+
+    def __init__(self, latency_ms=None, smtp_sink=None):
+        """
+        Args:
+            latency_ms: Simulated send time per channel, e.g. {'sms': 150}
+            smtp_sink: SMTPSink to send email to (None simulates email too)
+        """
+        self.latency_ms = latency_ms or {}
+        self.smtp_sink = smtp_sink
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.sent = {}
+
+    def send(self, message):
+        if message.channel == 'email' and self.smtp_sink is not None:
+            self._send_smtp(message)
+        else:
+            time.sleep(self.latency_ms.get(message.channel, 0) / 1000)
+
+        with self._lock:
+            self.sent[message.channel] = self.sent.get(message.channel, 0) + 1
+
+    def _send_smtp(self, message):
+        smtp = getattr(self._local, 'smtp', None)
+        if smtp is None:
+            smtp = EmailBackend(
+                host=self.smtp_sink.host, port=self.smtp_sink.port,
+                username='', password='', use_tls=False, use_ssl=False,
+                fail_silently=False
+            )
+            smtp.open()
+            self._local.smtp = smtp
+
+        email = EmailMultiAlternatives(
+            message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.to], connection=smtp
+        )
+        if message.html_body:
+            email.attach_alternative(message.html_body, 'text/html')
+        email.send(fail_silently=False)
+
+    def close(self):
+        smtp = getattr(self._local, 'smtp', None)
+        if smtp is not None:
+            smtp.close()
+            self._local.smtp = None
+
+
+def create_synthetic_data(alert_count, patient_count):
+    """
+    Create a doctor, patients, encounters and critical vital signs for a run
+
+    Returns:
+        tuple: (run_id, list of VitalSign ids in creation order)
+    """
+    run_id = uuid.uuid4().hex[:8]
+    now = timezone.now()
+
+    provider = Provider.objects.create(
+        first_name='Bench',
+        last_name=f'Doctor{run_id}',
+        specialty='Other',
+        npi=f'BENCH-{run_id}',
+        license_number=f'BENCH-{run_id}',
+        email=f'bench-doctor-{run_id}@example.invalid',
+        phone='555-010-0000'
+    )
+
+    patients = Patient.objects.bulk_create([
+        Patient(
+            first_name=f'Bench{run_id}',
+            last_name=f'Patient{index}',
+            date_of_birth=date(1960, 1, 1),
+            gender='U',
+            mrn=f'BENCH-{run_id}-{index}',
+            phone=f'555-020-{index:04d}',
+            address='1 Benchmark Way',
+            city='Testville',
+            state='TX',
+            zip_code='00000',
+            primary_doctor=provider,
+            created_at=now,
+            updated_at=now
+        )
+        for index in range(patient_count)
+    ])
+
+    encounters = Encounter.objects.bulk_create([
+        Encounter(
+            patient=patient,
+            provider=provider,
+            encounter_date=now,
+            encounter_type='Virtual',
+            status='In Progress',
+            chief_complaint='Alert fan-out benchmark',
+            created_at=now,
+            updated_at=now
+        )
+        for patient in patients
+    ])
+
+    vital_signs = VitalSign.objects.bulk_create([
+        VitalSign(
+            encounter=encounters[index % len(encounters)],
+            notes=f'Benchmark reading {run_id}',
+            **CRITICAL_READINGS[index % len(CRITICAL_READINGS)]
+        )
+        for index in range(alert_count)
+    ])
+
+    return run_id, [vital_sign.pk for vital_sign in vital_signs]
+
+
+def delete_synthetic_data(run_id):
+    """Delete everything a run created (alerts and digests cascade from the patients)"""
+    Notification.objects.filter(title__contains=f'Bench{run_id}').delete()
+    Patient.objects.filter(mrn__startswith=f'BENCH-{run_id}-').delete()
+    Provider.objects.filter(npi=f'BENCH-{run_id}').delete()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def evaluate_alert(vital_sign_id):
+    """
+    Run process_vital_alerts for one reading like an alert worker does
+
+    Returns:
+        tuple: (seconds, database queries, timing spans)
+    """
+    from .vital_alerts import process_vital_alerts
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        with alert_timing.trace(vital_sign_id, save=False) as timing:
+            vital_sign = VitalSign.objects.select_related(
+                'encounter__patient', 'encounter__provider__user'
+            ).get(pk=vital_sign_id)
+            process_vital_alerts(vital_sign)
+        elapsed = time.perf_counter() - start
+
+    return elapsed, len(queries), list(timing.spans)
+
+
+def run_benchmark(vital_sign_ids, rate=0, concurrency=1):
+    """
+    Drive process_vital_alerts over the readings at a target rate
+
+    Args:
+        vital_sign_ids: Readings to evaluate, in order
+        rate: Target alerts per second (0: as fast as the drivers allow)
+        concurrency: Driver threads evaluating alerts in parallel
+
+    Returns:
+        dict: wall_seconds, results [(seconds, queries, spans), ...] and errors
+    """
+    pending = queue.Queue(maxsize=concurrency * 2)
+    results = []
+    errors = []
+    lock = threading.Lock()
+
+    def drive():
+        try:
+            while True:
+                vital_sign_id = pending.get()
+                if vital_sign_id is None:
+                    return
+                try:
+                    result = evaluate_alert(vital_sign_id)
+                except Exception as e:
+                    with lock:
+                        errors.append(f"Vital sign {vital_sign_id}: {str(e)}")
+                    continue
+                with lock:
+                    results.append(result)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=drive, name=f'alert-benchmark-{index}', daemon=True)
+        for index in range(concurrency)
+    ]
+    close_old_connections()
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    for index, vital_sign_id in enumerate(vital_sign_ids):
+        if rate:
+            delay = start + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        pending.put(vital_sign_id)
+
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+
+    return {
+        'wall_seconds': time.perf_counter() - start,
+        'results': results,
+        'errors': errors,
+    }
+
+
+def summarize(run):
+    """
+    Throughput, latency percentiles and query counts for a benchmark run
+
+    Returns:
+        dict: alerts, alerts_per_second, alert latency percentiles (ms),
+              per-stage and per-channel percentiles (ms) and queries per alert
+    """
+    results = run['results']
+    alert_ms = [seconds * 1000 for seconds, _, _ in results]
+    query_counts = [queries for _, queries, _ in results]
+
+    by_series = {}
+    for _, _, spans in results:
+        for stage, channel, started_at, duration_ms, success in spans:
+            if stage == 'delivered':
+                by_series.setdefault(f'delivered {channel}', []).append(duration_ms)
+            elif stage in ('classify', 'create_alert', 'send'):
+                key = f'{stage} {channel}' if channel else stage
+                by_series.setdefault(key, []).append(duration_ms)
+
+    def percentiles(values):
+        return {f'p{pct}': percentile(values, pct) for pct in (50, 95, 99)}
+
+    return {
+        'alerts': len(results),
+        'errors': len(run['errors']),
+        'wall_seconds': run['wall_seconds'],
+        'alerts_per_second': len(results) / run['wall_seconds'] if run['wall_seconds'] else 0.0,
+        'alert_latency_ms': percentiles(alert_ms),
+        'series_ms': {key: dict(percentiles(values), count=len(values)) for key, values in sorted(by_series.items())},
+        'queries_per_alert': {
+            'mean': sum(query_counts) / len(query_counts) if query_counts else 0.0,
+            'max': max(query_counts) if query_counts else 0,
+        },
+    }
@@ -0,0 +1,197 @@
+"""
+Alert Digest Delivery
+
+Users with NotificationPreferences.digest_mode receive one summary message
+per digest window (digest_frequency_hours) instead of an email/SMS/WhatsApp
+message for every critical or warning alert:
+
+    - vital_alerts calls add_to_digest() for those users; the alert is stored
+      as a PendingDigestAlert row (dashboard notifications are still created)
+    - emergency alerts always bypass the digest and are sent immediately
+    - the send_alert_digests command (run from cron every few minutes) sends
+      each user whose window has elapsed a single message and deletes the rows;
+      users inside their quiet hours are skipped until the quiet hours end
+
+The window of a user starts at their oldest pending alert.
+"""
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import NotificationPreferences, PendingDigestAlert
+from .notification_dispatcher import dispatch_notifications, email_message, sms_message, whatsapp_message
+
+logger = logging.getLogger(__name__)
+
+
+def add_to_digest(user, prefs, patient, critical_vitals, alert_type):
+    """
+    Hold an alert for the user's digest instead of sending it now
+
+    Args:
+        user: Recipient User
+        prefs: The user's NotificationPreferences
+        patient: Patient the alert is about
+        critical_vitals: list of (vital_name, value, color, contact_level) tuples
+            or critical_vitals_json dicts
+        alert_type: 'emergency', 'critical' or 'warning'
+
+    Returns:
+        bool: True if the alert was added to the digest (do not send it individually)
+    """
+    if user is None or prefs is None or not prefs.uses_digest(alert_type):
+        return False
+
+    PendingDigestAlert.objects.create(
+        user=user,
+        patient=patient,
+        patient_name=patient.full_name,
+        alert_type=alert_type,
+        summary=summarize_vitals(critical_vitals)[:255]
+    )
+    return True
+
+
+def summarize_vitals(critical_vitals, limit=3):
+    """'Heart Rate: 135, SpO2: 88%' from vital tuples or critical_vitals_json dicts"""
+    parts = []
+    for vital in critical_vitals[:limit]:
+        if isinstance(vital, dict):
+            parts.append(f"{vital.get('vital_name')}: {vital.get('value')}")
+        else:
+            parts.append(f"{vital[0]}: {vital[1]}")
+    return ", ".join(parts)
+
+
+def due_digests(now=None):
+    """
+    Users whose digest window has elapsed and who are not in quiet hours
+
+    Returns:
+        list: (user_id, NotificationPreferences or None) tuples
+    """
+    now = now or timezone.now()
+
+    pending = {
+        row['user']: row['oldest']
+        for row in PendingDigestAlert.objects.values('user').annotate(oldest=Min('created_at'), count=Count('pk'))
+    }
+    if not pending:
+        return []
+
+    prefs_by_user = {
+        prefs.user_id: prefs
+        for prefs in NotificationPreferences.objects.filter(user_id__in=list(pending))
+    }
+
+    due = []
+    for user_id, oldest in pending.items():
+        prefs = prefs_by_user.get(user_id)
+        if prefs is not None and prefs.digest_mode:
+            window = timedelta(hours=max(prefs.digest_frequency_hours or 24, 1))
+            if now < oldest + window:
+                continue
+            if prefs.is_quiet_hours(now):
+                continue
+        # Users who turned digest mode off get what is left straight away
+        due.append((user_id, prefs))
+    return due
+
+
+def render_digest(alerts, window_hours):
+    """
+    Render pending alerts as one compact message
+
+    Returns:
+        tuple: (subject, full text for email/WhatsApp, short text for SMS)
+    """
+    by_patient = OrderedDict()
+    for alert in alerts:
+        by_patient.setdefault(alert.patient_name, []).append(alert)
+
+    critical = sum(1 for alert in alerts if alert.alert_type == 'critical')
+    warning = len(alerts) - critical
+
+    subject = f"InHealth alert digest: {len(alerts)} alerts for {len(by_patient)} patients"
+
+    lines = [
+        f"Alert digest for the last {window_hours} hours",
+        f"{len(alerts)} alerts ({critical} critical, {warning} warning) for {len(by_patient)} patients",
+        "",
+    ]
+    for patient_name, patient_alerts in by_patient.items():
+        latest = patient_alerts[-1]
+        counts = f"{len(patient_alerts)} alert{'s' if len(patient_alerts) != 1 else ''}"
+        lines.append(
+            f"- {patient_name}: {counts}; latest {timezone.localtime(latest.created_at):%b %d %H:%M} "
+            f"({latest.alert_type}) {latest.summary}"
+        )
+    lines += ["", "Sign in to InHealth to review the full readings."]
+
+    short = (
+        f"InHealth digest: {len(alerts)} alerts ({critical} critical, {warning} warning) "
+        f"for {len(by_patient)} patients. See your email or dashboard for details."
+    )
+    return subject, "\n".join(lines), short
+
+
+def digest_message(user, prefs, subject, text, short_text):
+    """Pick the user's channel for the digest: email, then WhatsApp, then SMS"""
+    from .vital_alerts import format_phone_number
+
+    email_enabled = prefs is None or prefs.email_enabled
+    if email_enabled and user.email:
+        return email_message(user.email, subject, body=text)
+
+    phone = getattr(getattr(user, 'profile', None), 'phone', None)
+    if prefs is not None and prefs.whatsapp_enabled and (prefs.whatsapp_number or phone):
+        return whatsapp_message(format_phone_number(prefs.whatsapp_number or phone), f"*{subject}*\n\n{text}")
+    if prefs is not None and prefs.sms_enabled and phone:
+        return sms_message(format_phone_number(phone), short_text)
+    return None
+
+
+def send_digest(user_id, prefs, now=None, dry_run=False):
+    """
+    Send and clear one user's pending alerts
+
+    Rows are locked with SKIP LOCKED, so two overlapping runs never send the
+    same alerts twice; they are deleted only after the message was sent.
+
+    Returns:
+        int: Number of alerts included in the digest (0 if nothing was sent)
+    """
+    from django.contrib.auth.models import User
+
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        alerts = list(
+            PendingDigestAlert.objects.select_for_update(skip_locked=True)
+            .filter(user_id=user_id, created_at__lte=now)
+            .order_by('created_at')
+        )
+        if not alerts:
+            return 0
+
+        user = User.objects.select_related('profile').get(pk=user_id)
+        window_hours = prefs.digest_frequency_hours if prefs is not None else 24
+        subject, text, short_text = render_digest(alerts, window_hours)
+        message = digest_message(user, prefs, subject, text, short_text)
+
+        if dry_run:
+            return len(alerts)
+
+        if message is None:
+            logger.warning(f"No digest channel for user {user_id}; dropping {len(alerts)} pending alerts")
+        elif not all(dispatch_notifications([message])):
+            logger.error(f"Failed to send alert digest to user {user_id}; will retry next run")
+            return 0
+
+        PendingDigestAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).delete()
+
+    return len(alerts) if message is not None else 0
@@ -0,0 +1,195 @@
+"""
+Vital Sign Alert Escalation Scheduler
+
+Every pending VitalSignAlertResponse carries an indexed escalation_deadline
+(created_at + timeout_minutes, cleared once the patient responds or the alert
+escalates). Finding due alerts is therefore an index range scan instead of
+loading every pending alert and checking it in Python.
+
+Due alerts are claimed one at a time with SELECT ... FOR UPDATE SKIP LOCKED,
+so several schedulers (or a scheduler and the cron command) can run at once
+without escalating an alert twice.
+
+EscalationScheduler (check_vital_alert_timeouts --daemon) keeps the upcoming
+deadlines in a heap and sleeps until the earliest one, re-reading them from
+the database every refresh interval to pick up new alerts, so alerts escalate
+within seconds of their timeout instead of at the next cron run.
+
+Settings:
+    ALERT_ESCALATION_RETRY_SECONDS: Delay before retrying an alert whose
+        escalation raised an error (default 60)
+"""
+import heapq
+import logging
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import VitalSignAlertResponse
+
+logger = logging.getLogger(__name__)
+
+
+def due_alerts(now=None):
+    """Pending alerts whose escalation deadline has passed, earliest first"""
+    return VitalSignAlertResponse.objects.filter(
+        escalation_deadline__lte=now or timezone.now(),
+        patient_response_status='pending',
+        auto_escalated=False
+    ).order_by('escalation_deadline')
+
+
+def upcoming_deadlines(limit=500):
+    """
+    The earliest escalation deadlines
+
+    Returns:
+        list: (deadline, alert_id) tuples, earliest first
+    """
+    return list(
+        VitalSignAlertResponse.objects.filter(
+            escalation_deadline__isnull=False,
+            patient_response_status='pending',
+            auto_escalated=False
+        ).order_by('escalation_deadline').values_list('escalation_deadline', 'alert_id')[:limit]
+    )
+
+
+def escalate_next_due(now=None):
+    """
+    Claim and escalate the earliest due alert not locked by another scheduler
+
+    Returns:
+        VitalSignAlertResponse that was escalated (or whose escalation failed
+        and was postponed), or None when nothing is due
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        alert = due_alerts(now).select_for_update(skip_locked=True).select_related('patient').first()
+        if alert is None:
+            return None
+
+        try:
+            # Savepoint so a failed escalation can still be postponed below
+            with transaction.atomic():
+                alert.auto_escalate()
+        except Exception as e:
+            retry_seconds = getattr(settings, 'ALERT_ESCALATION_RETRY_SECONDS', 60)
+            VitalSignAlertResponse.objects.filter(pk=alert.pk).update(
+                escalation_deadline=now + timezone.timedelta(seconds=retry_seconds)
+            )
+            logger.error(f"Error escalating alert {alert.alert_id}, retrying in {retry_seconds}s: {str(e)}")
+            alert.escalation_error = str(e)
+
+    return alert
+
+
+def escalate_due_alerts(now=None, limit=None):
+    """
+    Escalate every alert that is due
+
+    Args:
+        now: Reference time (default: now)
+        limit: Maximum number of alerts to handle
+
+    Returns:
+        tuple: (escalated alerts, alerts whose escalation failed)
+    """
+    escalated, failed = [], []
+    seen = set()
+
+    while limit is None or len(escalated) + len(failed) < limit:
+        alert = escalate_next_due(now)
+        if alert is None or alert.pk in seen:
+            break
+        seen.add(alert.pk)
+        (failed if hasattr(alert, 'escalation_error') else escalated).append(alert)
+
+    return escalated, failed
+
+
+class EscalationScheduler:
+    """Sleep until the next escalation deadline, then escalate due alerts"""
+
+    def __init__(self, refresh_interval=5.0, lookahead=500, on_escalated=None, locked_backoff=1.0):
+        """
+        Args:
+            refresh_interval: Longest sleep before re-reading deadlines (seconds)
+            lookahead: Number of upcoming deadlines kept in the heap
+            on_escalated: Optional callable(alert, error) called per handled alert
+            locked_backoff: Sleep when every due alert is locked by another
+                scheduler that is still sending it (seconds)
+        """
+        self.refresh_interval = refresh_interval
+        self.lookahead = lookahead
+        self.locked_backoff = locked_backoff
+        self.on_escalated = on_escalated
+        self.stopping = False
+        self.escalated = 0
+        self.failed = 0
+        self._heap = []
+        self._refreshed_at = 0.0
+
+    def stop(self, *args):
+        """Ask the scheduler to exit (usable as a signal handler)"""
+        self.stopping = True
+
+    def refresh(self):
+        """Reload the upcoming deadlines into the heap"""
+        self._heap = [(deadline.timestamp(), alert_id) for deadline, alert_id in upcoming_deadlines(self.lookahead)]
+        heapq.heapify(self._heap)
+        self._refreshed_at = time.monotonic()
+
+    def run(self):
+        """Escalate alerts as their deadlines pass until stop() is called"""
+        try:
+            while not self.stopping:
+                close_old_connections()
+
+                if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                    self.refresh()
+
+                if self._heap and self._heap[0][0] <= time.time():
+                    handled = self.escalate_due()
+                    # Deadlines may have moved (retries, responses); re-read them
+                    self.refresh()
+                    if not handled:
+                        # Due alerts are locked by another scheduler; back off
+                        # instead of re-querying until it has sent them
+                        self._sleep(self.locked_backoff)
+                    continue
+
+                self.sleep_until_next()
+        finally:
+            connection.close()
+
+    def escalate_due(self):
+        """Escalate the due alerts; returns the number handled (0 if all were locked)"""
+        escalated, failed = escalate_due_alerts()
+        self.escalated += len(escalated)
+        self.failed += len(failed)
+        if self.on_escalated:
+            for alert in escalated:
+                self.on_escalated(alert, None)
+            for alert in failed:
+                self.on_escalated(alert, alert.escalation_error)
+        return len(escalated) + len(failed)
+
+    def sleep_until_next(self):
+        """Sleep until the earliest deadline or the next refresh, whichever is sooner"""
+        wake_at = time.monotonic() + max(self.refresh_interval - (time.monotonic() - self._refreshed_at), 0)
+        if self._heap:
+            wake_at = min(wake_at, time.monotonic() + max(self._heap[0][0] - time.time(), 0))
+        self._sleep(wake_at - time.monotonic())
+
+    def _sleep(self, seconds):
+        """Sleep for up to `seconds`, waking early when stop() is called"""
+        wake_at = time.monotonic() + seconds
+        while not self.stopping:
+            remaining = wake_at - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.5))
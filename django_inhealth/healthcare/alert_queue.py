@@ -0,0 +1,287 @@
+"""
+Alert Evaluation Queue
+
+Device ingestion used to call process_vital_alerts (which sends email, SMS and
+WhatsApp) inside the device's request transaction, so a slow mail server held
+both the device and a database transaction open. Ingestion now inserts one
+AlertEvaluationJob per vital sign in the same transaction as the vital sign,
+and the run_alert_workers command evaluates them.
+
+Delivery is at-least-once:
+    - the job row commits atomically with the vital sign, so no reading is
+      left without an evaluation
+    - a job whose worker dies stays 'running' until its visibility timeout
+      passes, then another worker claims it again; a worker renews its claim
+      (renew_claim) just before running each job of a batch, so jobs waiting
+      behind slow sends are not reclaimed and notified twice
+    - the dedupe key (vital_sign:<id>) keeps one job per vital sign, and a
+      job whose vital sign already has a VitalSignAlertResponse is completed
+      without notifying anyone a second time
+
+Settings:
+    ALERT_EVALUATION_MODE: 'queue' (default) or 'sync' (evaluate in-process
+        from transaction.on_commit, after the vital sign is committed)
+    ALERT_JOB_MAX_ATTEMPTS: Attempts before a job is marked failed (default 5)
+    ALERT_JOB_RETRY_SECONDS: Base retry backoff, doubled per attempt (default 30)
+    ALERT_JOB_VISIBILITY_TIMEOUT: Seconds before a running job is reclaimed (default 300)
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from . import alert_timing
+from .models import AlertEvaluationJob, VitalSign, VitalSignAlertResponse
+
+logger = logging.getLogger(__name__)
+
+
+def get_mode():
+    """Return the configured alert evaluation mode"""
+    return getattr(settings, 'ALERT_EVALUATION_MODE', 'queue')
+
+
+def dedupe_key_for(vital_sign_id):
+    """Dedupe key for a vital sign's evaluation job"""
+    return f"vital_sign:{vital_sign_id}"
+
+
+def enqueue_alert_evaluations(vital_signs, received_at=None):
+    """
+    Queue alert evaluation for newly created vital signs
+
+    Call this inside the transaction that creates the vital signs. In 'queue'
+    mode the job rows commit (or roll back) together with the vital signs;
+    in 'sync' mode evaluation runs from transaction.on_commit.
+
+    Args:
+        vital_signs: Iterable of saved VitalSign objects
+        received_at: When the device request arrived (for latency timing)
+
+    Returns:
+        int: Number of evaluation jobs queued (0 in 'sync' mode)
+    """
+    vital_sign_ids = [vital_sign.pk for vital_sign in vital_signs]
+    if not vital_sign_ids:
+        return 0
+
+    if get_mode() == 'sync':
+        for vital_sign_id in vital_sign_ids:
+            transaction.on_commit(
+                lambda vital_sign_id=vital_sign_id: evaluate_vital_sign(vital_sign_id, received_at=received_at)
+            )
+        return 0
+
+    now = timezone.now()
+    AlertEvaluationJob.objects.bulk_create(
+        [
+            AlertEvaluationJob(
+                dedupe_key=dedupe_key_for(vital_sign_id),
+                vital_sign_id=vital_sign_id,
+                received_at=received_at,
+                enqueued_at=now,
+                available_at=now
+            )
+            for vital_sign_id in vital_sign_ids
+        ],
+        ignore_conflicts=True
+    )
+    return len(vital_sign_ids)
+
+
+def evaluate_vital_sign(vital_sign_id, received_at=None, job=None):
+    """
+    Run the alert pipeline for one vital sign
+
+    Checks the colour-coded vital bands (process_vital_alerts) and then the
+    patient/device-specific DeviceAlertRule thresholds. Stage timings are
+    recorded through alert_timing.
+
+    Args:
+        vital_sign_id: VitalSign primary key
+        received_at: When the device request arrived ('sync' mode)
+        job: The AlertEvaluationJob being run ('queue' mode)
+
+    Returns:
+        bool: True if an alert was raised (or had already been raised)
+    """
+    from .device_alert_rules import evaluate_device_rules
+    from .vital_alerts import process_vital_alerts
+
+    # A previous attempt may have finished the work before its worker died
+    if VitalSignAlertResponse.objects.filter(vital_sign_id=vital_sign_id).exists():
+        return True
+
+    if job is not None:
+        received_at = job.received_at
+
+    with alert_timing.trace(vital_sign_id, received_at) as timing:
+        if timing is not None:
+            if job is not None:
+                timing.record_queue(job.enqueued_at, job.started_at)
+            else:
+                timing.record_queue(timing.started_at)
+
+        try:
+            vital_sign = VitalSign.objects.select_related(
+                'encounter__patient', 'encounter__provider__user'
+            ).get(pk=vital_sign_id)
+        except VitalSign.DoesNotExist:
+            return False
+
+        alert_raised = process_vital_alerts(vital_sign) is not None
+        rule_matches = evaluate_device_rules(vital_sign)
+        return alert_raised or bool(rule_matches)
+
+
+def claim_jobs(worker_id, batch_size=10):
+    """
+    Claim up to batch_size runnable jobs for a worker
+
+    Pending jobs whose backoff has elapsed and running jobs whose visibility
+    timeout has passed are both claimable. Rows locked by another worker are
+    skipped rather than waited on.
+
+    Args:
+        worker_id: Identifier stored in locked_by
+        batch_size: Maximum jobs to claim
+
+    Returns:
+        list: Claimed AlertEvaluationJob objects
+    """
+    now = timezone.now()
+    visibility_timeout = getattr(settings, 'ALERT_JOB_VISIBILITY_TIMEOUT', 300)
+
+    with transaction.atomic():
+        jobs = list(
+            AlertEvaluationJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending', available_at__lte=now) |
+                Q(status='running', started_at__lt=now - timedelta(seconds=visibility_timeout))
+            ).order_by('available_at')[:batch_size]
+        )
+
+        if jobs:
+            AlertEvaluationJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status='running',
+                attempts=F('attempts') + 1,
+                started_at=now,
+                locked_by=worker_id
+            )
+            for job in jobs:
+                job.status = 'running'
+                job.attempts += 1
+                job.started_at = now
+                job.locked_by = worker_id
+
+    return jobs
+
+
+def renew_claim(job):
+    """
+    Restart a claimed job's visibility timeout just before running it
+
+    claim_jobs stamps one started_at for a whole batch; renewing per job keeps
+    later jobs in the batch from being reclaimed by another worker while
+    earlier ones are slow.
+
+    Args:
+        job: AlertEvaluationJob returned by claim_jobs
+
+    Returns:
+        bool: False if another worker has reclaimed the job (skip it)
+    """
+    now = timezone.now()
+    renewed = AlertEvaluationJob.objects.filter(
+        pk=job.pk,
+        status='running',
+        locked_by=job.locked_by,
+        attempts=job.attempts
+    ).update(started_at=now)
+    if not renewed:
+        logger.warning(f"Alert job {job.job_id} was reclaimed by another worker; skipping")
+        return False
+    job.started_at = now
+    return True
+
+
+def run_job(job):
+    """
+    Evaluate one claimed job and record the outcome
+
+    Args:
+        job: AlertEvaluationJob returned by claim_jobs
+
+    Returns:
+        bool: True if the job completed
+    """
+    try:
+        alert_triggered = evaluate_vital_sign(job.vital_sign_id, job=job)
+    except Exception as e:
+        max_attempts = getattr(settings, 'ALERT_JOB_MAX_ATTEMPTS', 5)
+        retry_seconds = getattr(settings, 'ALERT_JOB_RETRY_SECONDS', 30)
+
+        if job.attempts >= max_attempts:
+            status = 'failed'
+            available_at = job.available_at
+            logger.error(f"Alert job {job.job_id} failed permanently after {job.attempts} attempts: {str(e)}")
+        else:
+            status = 'pending'
+            available_at = timezone.now() + timedelta(seconds=retry_seconds * (2 ** (job.attempts - 1)))
+            logger.warning(f"Alert job {job.job_id} attempt {job.attempts} failed, retrying: {str(e)}")
+
+        AlertEvaluationJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=status,
+            available_at=available_at,
+            last_error=str(e)
+        )
+        return False
+
+    AlertEvaluationJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status='done',
+        finished_at=timezone.now(),
+        alert_triggered=alert_triggered,
+        last_error=''
+    )
+    return True
+
+
+def queue_stats(window_minutes=5):
+    """
+    Return queue depth and lag metrics
+
+    Args:
+        window_minutes: Window for the average lag of recently started jobs
+
+    Returns:
+        dict: Counts by status, age of the oldest runnable job (current lag)
+              and average enqueue-to-start lag over the window
+    """
+    now = timezone.now()
+
+    counts = AlertEvaluationJob.objects.aggregate(
+        pending=Count('pk', filter=Q(status='pending')),
+        running=Count('pk', filter=Q(status='running')),
+        failed=Count('pk', filter=Q(status='failed')),
+        oldest_pending=Min('enqueued_at', filter=Q(status='pending', available_at__lte=now)),
+    )
+
+    recent_lag = AlertEvaluationJob.objects.filter(
+        started_at__gte=now - timedelta(minutes=window_minutes)
+    ).aggregate(lag=Avg(F('started_at') - F('enqueued_at')))['lag']
+
+    oldest_pending = counts.pop('oldest_pending')
+    counts['queue_lag_seconds'] = (now - oldest_pending).total_seconds() if oldest_pending else 0.0
+    counts['avg_start_lag_seconds'] = recent_lag.total_seconds() if recent_lag else 0.0
+    return counts
+
+
+def purge_finished_jobs(days=7):
+    """Delete completed jobs older than the given number of days"""
+    deleted, _ = AlertEvaluationJob.objects.filter(
+        status='done',
+        finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
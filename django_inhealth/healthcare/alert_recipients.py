@@ -0,0 +1,164 @@
+"""
+Care Team Recipient Resolver
+
+Every vital alert fans out to the patient's doctor and nurses. Working out
+who they are used to cost a query for the nurses, a lazy query per user
+relation and a get-or-create query per user for NotificationPreferences -
+on every alert.
+
+The resolver keeps the roster (the doctor and the nurses with their users)
+per (patient, doctor) in process memory, and loads the team's
+NotificationPreferences fresh for every alert in one query (creating the
+missing ones in one bulk insert). A preference change - a doctor turning off
+SMS or starting quiet hours - therefore applies to the next alert in every
+process, including the run_alert_workers processes. Roster entries expire
+after ALERT_RECIPIENT_CACHE_TTL seconds so staff changes made by other
+processes are picked up, and signals drop them as soon as a nurse, provider
+or patient row changes in this process.
+"""
+import threading
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import NotificationPreferences
+
+DEFAULT_CACHE_TTL_SECONDS = 300
+
+# role: 'doctor' or 'nurse'; user and prefs are None for staff without an account
+Recipient = namedtuple('Recipient', 'role name user email phone whatsapp prefs')
+
+
+def _recipient(role, name, staff, prefs_by_user):
+    """Recipient for a Provider or Nurse with its preferences already loaded"""
+    user = staff.user
+    prefs = prefs_by_user.get(user.pk) if user is not None else None
+    email = (user.email if user is not None else None) or staff.email or None
+    phone = staff.phone or None
+    whatsapp = (prefs.whatsapp_number if prefs is not None else None) or phone
+    return Recipient(role, name, user, email, phone, whatsapp, prefs)
+
+
+def load_preferences(users):
+    """
+    NotificationPreferences for users, creating defaults for those without
+
+    Returns:
+        dict: user_id -> NotificationPreferences
+    """
+    user_ids = {user.pk for user in users}
+    if not user_ids:
+        return {}
+
+    prefs_by_user = {
+        prefs.user_id: prefs
+        for prefs in NotificationPreferences.objects.filter(user_id__in=user_ids)
+    }
+
+    missing = user_ids - set(prefs_by_user)
+    if missing:
+        # One INSERT for everyone missing; a concurrent creator wins silently
+        NotificationPreferences.objects.bulk_create(
+            [NotificationPreferences(user_id=user_id) for user_id in missing],
+            ignore_conflicts=True
+        )
+        prefs_by_user.update(
+            (prefs.user_id, prefs)
+            for prefs in NotificationPreferences.objects.filter(user_id__in=missing)
+        )
+
+    return prefs_by_user
+
+
+class RecipientResolver:
+    """Resolve and cache the care team notified about a patient's alerts"""
+
+    def __init__(self, ttl_seconds=None):
+        self._ttl_seconds = ttl_seconds
+        self._entries = {}  # (patient_id, provider_id) -> (recipients, cached_until)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl_seconds(self):
+        if self._ttl_seconds is None:
+            return getattr(settings, 'ALERT_RECIPIENT_CACHE_TTL', DEFAULT_CACHE_TTL_SECONDS)
+        return self._ttl_seconds
+
+    def resolve(self, patient, doctor):
+        """
+        Return the care team for a patient's alert
+
+        Args:
+            patient: Patient object
+            doctor: Provider treating the patient (the encounter's provider), or None
+
+        Returns:
+            tuple: Recipient entries with current preferences, the doctor first
+        """
+        key = (patient.pk, doctor.pk if doctor is not None else None)
+        now = timezone.now()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                self.hits += 1
+                roster = entry[0]
+            else:
+                self.misses += 1
+                roster = None
+
+        if roster is None:
+            roster = self._load_roster(patient, doctor)
+            if self.ttl_seconds > 0:
+                with self._lock:
+                    self._entries[key] = (roster, now + timedelta(seconds=self.ttl_seconds))
+
+        users = [staff.user for _, _, staff in roster if staff.user is not None]
+        prefs_by_user = load_preferences(users)
+        return tuple(_recipient(role, name, staff, prefs_by_user) for role, name, staff in roster)
+
+    def _load_roster(self, patient, doctor):
+        """(role, name, staff) for the doctor and the patient's active nurses"""
+        from .vital_alerts import get_active_nurses
+
+        roster = []
+        if doctor is not None:
+            roster.append(('doctor', doctor.get_full_name(), doctor))
+        roster += [('nurse', nurse.get_full_name(), nurse) for nurse in get_active_nurses(patient)]
+        return tuple(roster)
+
+    def invalidate_patient(self, patient_id):
+        """Drop cached care teams of one patient"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == patient_id]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all cached care teams"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return cache counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+
+# Process-wide resolver used by vital_alerts
+recipient_resolver = RecipientResolver()
+
+
+def invalidate_care_team(patient_id=None):
+    """Invalidate cached care teams of a patient (or of everyone when None)"""
+    if patient_id is None:
+        recipient_resolver.clear()
+    else:
+        recipient_resolver.invalidate_patient(patient_id)
@@ -0,0 +1,192 @@
+"""
+Vital Alert Storm Suppression
+
+A device reporting every 30 seconds for a deteriorating patient would
+otherwise open a new VitalSignAlertResponse and notify the whole care team on
+every reading. claim_alert() decides, per patient and per vital, whether a
+reading is news:
+
+    - a vital already in the patient's open alert at the same or a higher
+      severity (orange < red < blue), seen within the suppression window, is
+      folded into that alert: its value, count and last_seen are updated along
+      with the alert's occurrence_count - no new row, no notifications
+    - a vital that is new, more severe, or last seen before the window opens
+      a new alert that is notified as usual; it takes over the still-active
+      vitals of the previous open alert, which is marked 'superseded' so it
+      is not escalated separately. The new alert is at least as severe as
+      the vitals it carries and the alert it supersedes, and keeps that
+      alert's escalation deadline if it is earlier, so superseding never
+      downgrades or delays auto-escalation
+
+The decision and the creation of the new alert happen while the patient row
+is locked, so alert workers handling several readings for the same patient
+at once do not each notify.
+
+Settings:
+    ALERT_SUPPRESSION_WINDOW_MINUTES: Suppression window (default 30; 0 disables)
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Patient, VitalSignAlertResponse
+
+SEVERITY_RANK = {'orange': 1, 'red': 2, 'blue': 3}
+
+# Alert type for each severity, and the rank of each alert type
+ALERT_TYPES = {1: 'warning', 2: 'critical', 3: 'emergency'}
+ALERT_TYPE_RANK = {alert_type: rank for rank, alert_type in ALERT_TYPES.items()}
+
+
+def suppression_window():
+    """Suppression window as a timedelta (zero when disabled)"""
+    return timedelta(minutes=getattr(settings, 'ALERT_SUPPRESSION_WINDOW_MINUTES', 30))
+
+
+def critical_vitals_json(critical_vitals, now):
+    """JSON entries for critical vital tuples, with per-vital occurrence tracking"""
+    return [
+        {
+            'vital_name': vital[0],
+            'value': str(vital[1]),
+            'color': vital[2],
+            'contact_level': vital[3],
+            'count': 1,
+            'last_seen': now.isoformat(),
+        }
+        for vital in critical_vitals
+    ]
+
+
+def critical_vitals_from_json(entries):
+    """(vital_name, value, color, contact_level) tuples of an alert's critical_vitals_json, for the alert builders"""
+    return [
+        (entry.get('vital_name'), entry.get('value'), entry.get('color'), entry.get('contact_level'))
+        for entry in entries or [] if isinstance(entry, dict)
+    ]
+
+
+def _entry_is_current(entry, since):
+    last_seen = entry.get('last_seen')
+    if not last_seen:
+        return False
+    try:
+        return datetime.fromisoformat(last_seen) >= since
+    except ValueError:
+        return False
+
+
+def escalated_vitals(open_json, critical_vitals, since):
+    """
+    Vitals in this reading that are new, more severe, or stale in the open alert
+
+    Returns:
+        list: Names of vitals that warrant a notification
+    """
+    existing = {entry.get('vital_name'): entry for entry in open_json or [] if isinstance(entry, dict)}
+    escalated = []
+    for vital_name, value, color, contact_level in critical_vitals:
+        entry = existing.get(vital_name)
+        if (
+            entry is None
+            or not _entry_is_current(entry, since)
+            or SEVERITY_RANK.get(color, 0) > SEVERITY_RANK.get(entry.get('color'), 0)
+        ):
+            escalated.append(vital_name)
+    return escalated
+
+
+def fold_into(alert, critical_vitals, now):
+    """Record a repeat reading on an open alert (single UPDATE)"""
+    entries = {entry.get('vital_name'): entry for entry in alert.critical_vitals_json or [] if isinstance(entry, dict)}
+    for vital_name, value, color, contact_level in critical_vitals:
+        entry = entries.get(vital_name)
+        if entry is None:
+            continue
+        entry['value'] = str(value)
+        entry['count'] = entry.get('count', 1) + 1
+        entry['last_seen'] = now.isoformat()
+
+    alert.occurrence_count += 1
+    alert.last_occurrence_at = now
+    alert.save(update_fields=['critical_vitals_json', 'occurrence_count', 'last_occurrence_at'])
+
+
+def claim_alert(vital_sign, patient, critical_vitals, alert_type):
+    """
+    Fold a reading into the patient's open alert or open a new alert for it
+
+    Args:
+        vital_sign: VitalSign with critical values
+        patient: The vital sign's Patient
+        critical_vitals: list of (vital_name, value, color, contact_level)
+        alert_type: 'emergency', 'critical' or 'warning'
+
+    Returns:
+        tuple: (VitalSignAlertResponse, notify) - notify is False when the
+               reading was folded into an existing alert
+    """
+    now = timezone.now()
+    window = suppression_window()
+
+    with transaction.atomic():
+        # Serialise alert decisions for this patient across alert workers
+        Patient.objects.select_for_update().filter(pk=patient.pk).first()
+
+        open_alert = None
+        if window:
+            since = now - window
+            open_alert = VitalSignAlertResponse.objects.filter(
+                patient=patient,
+                last_occurrence_at__gte=since
+            ).exclude(patient_response_status='superseded').order_by('-last_occurrence_at').first()
+
+            if open_alert is not None and not escalated_vitals(open_alert.critical_vitals_json, critical_vitals, since):
+                fold_into(open_alert, critical_vitals, now)
+                return open_alert, False
+
+        vitals_json = critical_vitals_json(critical_vitals, now)
+        if open_alert is not None:
+            # Carry over vitals still active in the alert being superseded so
+            # their repeats keep folding into the new alert
+            new_names = {entry['vital_name'] for entry in vitals_json}
+            vitals_json += [
+                entry for entry in open_alert.critical_vitals_json or []
+                if isinstance(entry, dict) and entry.get('vital_name') not in new_names
+                and _entry_is_current(entry, since)
+            ]
+
+        escalation_deadline = None
+        if open_alert is not None:
+            # Never downgrade: the carried-over vitals and the pending alert
+            # being superseded keep their severity and deadline
+            ranks = [ALERT_TYPE_RANK.get(alert_type, 1)]
+            ranks += [SEVERITY_RANK.get(entry.get('color'), 0) for entry in vitals_json]
+            if open_alert.patient_response_status == 'pending':
+                ranks.append(ALERT_TYPE_RANK.get(open_alert.alert_type, 0))
+                escalation_deadline = open_alert.escalation_deadline
+            alert_type = ALERT_TYPES[max(ranks)]
+
+        timeout_minutes = 15  # Auto-call EMS if emergency and no response
+        deadline = now + timedelta(minutes=timeout_minutes)
+        if escalation_deadline is None or deadline < escalation_deadline:
+            escalation_deadline = deadline
+
+        alert_response = VitalSignAlertResponse.objects.create(
+            vital_sign=vital_sign,
+            patient=patient,
+            alert_type=alert_type,
+            critical_vitals_json=vitals_json,
+            patient_response_status='pending',
+            timeout_minutes=timeout_minutes,
+            escalation_deadline=escalation_deadline,
+            last_occurrence_at=now
+        )
+
+        if open_alert is not None and open_alert.patient_response_status == 'pending':
+            open_alert.patient_response_status = 'superseded'
+            open_alert.save(update_fields=['patient_response_status'])
+
+    return alert_response, True
@@ -0,0 +1,253 @@
+"""
+Alert Pipeline Timing
+
+Records how long each stage of the vital alert pipeline takes for a reading,
+so latency targets such as "p99 emergency alert delivered within 10s" can be
+measured and regressions caught:
+
+    ingest        device request received -> reading committed and queued
+    queue_wait    queued -> picked up by an alert worker
+    classify      get_critical_vitals
+    create_alert  suppression check and VitalSignAlertResponse insert
+    send          care team message handed to the dispatcher -> sent (per channel)
+    delivered     device request received -> care team message sent (per channel)
+
+alert_queue.evaluate_vital_sign opens a trace for the reading; the pipeline
+adds spans to it with span() and dispatch_care_team(). Spans are kept in
+memory and written to alert_timing_spans in one INSERT when the evaluation
+finishes. Readings that raise no alert (or are folded into an open alert)
+are not recorded. latency_histograms() aggregates the table for the
+alert latency metrics endpoint.
+
+Settings:
+    ALERT_TIMING_ENABLED: Record timing spans (default True)
+    ALERT_LATENCY_BUCKETS: Histogram bucket upper bounds in seconds
+    ALERT_TIMING_RETENTION_DAYS: Age after which purge_timing_spans deletes
+        spans (default 30)
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import AlertTimingSpan
+from .notification_dispatcher import dispatch_notifications
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+_local = threading.local()
+
+
+class AlertTrace:
+    """Timing spans collected while one reading goes through the pipeline"""
+
+    def __init__(self, vital_sign_id, received_at=None):
+        """
+        Args:
+            vital_sign_id: VitalSign being evaluated
+            received_at: When the device request arrived (None if unknown)
+        """
+        self.vital_sign_id = vital_sign_id
+        self.received_at = received_at
+        self.started_at = timezone.now()
+        self.alert_response = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @property
+    def origin(self):
+        """Start of the end-to-end 'delivered' spans"""
+        return self.received_at or self.started_at
+
+    def add(self, stage, started_at, seconds, channel='', success=True):
+        """Record a finished span (thread-safe; dispatcher workers call it)"""
+        with self._lock:
+            self.spans.append((stage, channel, started_at, max(seconds, 0.0) * 1000, success))
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block as a span"""
+        started_at = timezone.now()
+        start = time.perf_counter()
+        success = False
+        try:
+            yield
+            success = True
+        finally:
+            self.add(stage, started_at, time.perf_counter() - start, success=success)
+
+    def record_queue(self, queued_at, picked_up_at=None):
+        """
+        Record the ingest and queue wait spans
+
+        Args:
+            queued_at: When the evaluation was queued (job enqueued_at)
+            picked_up_at: When a worker claimed it (None when evaluated in-process)
+        """
+        if self.received_at is not None and queued_at is not None:
+            self.add('ingest', self.received_at, (queued_at - self.received_at).total_seconds())
+        if queued_at is not None and picked_up_at is not None:
+            self.add('queue_wait', queued_at, (picked_up_at - queued_at).total_seconds())
+
+    def save(self):
+        """Write the spans of a reading that raised an alert"""
+        if self.alert_response is None or not self.spans:
+            return 0
+
+        alert_type = self.alert_response.alert_type or ''
+        with self._lock:
+            spans = list(self.spans)
+
+        AlertTimingSpan.objects.bulk_create([
+            AlertTimingSpan(
+                vital_sign_id=self.vital_sign_id,
+                alert_response=self.alert_response,
+                stage=stage,
+                channel=channel,
+                alert_type=alert_type,
+                started_at=started_at,
+                duration_ms=duration_ms,
+                success=success
+            )
+            for stage, channel, started_at, duration_ms, success in spans
+        ])
+        return len(spans)
+
+
+def timing_enabled():
+    return getattr(settings, 'ALERT_TIMING_ENABLED', True)
+
+
+def current_trace():
+    """The trace of the reading being evaluated on this thread, or None"""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def trace(vital_sign_id, received_at=None, save=True):
+    """
+    Collect timing spans for one reading and save them afterwards
+
+    Args:
+        vital_sign_id: VitalSign being evaluated
+        received_at: When the device request arrived (None if unknown)
+        save: Write the spans to alert_timing_spans (False keeps them in
+            memory only, e.g. for benchmarks)
+
+    Yields:
+        AlertTrace, or None when timing is disabled
+    """
+    if save and not timing_enabled():
+        yield None
+        return
+
+    alert_trace = AlertTrace(vital_sign_id, received_at)
+    _local.trace = alert_trace
+    try:
+        yield alert_trace
+    finally:
+        _local.trace = None
+        if save:
+            try:
+                alert_trace.save()
+            except Exception as e:
+                # Timing must never break alerting
+                logger.error(f"Failed to save alert timing for vital sign {vital_sign_id}: {str(e)}")
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block on the current trace (no-op without one)"""
+    alert_trace = current_trace()
+    if alert_trace is None:
+        yield
+        return
+    with alert_trace.span(stage):
+        yield
+
+
+def record_alert(alert_response):
+    """Attach the alert raised for the current reading, so its spans are saved"""
+    alert_trace = current_trace()
+    if alert_trace is not None:
+        alert_trace.alert_response = alert_response
+
+
+def dispatch_care_team(messages, timeout=None):
+    """
+    dispatch_notifications, recording 'send' and 'delivered' spans per message
+
+    Without a current trace (e.g. escalations run by the scheduler) this is
+    plain dispatch_notifications.
+    """
+    alert_trace = current_trace()
+    if alert_trace is None:
+        return dispatch_notifications(messages, timeout=timeout)
+
+    started_at = timezone.now()
+    start = time.perf_counter()
+    lead_seconds = (started_at - alert_trace.origin).total_seconds()
+
+    def on_done(message, sent):
+        elapsed = time.perf_counter() - start
+        alert_trace.add('send', started_at, elapsed, channel=message.channel, success=sent)
+        alert_trace.add('delivered', alert_trace.origin, lead_seconds + elapsed, channel=message.channel, success=sent)
+
+    return dispatch_notifications(messages, timeout=timeout, on_done=on_done)
+
+
+def latency_buckets():
+    """Histogram bucket upper bounds in seconds, ascending"""
+    return tuple(sorted(getattr(settings, 'ALERT_LATENCY_BUCKETS', DEFAULT_LATENCY_BUCKETS)))
+
+
+def latency_histograms(since=None):
+    """
+    Aggregate recorded spans into cumulative histograms in one query
+
+    Args:
+        since: Only count spans started at or after this time (default: all)
+
+    Returns:
+        list: dicts with stage, channel, alert_type, count, sum_seconds and
+              buckets [(upper bound seconds, cumulative count), ...]
+    """
+    buckets = latency_buckets()
+
+    spans = AlertTimingSpan.objects.all()
+    if since is not None:
+        spans = spans.filter(started_at__gte=since)
+
+    rows = spans.values('stage', 'channel', 'alert_type').annotate(
+        count=Count('pk'),
+        total_ms=Sum('duration_ms'),
+        **{f'le_{index}': Count('pk', filter=Q(duration_ms__lte=bound * 1000)) for index, bound in enumerate(buckets)}
+    ).order_by('stage', 'channel', 'alert_type')
+
+    return [
+        {
+            'stage': row['stage'],
+            'channel': row['channel'],
+            'alert_type': row['alert_type'],
+            'count': row['count'],
+            'sum_seconds': (row['total_ms'] or 0.0) / 1000,
+            'buckets': [(bound, row[f'le_{index}']) for index, bound in enumerate(buckets)],
+        }
+        for row in rows
+    ]
+
+
+def purge_timing_spans(days=None):
+    """Delete timing spans older than the retention period"""
+    days = days if days is not None else getattr(settings, 'ALERT_TIMING_RETENTION_DAYS', 30)
+    deleted, _ = AlertTimingSpan.objects.filter(
+        started_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
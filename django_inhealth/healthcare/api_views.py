@@ -11,12 +11,16 @@ from rest_framework.permissions import AllowAny
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 from django.utils import timezone
 from django.db import transaction
+from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import logging
 
 from .models import Device, Patient, VitalSign
-from .models_iot import DeviceAPIKey, DeviceDataReading, DeviceActivityLog
+from .models_iot import DeviceAPIKey, DeviceDataReading
+from .iot_data_processor import IoTDataProcessor
+from .activity_log_buffer import log_device_activity
+from .iot_payloads import DEVICE_PARSER_CLASSES
 from .serializers import (
     VitalSignsDataSerializer, BulkVitalSignsSerializer,
     DeviceAuthSerializer, DeviceRegistrationSerializer,
@@ -79,6 +83,7 @@ class DeviceAPIView(APIView):
     """
     authentication_classes = []  # No standard authentication
     permission_classes = [AllowAny]  # Will check API key manually
+    parser_classes = DEVICE_PARSER_CLASSES  # JSON/MessagePack/CBOR, optionally gzip-compressed
 
     def get_device_from_api_key(self, request):
         """Extract and validate device from API key"""
@@ -92,9 +97,9 @@ class DeviceAPIView(APIView):
         return device, api_key_obj
 
     def log_activity(self, request, device, api_key, action_type, status_code, details=None, error_message=None):
-        """Log device API activity"""
+        """Log device API activity (written asynchronously in batches)"""
         try:
-            DeviceActivityLog.objects.create(
+            log_device_activity(
                 device=device,
                 api_key=api_key,
                 action_type=action_type,
@@ -310,7 +315,6 @@ class BulkPostVitalSignsView(DeviceAPIView):
     Submit multiple vital signs readings at once
     """
 
-    @transaction.atomic
     def post(self, request):
         # Authenticate device
         device, api_key_obj = self.get_device_from_api_key(request)
@@ -341,40 +345,42 @@ class BulkPostVitalSignsView(DeviceAPIView):
             )
 
         readings = serializer.validated_data['readings']
-        created_records = []
-
-        # Process each reading
-        for reading_data in readings:
-            vital_sign = VitalSign.objects.create(
-                patient=device.patient,
-                recorded_date=reading_data['timestamp'],
-                blood_pressure_systolic=reading_data.get('blood_pressure_systolic'),
-                blood_pressure_diastolic=reading_data.get('blood_pressure_diastolic'),
-                heart_rate=reading_data.get('heart_rate'),
-                temperature=reading_data.get('temperature'),
-                respiratory_rate=reading_data.get('respiratory_rate'),
-                oxygen_saturation=reading_data.get('oxygen_saturation'),
-                weight=reading_data.get('weight'),
-                height=reading_data.get('height')
-            )
 
-            created_records.append({
-                'vital_sign_id': vital_sign.vital_signs_id,
-                'timestamp': vital_sign.recorded_date.isoformat()
-            })
+        # Resolve encounter once and insert all readings with bulk_create
+        processor = IoTDataProcessor()
+        try:
+            results = processor.create_vital_signs_bulk(device, readings)
+        except ValidationError as e:
+            return self.standard_response(
+                False,
+                "Validation failed",
+                errors={'device': e.messages},
+                http_status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Update device
-        device.last_sync = timezone.now()
-        device.save(update_fields=['last_sync'])
+        created_records = [
+            {
+                'index': result['index'],
+                'vital_sign_id': result['vital_sign_id'],
+                'reading_id': result['reading_id'],
+                'timestamp': readings[result['index']]['timestamp'].isoformat()
+            }
+            for result in results['results'] if result['success']
+        ]
 
         # Log activity
         self.log_activity(request, device, api_key_obj, 'data_post', status.HTTP_201_CREATED,
-                        details={'count': len(created_records)})
+                        details={'count': len(created_records), 'failed': results['failed']})
 
         return self.standard_response(
             True,
             f"Successfully recorded {len(created_records)} vital signs readings",
-            data={'records': created_records, 'count': len(created_records)},
+            data={
+                'records': created_records,
+                'count': len(created_records),
+                'failed': results['failed'],
+                'results': results['results']
+            },
             http_status=status.HTTP_201_CREATED
         )
 
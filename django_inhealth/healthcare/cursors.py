@@ -0,0 +1,96 @@
+"""
+Opaque Cursors
+
+Encodes a position in an ordered listing, e.g. the (recorded_at,
+vital_signs_id) of the last reading a client has seen, as a URL-safe token.
+Clients pass the token back unchanged; it is not signed, so views must treat
+a decoded cursor as untrusted input like any other query parameter.
+"""
+import base64
+import binascii
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.utils.dateparse import parse_datetime
+
+
+def _is_finite(value):
+    """False for NaN / infinite floats and Decimals"""
+    if isinstance(value, Decimal):
+        return value.is_finite()
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return True
+
+
+def encode_cursor(*values):
+    """
+    Token for a position
+
+    Args:
+        values: Key values (str, int, float, Decimal, date or datetime)
+
+    Returns:
+        str: URL-safe token
+    """
+    data = [
+        value.isoformat() if isinstance(value, (datetime, date)) else str(value) if isinstance(value, Decimal) else value
+        for value in values
+    ]
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, types):
+    """
+    Position of a token
+
+    Args:
+        token: Token from encode_cursor()
+        types: Type of each value (datetime, int, float or str, or a
+            callable converting the JSON value)
+
+    Returns:
+        tuple: The values (never None, NaN or infinite)
+
+    Raises:
+        ValueError: The token is malformed, holds a null or non-finite
+            value, or does not match types
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, RecursionError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+
+    if not isinstance(data, list) or len(data) != len(types):
+        raise ValueError("Invalid cursor")
+
+    values = []
+    for value, value_type in zip(data, types):
+        if value is None or isinstance(value, bool):
+            raise ValueError("Invalid cursor")
+        if isinstance(value, str) and '\x00' in value:
+            # PostgreSQL text cannot hold NUL
+            raise ValueError("Invalid cursor")
+        if value_type is datetime:
+            moment = parse_datetime(value) if isinstance(value, str) else None
+            if moment is None:
+                raise ValueError("Invalid cursor")
+            values.append(moment)
+        elif value_type is int:
+            # Keys are database integers; anything wider cannot match a row
+            if not isinstance(value, int) or not -2 ** 63 <= value < 2 ** 63:
+                raise ValueError("Invalid cursor")
+            values.append(value)
+        else:
+            try:
+                converted = value_type(value)
+            except (TypeError, ValueError, ArithmeticError):
+                raise ValueError("Invalid cursor")
+            if not _is_finite(converted):
+                raise ValueError("Invalid cursor")
+            values.append(converted)
+    return tuple(values)
@@ -0,0 +1,306 @@
+"""
+Device Alert Rule Engine
+
+DeviceAlertRule rows let staff set per-patient or per-device thresholds
+(e.g. "heart_rate gt 120 for this patient"). The engine loads the active
+rules once, compiles each condition into a predicate and indexes them by
+(patient_id, device_id, metric_name), with None standing for "any". A reading
+is then checked only against the rules in its four buckets:
+
+    (patient, device, metric)  (patient, None, metric)
+    (None, device, metric)     (None, None, metric)
+
+so the cost per reading does not grow with the total number of rules.
+
+Reloading:
+    - post_save/post_delete of a DeviceAlertRule invalidates the index in the
+      current process (see signals.py)
+    - other processes (alert workers, other web workers) compare a cheap
+      fingerprint (row count and latest updated_at) at most every
+      DEVICE_ALERT_RULE_REFRESH_SECONDS (default 30) and reload when it changes
+
+Rules are evaluated by the alert workers together with the vital sign bands;
+see alert_queue.evaluate_vital_sign.
+"""
+import logging
+import operator
+import threading
+import time
+from collections import defaultdict, namedtuple
+from functools import partial
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .notification_dispatcher import dispatch_notifications, email_message
+from .vital_classifier import VITALS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SECONDS = 30
+
+# Each condition is compiled to partial(op, threshold), i.e. op(threshold, value),
+# so the comparison is written from the threshold's side: 'gt' means
+# value > threshold, which is threshold < value.
+CONDITION_OPERATORS = {
+    'gt': operator.lt,
+    'lt': operator.gt,
+    'eq': operator.eq,
+    'gte': operator.le,
+    'lte': operator.ge,
+}
+
+CompiledRule = namedtuple('CompiledRule', [
+    'rule_id', 'rule_name', 'patient_id', 'device_id', 'metric_name', 'condition',
+    'threshold_value', 'alert_level', 'alert_message', 'notify_patient',
+    'notify_provider', 'notification_email', 'predicate',
+])
+
+RuleMatch = namedtuple('RuleMatch', ['rule', 'metric_name', 'value'])
+
+
+def rule_predicate(condition, threshold_value):
+    """
+    Compile a rule condition into a one-argument predicate
+
+    Args:
+        condition: One of 'gt', 'lt', 'eq', 'gte', 'lte'
+        threshold_value: Rule threshold
+
+    Returns:
+        callable(value) -> bool, or None for an unknown condition
+    """
+    op = CONDITION_OPERATORS.get(condition)
+    if op is None:
+        return None
+    return partial(op, float(threshold_value))
+
+
+def compile_rule(rule):
+    """
+    Compile a DeviceAlertRule into a CompiledRule
+
+    Returns:
+        CompiledRule, or None if the condition is not recognised
+    """
+    predicate = rule_predicate(rule.condition, rule.threshold_value)
+    if predicate is None:
+        logger.warning(f"Skipping device alert rule {rule.pk}: unknown condition {rule.condition!r}")
+        return None
+
+    return CompiledRule(
+        rule_id=rule.pk,
+        rule_name=rule.rule_name,
+        patient_id=rule.patient_id,
+        device_id=rule.device_id,
+        metric_name=rule.metric_name,
+        condition=rule.condition,
+        threshold_value=rule.threshold_value,
+        alert_level=rule.alert_level,
+        alert_message=rule.alert_message,
+        notify_patient=rule.notify_patient,
+        notify_provider=rule.notify_provider,
+        notification_email=rule.notification_email,
+        predicate=predicate,
+    )
+
+
+class RuleIndex:
+    """Compiled rules bucketed by (patient_id, device_id, metric_name)"""
+
+    def __init__(self, compiled_rules):
+        self._buckets = defaultdict(list)
+        for rule in compiled_rules:
+            self._buckets[(rule.patient_id, rule.device_id, rule.metric_name)].append(rule)
+        self._buckets = dict(self._buckets)
+        self.metrics = frozenset(key[2] for key in self._buckets)
+        self.rule_count = sum(len(rules) for rules in self._buckets.values())
+
+    def rules_for(self, patient_id, device_id, metric_name):
+        """Rules that apply to one metric of one patient/device"""
+        buckets = self._buckets
+        rules = []
+        for key in (
+            (patient_id, device_id, metric_name),
+            (patient_id, None, metric_name),
+            (None, device_id, metric_name),
+            (None, None, metric_name),
+        ):
+            bucket = buckets.get(key)
+            if bucket:
+                rules.extend(bucket)
+        return rules
+
+    def match(self, patient_id, device_id, readings):
+        """
+        Evaluate a reading against the rules that apply to it
+
+        Args:
+            patient_id: Patient primary key
+            device_id: Device primary key (None for manual entries)
+            readings: dict of metric_name -> value (None values are skipped)
+
+        Returns:
+            list: RuleMatch tuples, one per rule that fired
+        """
+        matches = []
+        for metric_name, value in readings.items():
+            if value is None or metric_name not in self.metrics:
+                continue
+            value = float(value)
+            for rule in self.rules_for(patient_id, device_id, metric_name):
+                if rule.predicate(value):
+                    matches.append(RuleMatch(rule, metric_name, value))
+        return matches
+
+
+class DeviceAlertRuleEngine:
+    """Process-wide, lazily loaded and hot-reloaded RuleIndex"""
+
+    def __init__(self, refresh_seconds=None):
+        self._refresh_seconds = refresh_seconds
+        self._index = None
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    @property
+    def refresh_seconds(self):
+        if self._refresh_seconds is None:
+            return getattr(settings, 'DEVICE_ALERT_RULE_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)
+        return self._refresh_seconds
+
+    def invalidate(self):
+        """Drop the index; the next lookup reloads it"""
+        with self._lock:
+            self._index = None
+
+    def index(self):
+        """
+        Return the current RuleIndex, reloading it if rules have changed
+
+        Returns:
+            RuleIndex
+        """
+        now = time.monotonic()
+        index = self._index
+        if index is not None and now - self._checked_at < self.refresh_seconds:
+            return index
+
+        with self._lock:
+            if self._index is not None and now - self._checked_at < self.refresh_seconds:
+                return self._index
+
+            # Take the fingerprint before loading so a change made while
+            # loading is picked up on the next check
+            fingerprint = self._current_fingerprint()
+            if self._index is None or fingerprint != self._fingerprint:
+                self._index = self._load()
+                self._fingerprint = fingerprint
+                self.reloads += 1
+                logger.info(f"Loaded {self._index.rule_count} active device alert rules")
+            self._checked_at = now
+            return self._index
+
+    def _current_fingerprint(self):
+        from .models_iot import DeviceAlertRule
+
+        summary = DeviceAlertRule.objects.aggregate(count=Count('pk'), latest=Max('updated_at'))
+        return summary['count'], summary['latest']
+
+    def _load(self):
+        from .models_iot import DeviceAlertRule
+
+        compiled = (compile_rule(rule) for rule in DeviceAlertRule.objects.filter(is_active=True))
+        return RuleIndex([rule for rule in compiled if rule is not None])
+
+    def match(self, patient_id, device_id, readings):
+        """Evaluate readings (metric_name -> value) against the applicable rules"""
+        return self.index().match(patient_id, device_id, readings)
+
+    def match_vital_sign(self, vital_sign):
+        """
+        Evaluate every vital of a VitalSign against the applicable rules
+
+        Device-scoped rules apply to readings ingested from that device
+        (VitalSign.device); manual entries only match rules for any device.
+
+        Returns:
+            list: RuleMatch tuples
+        """
+        readings = {vital: getattr(vital_sign, vital, None) for vital in VITALS}
+        return self.match(
+            vital_sign.encounter.patient_id,
+            vital_sign.device_id,
+            readings
+        )
+
+
+device_rule_engine = DeviceAlertRuleEngine()
+
+
+def invalidate_device_alert_rules():
+    """Reload device alert rules on next use (called from signals)"""
+    device_rule_engine.invalidate()
+
+
+def notify_rule_matches(vital_sign, matches):
+    """
+    Send dashboard notifications and emails for fired device alert rules
+
+    Delivery failures are logged and do not stop the remaining notifications.
+
+    Args:
+        vital_sign: VitalSign the matches were found on
+        matches: list of RuleMatch tuples
+
+    Returns:
+        int: Number of notifications sent
+    """
+    from .vital_alerts import build_dashboard_notification, create_dashboard_notifications
+
+    patient = vital_sign.encounter.patient
+    provider = patient.primary_doctor or vital_sign.encounter.provider
+    sent = 0
+    notifications = []
+    outbound = []
+
+    for match in matches:
+        rule = match.rule
+        title = f"{rule.alert_level.title()} alert: {rule.rule_name}"
+        message = f"{rule.alert_message}\n\n{patient.full_name}: {match.metric_name} = {match.value:g}"
+
+        recipients = []
+        if rule.notify_provider and provider is not None and provider.user is not None:
+            recipients.append(provider.user)
+        if rule.notify_patient and patient.user is not None:
+            recipients.append(patient.user)
+
+        for user in recipients:
+            notifications.append(build_dashboard_notification(user, title, message, notification_type='alert'))
+
+        if rule.notification_email:
+            outbound.append(email_message(rule.notification_email, title, body=message))
+
+    # Dashboard notifications for all matched rules in one INSERT
+    try:
+        sent += len(create_dashboard_notifications(notifications))
+    except Exception as e:
+        logger.error(f"Error creating notifications for device alert rules on vital sign {vital_sign.pk}: {str(e)}")
+
+    sent += sum(1 for delivered in dispatch_notifications(outbound) if delivered)
+    return sent
+
+
+def evaluate_device_rules(vital_sign):
+    """
+    Check a vital sign against the device alert rules and notify on matches
+
+    Returns:
+        list: RuleMatch tuples that fired
+    """
+    matches = device_rule_engine.match_vital_sign(vital_sign)
+    if matches:
+        notify_rule_matches(vital_sign, matches)
+    return matches
@@ -9,6 +9,7 @@ from django.utils import timezone
 from django.db.models import Q, Count
 from .models import Device, Patient
 from .models_iot import DeviceAPIKey
+from .device_auth_cache import invalidate_device_api_key, get_cache_stats
 from .permissions import require_role
 from datetime import timedelta
 
@@ -67,9 +68,13 @@ def device_api_key_list(request):
         'expired_keys': expired_keys,
     }
 
+    # Verified-key cache counters for this worker process
+    auth_cache_stats = get_cache_stats()
+
     context = {
         'api_keys': api_keys,
         'stats': stats,
+        'auth_cache_stats': auth_cache_stats,
         'search_query': search_query,
         'status_filter': status_filter,
         'device_filter': device_filter,
@@ -216,6 +221,7 @@ def device_api_key_revoke(request, key_id):
     if request.method == 'POST':
         api_key.is_active = False
         api_key.save()
+        invalidate_device_api_key(api_key.id)
         messages.success(request, f'Device API Key "{api_key.key_name}" has been revoked.')
         return redirect('device_api_key_list')
 
@@ -235,7 +241,9 @@ def device_api_key_delete(request, key_id):
     if request.method == 'POST':
         key_name = api_key.key_name
         device_name = api_key.device.device_name
+        api_key_id = api_key.id
         api_key.delete()
+        invalidate_device_api_key(api_key_id)
         messages.success(request, f'Device API Key "{key_name}" for {device_name} has been permanently deleted.')
         return redirect('device_api_key_list')
 
@@ -274,6 +282,7 @@ def device_api_key_regenerate(request, key_id):
         # Deactivate old key
         old_api_key.is_active = False
         old_api_key.save()
+        invalidate_device_api_key(old_api_key.id)
 
         # Store the plain key in session temporarily for display
         request.session['new_device_api_key'] = plain_key
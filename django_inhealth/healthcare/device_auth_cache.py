@@ -0,0 +1,167 @@
+"""
+Verified Device API Key Cache
+
+Remembers recently verified device API keys so repeat requests from the same
+device skip the PBKDF2 check in DeviceAPIKey.verify_key.
+
+Entries are keyed by an HMAC-SHA256 digest of the presented key (the plain key
+is never stored) and are bound to the key row id and its stored hash. The key
+row is still loaded from the database on every request, so a key that is
+revoked, deactivated, regenerated or expired in another worker stops matching
+immediately; local invalidation only frees the memory early.
+"""
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class VerifiedKeyCache:
+    """Bounded, TTL-based cache of verified device API keys"""
+
+    def __init__(self, max_entries=None, ttl_seconds=None):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # digest -> (api_key_id, hashed_key, cached_until)
+        self._digests_by_key = {}      # api_key_id -> set of digests
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_entries(self):
+        if self._max_entries is None:
+            return getattr(settings, 'DEVICE_API_KEY_CACHE_SIZE', DEFAULT_MAX_ENTRIES)
+        return self._max_entries
+
+    @property
+    def ttl_seconds(self):
+        if self._ttl_seconds is None:
+            return getattr(settings, 'DEVICE_API_KEY_CACHE_TTL', DEFAULT_TTL_SECONDS)
+        return self._ttl_seconds
+
+    def _digest(self, presented_key):
+        """Fast keyed digest of the presented key"""
+        return hmac.new(
+            settings.SECRET_KEY.encode(),
+            presented_key.encode(),
+            hashlib.sha256
+        ).hexdigest()
+
+    def is_verified(self, api_key, presented_key):
+        """
+        Check whether this key was recently verified for this API key row
+
+        Args:
+            api_key: DeviceAPIKey instance loaded for the request
+            presented_key: Plain key from the Authorization header
+
+        Returns:
+            bool: True on a cache hit
+        """
+        if self.ttl_seconds <= 0:
+            return False
+
+        digest = self._digest(presented_key)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(digest)
+
+            if entry is not None:
+                api_key_id, hashed_key, cached_until = entry
+                if api_key_id == api_key.pk and hashed_key == api_key.hashed_key and now < cached_until:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return True
+
+                # Stale or bound to a different key row
+                self._remove(digest)
+
+            self.misses += 1
+            return False
+
+    def store(self, api_key, presented_key):
+        """Remember a key that just passed full verification"""
+        ttl = self.ttl_seconds
+        if ttl <= 0:
+            return
+
+        # Never cache past the key's own expiry
+        if api_key.expires_at:
+            from django.utils import timezone
+            remaining = (api_key.expires_at - timezone.now()).total_seconds()
+            ttl = min(ttl, remaining)
+            if ttl <= 0:
+                return
+
+        digest = self._digest(presented_key)
+        cached_until = time.monotonic() + ttl
+
+        with self._lock:
+            self._remove(digest)
+            self._entries[digest] = (api_key.pk, api_key.hashed_key, cached_until)
+            self._digests_by_key.setdefault(api_key.pk, set()).add(digest)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, api_key_id):
+        """Drop every cached verification for an API key row"""
+        with self._lock:
+            for digest in list(self._digests_by_key.get(api_key_id, ())):
+                self._remove(digest)
+            self._digests_by_key.pop(api_key_id, None)
+
+    def clear(self):
+        """Drop all cached verifications"""
+        with self._lock:
+            self._entries.clear()
+            self._digests_by_key.clear()
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _remove(self, digest):
+        """Remove one entry (caller holds the lock)"""
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            digests = self._digests_by_key.get(entry[0])
+            if digests is not None:
+                digests.discard(digest)
+                if not digests:
+                    del self._digests_by_key[entry[0]]
+
+
+# Process-wide cache used by DeviceAPIKey.verify_key
+verified_key_cache = VerifiedKeyCache()
+
+
+def invalidate_device_api_key(api_key_id):
+    """Invalidate cached verifications for a DeviceAPIKey id"""
+    verified_key_cache.invalidate(api_key_id)
+
+
+def get_cache_stats():
+    """Return verified-key cache counters"""
+    return verified_key_cache.stats()
@@ -0,0 +1,146 @@
+"""
+Remote Monitoring Encounter Resolver
+
+Device readings are attached to a 'Remote Monitoring' encounter that stays
+open for 24 hours from its encounter_date. Looking that encounter up used to
+cost a query per reading, and two readings arriving together for a patient
+with no open encounter could each create one.
+
+The resolver keeps the open encounter per (patient, device) in process memory
+until its 24-hour window closes (or IOT_ENCOUNTER_CACHE_TTL seconds pass, so
+changes made by other workers are picked up). On a miss, the patient row is
+locked with select_for_update before looking again and creating, so
+concurrent readings for one patient converge on a single encounter.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Encounter, Patient
+
+REMOTE_MONITORING_TYPE = 'Remote Monitoring'
+ENCOUNTER_WINDOW = timedelta(hours=24)
+DEFAULT_CACHE_TTL_SECONDS = 300
+
+
+class EncounterResolver:
+    """Resolve and cache the open remote-monitoring encounter for a device"""
+
+    def __init__(self, ttl_seconds=None):
+        self._ttl_seconds = ttl_seconds
+        self._entries = {}  # (patient_id, device_id) -> (encounter, cached_until)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+
+    @property
+    def ttl_seconds(self):
+        if self._ttl_seconds is None:
+            return getattr(settings, 'IOT_ENCOUNTER_CACHE_TTL', DEFAULT_CACHE_TTL_SECONDS)
+        return self._ttl_seconds
+
+    def resolve(self, patient, device, logger=None):
+        """
+        Return the open remote-monitoring encounter, creating it if needed
+
+        Args:
+            patient: Patient object
+            device: Device object
+            logger: Optional logger for encounter creation messages
+
+        Returns:
+            Encounter object
+        """
+        key = (patient.pk, device.pk)
+        now = timezone.now()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        encounter = self._find_open_encounter(patient, now)
+
+        if encounter is None:
+            with transaction.atomic():
+                # Serialize creation per patient; whoever waits sees the winner's row
+                Patient.objects.select_for_update().only('pk').get(pk=patient.pk)
+
+                encounter = self._find_open_encounter(patient, now)
+                if encounter is None:
+                    encounter = Encounter.objects.create(
+                        patient=patient,
+                        provider=patient.primary_doctor,  # Use patient's primary doctor
+                        encounter_date=now,
+                        encounter_type=REMOTE_MONITORING_TYPE,
+                        chief_complaint=f'Automated vital signs monitoring via {device.device_name}',
+                        status='In Progress',
+                        notes=f'Automated encounter for IoT device data collection from {device.device_name}'
+                    )
+                    self.created += 1
+
+                    if logger:
+                        logger.info(
+                            f"Created remote monitoring encounter {encounter.encounter_id} "
+                            f"for patient {patient.full_name}"
+                        )
+
+        cached_until = min(
+            encounter.encounter_date + ENCOUNTER_WINDOW,
+            now + timedelta(seconds=self.ttl_seconds)
+        )
+
+        if self.ttl_seconds > 0:
+            # A newly created encounter is only cached once the caller's
+            # transaction commits, so a rollback never leaves a dangling entry
+            transaction.on_commit(lambda: self._store(key, encounter, cached_until))
+
+        return encounter
+
+    def _store(self, key, encounter, cached_until):
+        with self._lock:
+            self._entries[key] = (encounter, cached_until)
+
+    def _find_open_encounter(self, patient, now):
+        """Most recent remote-monitoring encounter still inside its 24-hour window"""
+        return Encounter.objects.filter(
+            patient=patient,
+            encounter_type=REMOTE_MONITORING_TYPE,
+            encounter_date__gte=now - ENCOUNTER_WINDOW
+        ).order_by('-encounter_date').first()
+
+    def invalidate_encounter(self, encounter_id):
+        """Drop cached entries pointing at an encounter"""
+        with self._lock:
+            for key in [k for k, (encounter, _) in self._entries.items() if encounter.pk == encounter_id]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all cached encounters"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return cache counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'created': self.created,
+                'size': len(self._entries),
+            }
+
+
+# Process-wide resolver used by IoTDataProcessor
+encounter_resolver = EncounterResolver()
+
+
+def invalidate_remote_encounter(encounter_id):
+    """Invalidate cached lookups for an encounter id"""
+    encounter_resolver.invalidate_encounter(encounter_id)
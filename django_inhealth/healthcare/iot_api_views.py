@@ -2,16 +2,19 @@
 IoT Device REST API Views
 Endpoints for IoT devices to submit vital signs data
 """
-import json
+import gzip
 import logging
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from .models_iot import DeviceAPIKey, DeviceDataReading, DeviceActivityLog
+from django.conf import settings
+from .models_iot import DeviceAPIKey, DeviceDataReading
 from .models import Device
 from .iot_data_processor import IoTDataProcessor
+from .activity_log_buffer import log_device_activity
+from .iot_payloads import PayloadError, decode_request_payload
 from datetime import datetime
 import time
 
@@ -79,9 +82,9 @@ def authenticate_device(request):
 
 
 def log_api_activity(device, api_key, action_type, request, status_code, response_time_ms=None, error_message=None):
-    """Log API activity for auditing"""
+    """Log API activity for auditing (written asynchronously in batches)"""
     try:
-        DeviceActivityLog.objects.create(
+        log_device_activity(
             device=device,
             api_key=api_key,
             action_type=action_type,
@@ -107,7 +110,8 @@ def submit_vitals(request):
         POST /api/iot/vitals/
         Headers:
             Authorization: Bearer <api_key>
-            Content-Type: application/json
+            Content-Type: application/json (or application/msgpack, application/cbor)
+            Content-Encoding: gzip (optional)
         Body:
             {
                 "device_id": "DEV001",  // Device unique ID (string) or device_id (integer)
@@ -132,7 +136,8 @@ def submit_vitals(request):
             "success": true,
             "message": "Vital signs received successfully",
             "vital_sign_id": 123,
-            "alerts_triggered": 1
+            "alerts_triggered": 1,
+            "alerts_queued": 1
         }
     """
     start_time = time.time()
@@ -153,11 +158,18 @@ def submit_vitals(request):
         api_key = device_api_key
         device = device_api_key.device
 
-        # Parse request body
+        # Parse request body (JSON, MessagePack or CBOR, optionally gzip-compressed)
         try:
-            data = json.loads(request.body)
-        except json.JSONDecodeError:
-            error_msg = "Invalid JSON in request body"
+            data = decode_request_payload(request)
+        except PayloadError as e:
+            log_api_activity(device, api_key, 'error', request, e.status_code, error_message=e.message)
+            return JsonResponse({
+                'success': False,
+                'error': e.message
+            }, status=e.status_code)
+
+        if not isinstance(data, dict):
+            error_msg = "Request body must be an object"
             log_api_activity(device, api_key, 'error', request, 400, error_message=error_msg)
             return JsonResponse({
                 'success': False,
@@ -192,7 +204,7 @@ def submit_vitals(request):
             }, status=400)
 
         # Create vital sign record
-        vital_sign, alerts_triggered = processor.create_vital_sign_from_data(data)
+        vital_sign, alerts_queued = processor.create_vital_sign_from_data(data)
 
         # Calculate response time
         response_time_ms = int((time.time() - start_time) * 1000)
@@ -204,7 +216,8 @@ def submit_vitals(request):
             'success': True,
             'message': 'Vital signs received successfully',
             'vital_sign_id': vital_sign.vital_signs_id,
-            'alerts_triggered': alerts_triggered,
+            'alerts_triggered': alerts_queued,
+            'alerts_queued': alerts_queued,
             'timestamp': vital_sign.recorded_at.isoformat()
         }, status=200)
 
@@ -298,7 +311,8 @@ def submit_vitals_batch(request):
         POST /api/iot/vitals/batch/
         Headers:
             Authorization: Bearer <api_key>
-            Content-Type: application/json
+            Content-Type: application/json (or application/msgpack, application/cbor)
+            Content-Encoding: gzip (optional)
         Body:
             {
                 "device_id": "DEV001",
@@ -324,7 +338,13 @@ def submit_vitals_batch(request):
             "processed": 2,
             "failed": 0,
             "vitals_created": [123, 124],
-            "alerts_triggered": 1
+            "alerts_triggered": 1,
+            "alerts_queued": 1,
+            "errors": [],
+            "results": [
+                {"index": 0, "success": true, "vital_sign_id": 123, "reading_id": 456},
+                {"index": 1, "success": true, "vital_sign_id": 124, "reading_id": 457}
+            ]
         }
     """
     start_time = time.time()
@@ -341,16 +361,16 @@ def submit_vitals_batch(request):
 
         device = device_api_key.device
 
-        # Parse request body
+        # Parse request body (JSON, MessagePack or CBOR, optionally gzip-compressed)
         try:
-            data = json.loads(request.body)
-        except json.JSONDecodeError:
+            data = decode_request_payload(request)
+        except PayloadError as e:
             return JsonResponse({
                 'success': False,
-                'error': 'Invalid JSON in request body'
-            }, status=400)
+                'error': e.message
+            }, status=e.status_code)
 
-        readings = data.get('readings', [])
+        readings = data.get('readings', []) if isinstance(data, dict) else None
 
         if not readings or not isinstance(readings, list):
             return JsonResponse({
@@ -358,30 +378,25 @@ def submit_vitals_batch(request):
                 'error': 'No readings provided or invalid format'
             }, status=400)
 
-        # Process each reading
-        processor = IoTDataProcessor()
-        results = {
-            'total_readings': len(readings),
-            'processed': 0,
-            'failed': 0,
-            'vitals_created': [],
-            'alerts_triggered': 0,
-            'errors': []
-        }
+        max_readings = getattr(settings, 'IOT_BULK_MAX_READINGS', 2000)
+        if len(readings) > max_readings:
+            return JsonResponse({
+                'success': False,
+                'error': f'Too many readings in batch (maximum {max_readings})'
+            }, status=413)
 
-        for reading in readings:
-            # Add device_id to each reading
-            reading['device_id'] = device.device_id
+        # Process all readings in one set-based pass
+        processor = IoTDataProcessor()
 
-            try:
-                vital_sign, alerts = processor.create_vital_sign_from_data(reading)
-                results['processed'] += 1
-                results['vitals_created'].append(vital_sign.vital_signs_id)
-                results['alerts_triggered'] += alerts
-            except Exception as e:
-                results['failed'] += 1
-                results['errors'].append(str(e))
-                logger.error(f"Error processing reading in batch: {str(e)}")
+        try:
+            results = processor.create_vital_signs_bulk(device, readings)
+        except ValidationError as e:
+            error_msg = '; '.join(e.messages)
+            log_api_activity(device, device_api_key, 'error', request, 400, error_message=error_msg)
+            return JsonResponse({
+                'success': False,
+                'error': error_msg
+            }, status=400)
 
         # Log activity
         response_time_ms = int((time.time() - start_time) * 1000)
@@ -390,6 +405,7 @@ def submit_vitals_batch(request):
         return JsonResponse({
             'success': True,
             'message': 'Batch submitted successfully',
+            'alerts_triggered': results['alerts_queued'],
             **results
         }, status=200)
 
@@ -399,3 +415,143 @@ def submit_vitals_batch(request):
             'success': False,
             'error': 'Internal server error'
         }, status=500)
+
+
+def iter_stream_lines(stream, max_line_bytes):
+    """
+    Read a request body line by line without loading it into memory
+
+    Args:
+        stream: File-like object with readline (e.g. the Django request)
+        max_line_bytes: Longest accepted line
+
+    Yields:
+        bytes: Each line, or None for a line longer than max_line_bytes
+    """
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # Discard the rest of the oversized line
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield None
+            continue
+
+        yield line
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def submit_vitals_stream(request):
+    """
+    API endpoint for gateways to stream readings as newline-delimited JSON
+
+    The body is parsed one line at a time and readings are committed in
+    chunks, so uploads of any size use constant memory and a malformed line
+    only rejects that line.
+
+    Request:
+        POST /api/iot/vitals/stream/
+        Headers:
+            Authorization: Bearer <api_key>
+            Content-Type: application/x-ndjson
+            Content-Encoding: gzip (optional)
+        Body (one reading per line):
+            {"timestamp": "2025-11-17T10:30:00Z", "heart_rate": 75}
+            {"timestamp": "2025-11-17T10:31:00Z", "heart_rate": 77, "oxygen_saturation": 97}
+
+    Response:
+        {
+            "success": true,
+            "message": "Stream processed",
+            "total_lines": 2,
+            "processed": 2,
+            "failed": 0,
+            "chunks_committed": 1,
+            "alerts_triggered": 0,
+            "alerts_queued": 0,
+            "first_vital_sign_id": 123,
+            "last_vital_sign_id": 124,
+            "errors": [],
+            "errors_truncated": false,
+            "truncated": false
+        }
+
+    Failed lines are listed as {"line": <1-based line number>, "error": "..."}.
+    A body that cannot be read to the end (truncated gzip, client disconnect)
+    returns 400 with the same summary, truncated: true and an error; the
+    lines read before it are committed.
+    """
+    start_time = time.time()
+    device = None
+    device_api_key = None
+
+    try:
+        # Authenticate device
+        is_authenticated, device_api_key, error_message = authenticate_device(request)
+
+        if not is_authenticated:
+            log_api_activity(None, None, 'auth', request, 401, error_message=error_message)
+            return JsonResponse({
+                'success': False,
+                'error': error_message
+            }, status=401)
+
+        device = device_api_key.device
+
+        processor = IoTDataProcessor()
+        max_line_bytes = getattr(settings, 'IOT_STREAM_MAX_LINE_BYTES', 65536)
+
+        content_encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if content_encoding in ('gzip', 'x-gzip'):
+            # Decompressed incrementally; only one line is held in memory at a time
+            stream = gzip.GzipFile(fileobj=request, mode='rb')
+        elif content_encoding in ('', 'identity'):
+            stream = request
+        else:
+            error_msg = f"Unsupported Content-Encoding: {content_encoding}"
+            log_api_activity(device, device_api_key, 'error', request, 415, error_message=error_msg)
+            return JsonResponse({
+                'success': False,
+                'error': error_msg
+            }, status=415)
+
+        try:
+            summary = processor.ingest_ndjson_stream(device, iter_stream_lines(stream, max_line_bytes))
+        except ValidationError as e:
+            error_msg = '; '.join(e.messages)
+            log_api_activity(device, device_api_key, 'error', request, 400, error_message=error_msg)
+            return JsonResponse({
+                'success': False,
+                'error': error_msg
+            }, status=400)
+
+        if summary['truncated']:
+            # Earlier chunks are committed: report them so the gateway resumes after them
+            log_api_activity(device, device_api_key, 'error', request, 400, error_message=summary['error'])
+            return JsonResponse({
+                'success': False,
+                **summary
+            }, status=400)
+
+        # Log activity
+        response_time_ms = int((time.time() - start_time) * 1000)
+        log_api_activity(device, device_api_key, 'data_post', request, 200, response_time_ms)
+
+        return JsonResponse({
+            'success': summary['processed'] > 0 or summary['total_lines'] == 0,
+            'message': 'Stream processed',
+            'alerts_triggered': summary['alerts_queued'],
+            **summary
+        }, status=200)
+
+    except Exception as e:
+        logger.exception("Error processing streamed vital signs submission")
+        log_api_activity(device, device_api_key, 'error', request, 500, error_message=str(e))
+        return JsonResponse({
+            'success': False,
+            'error': 'Internal server error'
+        }, status=500)
@@ -4,63 +4,294 @@ Handles processing of IoT device vital signs data from JSON files
 Integrates with existing vital signs and alert systems
 """
 import json
+import math
 import os
 import shutil
+import socket
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db import transaction
+from django.db import DatabaseError, connections, transaction
 from django.core.exceptions import ValidationError
-from .models import Device, Patient, Encounter, VitalSign, Provider
-from .vital_alerts import process_vital_alerts
+from .models import Device, Patient, VitalSign, Provider
+from .models_iot import DeviceDataReading
+from .encounter_resolver import encounter_resolver
+from .alert_queue import enqueue_alert_evaluations
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Measurement fields accepted from device payloads
+VITAL_FIELDS = [
+    'heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic',
+    'temperature', 'respiratory_rate', 'oxygen_saturation', 'glucose'
+]
+
+# Payload fields that must be numeric when present
+INTEGER_FIELDS = ['heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'respiratory_rate']
+DECIMAL_FIELDS = ['temperature', 'oxygen_saturation', 'glucose', 'weight']
+
+# Range of the integer vital columns
+INTEGER_MIN = -2147483648
+INTEGER_MAX = 2147483647
+
+# Default number of rows per INSERT for bulk ingestion
+DEFAULT_BULK_CHUNK_SIZE = 500
+
+
+def new_stats():
+    """Empty processing statistics"""
+    return {
+        'total_files': 0,
+        'processed': 0,
+        'failed': 0,
+        'skipped': 0,
+        'recovered': 0,
+        'vitals_created': 0,
+        'alerts_queued': 0,
+        'errors': []
+    }
+
+
+def merge_stats(stats, other):
+    """Add the counters from one worker's statistics into stats"""
+    for key in ('processed', 'failed', 'skipped', 'vitals_created', 'alerts_queued'):
+        stats[key] += other.get(key, 0)
+    stats['errors'].extend(other.get('errors', []))
+    return stats
+
+
+def _init_worker_process():
+    """Make sure Django is configured in a freshly started worker process"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _process_batch_in_worker(inbox_dir, archive_dir, processing_dir, filenames):
+    """Entry point for worker processes in process_all_pending_files"""
+    processor = IoTDataProcessor(inbox_dir=inbox_dir, archive_dir=archive_dir, processing_dir=processing_dir)
+    try:
+        return processor.process_claimed_batch(filenames)
+    finally:
+        connections.close_all()
+
 
 class IoTDataProcessor:
     """Process IoT device data from JSON files"""
 
-    def __init__(self, inbox_dir=None, archive_dir=None):
+    def __init__(self, inbox_dir=None, archive_dir=None, processing_dir=None):
         """
         Initialize the IoT data processor
 
         Args:
             inbox_dir: Directory where IoT devices upload JSON files
             archive_dir: Directory where processed files are archived
+            processing_dir: Directory where workers keep claimed files
+                (must be on the same filesystem as inbox_dir)
         """
         from django.conf import settings
 
         self.inbox_dir = inbox_dir or getattr(settings, 'IOT_INBOX_DIR', '/var/iot_data/inbox')
         self.archive_dir = archive_dir or getattr(settings, 'IOT_ARCHIVE_DIR', '/var/iot_data/archive')
+        self.processing_dir = processing_dir or getattr(
+            settings, 'IOT_PROCESSING_DIR', os.path.join(self.inbox_dir, 'processing')
+        )
+        self.stale_claim_seconds = getattr(settings, 'IOT_PROCESSING_STALE_SECONDS', 3600)
 
         # Create directories if they don't exist
         os.makedirs(self.inbox_dir, exist_ok=True)
         os.makedirs(self.archive_dir, exist_ok=True)
+        os.makedirs(self.processing_dir, exist_ok=True)
+
+    def list_pending_files(self):
+        """
+        List JSON files waiting in the inbox
+
+        Returns:
+            list: File names (not paths), oldest first
+        """
+        with os.scandir(self.inbox_dir) as entries:
+            files = [
+                (entry.stat().st_mtime, entry.name)
+                for entry in entries
+                if entry.name.endswith('.json') and entry.is_file()
+            ]
+        return [name for _, name in sorted(files)]
+
+    def worker_claim_dir(self):
+        """Per-process claim directory: processing/<hostname>_<pid>"""
+        worker_dir = os.path.join(self.processing_dir, f"{socket.gethostname()}_{os.getpid()}")
+        os.makedirs(worker_dir, exist_ok=True)
+        return worker_dir
+
+    def claim_file(self, filename, worker_dir):
+        """
+        Atomically claim an inbox file by renaming it into a worker directory
+
+        Args:
+            filename: File name in the inbox
+            worker_dir: This worker's claim directory
+
+        Returns:
+            str: Path of the claimed file, or None if another worker got it first
+        """
+        claimed_path = os.path.join(worker_dir, filename)
+        try:
+            os.rename(os.path.join(self.inbox_dir, filename), claimed_path)
+        except FileNotFoundError:
+            return None
+        return claimed_path
+
+    def release_file(self, claimed_path):
+        """Return a claimed file to the inbox so a later run retries it"""
+        filename = os.path.basename(claimed_path)
+        try:
+            os.rename(claimed_path, os.path.join(self.inbox_dir, filename))
+        except FileNotFoundError:
+            pass
 
-    def process_all_pending_files(self):
+    def recover_stale_claims(self):
+        """
+        Move files left in claim directories by crashed workers back to the inbox
+
+        A claim directory is stale when its process is no longer running on
+        this host, or (for other hosts sharing the inbox) when nothing in it
+        has changed for IOT_PROCESSING_STALE_SECONDS.
+
+        Returns:
+            int: Number of files recovered
+        """
+        recovered = 0
+        hostname = socket.gethostname()
+        now = time.time()
+
+        with os.scandir(self.processing_dir) as entries:
+            worker_dirs = [entry for entry in entries if entry.is_dir()]
+
+        for entry in worker_dirs:
+            owner_host, _, owner_pid = entry.name.rpartition('_')
+
+            if owner_host == hostname and owner_pid.isdigit():
+                if int(owner_pid) == os.getpid() or self._pid_alive(int(owner_pid)):
+                    continue
+            elif now - entry.stat().st_mtime < self.stale_claim_seconds:
+                continue
+
+            for filename in os.listdir(entry.path):
+                if not filename.endswith('.json'):
+                    continue
+                target = os.path.join(self.inbox_dir, filename)
+                if os.path.exists(target):
+                    continue
+                try:
+                    os.rename(os.path.join(entry.path, filename), target)
+                    recovered += 1
+                except FileNotFoundError:
+                    continue
+
+            try:
+                os.rmdir(entry.path)
+            except OSError:
+                pass
+
+        if recovered:
+            logger.warning(f"Recovered {recovered} IoT data files from interrupted workers")
+
+        return recovered
+
+    @staticmethod
+    def _pid_alive(pid):
+        """Check whether a process id is running on this host"""
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def process_all_pending_files(self, workers=1, batch_size=100):
         """
         Process all JSON files in the inbox directory
 
+        Files are claimed by renaming them into a per-worker processing
+        directory before they are read, so overlapping runs never ingest the
+        same file twice.
+
+        Args:
+            workers: Number of worker processes (1 = process in this process)
+            batch_size: Files handed to a worker process at a time
+
         Returns:
             dict: Processing statistics
         """
-        stats = {
-            'total_files': 0,
-            'processed': 0,
-            'failed': 0,
-            'vitals_created': 0,
-            'alerts_triggered': 0,
-            'errors': []
-        }
+        stats = new_stats()
+        stats['recovered'] = self.recover_stale_claims()
 
         # Get all JSON files in inbox
-        json_files = [f for f in os.listdir(self.inbox_dir) if f.endswith('.json')]
+        json_files = self.list_pending_files()
         stats['total_files'] = len(json_files)
 
-        logger.info(f"Processing {stats['total_files']} IoT data files...")
+        logger.info(f"Processing {stats['total_files']} IoT data files with {workers} worker(s)...")
 
-        for filename in json_files:
-            filepath = os.path.join(self.inbox_dir, filename)
+        if workers <= 1 or len(json_files) <= 1:
+            try:
+                merge_stats(stats, self.process_claimed_batch(json_files))
+            except DatabaseError as e:
+                logger.error(f"Database error, stopping this run: {str(e)}")
+                stats['errors'].append({'file': None, 'error': f"Database error: {str(e)}"})
+        else:
+            # Child processes must open their own database connections
+            connections.close_all()
+
+            batches = [json_files[i:i + batch_size] for i in range(0, len(json_files), batch_size)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_process) as pool:
+                futures = [
+                    pool.submit(_process_batch_in_worker, self.inbox_dir, self.archive_dir, self.processing_dir, batch)
+                    for batch in batches
+                ]
+                for future in as_completed(futures):
+                    try:
+                        merge_stats(stats, future.result())
+                    except Exception as e:
+                        logger.error(f"IoT worker process failed: {str(e)}")
+                        stats['errors'].append({'file': None, 'error': f"Worker failed: {str(e)}"})
+
+        logger.info(f"Processing complete: {stats['processed']} successful, {stats['failed']} failed")
+        return stats
+
+    def process_claimed_batch(self, filenames, stop_check=None):
+        """
+        Claim and process a list of inbox files in this process
+
+        Args:
+            filenames: File names in the inbox
+            stop_check: Optional callable; processing stops early when it returns True
+
+        Returns:
+            dict: Processing statistics for this batch
+
+        Raises:
+            DatabaseError: If the database fails; the current file is returned to the inbox
+        """
+        stats = new_stats()
+        worker_dir = self.worker_claim_dir()
+
+        for filename in filenames:
+            if stop_check and stop_check():
+                break
+
+            filepath = self.claim_file(filename, worker_dir)
+            if filepath is None:
+                # Claimed by an overlapping run
+                stats['skipped'] += 1
+                continue
 
             try:
                 result = self.process_file(filepath)
@@ -68,7 +299,7 @@ class IoTDataProcessor:
                 if result['success']:
                     stats['processed'] += 1
                     stats['vitals_created'] += result.get('vitals_created', 0)
-                    stats['alerts_triggered'] += result.get('alerts_triggered', 0)
+                    stats['alerts_queued'] += result.get('alerts_queued', 0)
 
                     # Archive the file
                     self.archive_file(filepath)
@@ -78,6 +309,11 @@ class IoTDataProcessor:
                         'file': filename,
                         'error': result.get('error', 'Unknown error')
                     })
+                    self.release_file(filepath)
+
+            except DatabaseError:
+                self.release_file(filepath)
+                raise
 
             except Exception as e:
                 logger.error(f"Error processing file {filename}: {str(e)}")
@@ -86,8 +322,13 @@ class IoTDataProcessor:
                     'file': filename,
                     'error': str(e)
                 })
+                self.release_file(filepath)
+
+        try:
+            os.rmdir(worker_dir)
+        except OSError:
+            pass
 
-        logger.info(f"Processing complete: {stats['processed']} successful, {stats['failed']} failed")
         return stats
 
     def process_file(self, filepath):
@@ -103,7 +344,7 @@ class IoTDataProcessor:
         result = {
             'success': False,
             'vitals_created': 0,
-            'alerts_triggered': 0,
+            'alerts_queued': 0,
             'error': None
         }
 
@@ -118,18 +359,21 @@ class IoTDataProcessor:
                 return result
 
             # Process the data
-            vital_sign, alerts_triggered = self.create_vital_sign_from_data(data)
+            vital_sign, alerts_queued = self.create_vital_sign_from_data(data)
 
             if vital_sign:
                 result['success'] = True
                 result['vitals_created'] = 1
-                result['alerts_triggered'] = alerts_triggered
+                result['alerts_queued'] = alerts_queued
                 logger.info(f"Created vital sign {vital_sign.vital_signs_id} from IoT device")
             else:
                 result['error'] = "Failed to create vital sign"
 
         except json.JSONDecodeError as e:
             result['error'] = f"Invalid JSON: {str(e)}"
+        except DatabaseError:
+            # Not a problem with the file; let the caller back off and retry it
+            raise
         except Exception as e:
             result['error'] = str(e)
             logger.exception(f"Error processing file {filepath}")
@@ -154,12 +398,7 @@ class IoTDataProcessor:
                 return False
 
         # Must have at least one vital sign measurement
-        vital_fields = [
-            'heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic',
-            'temperature', 'respiratory_rate', 'oxygen_saturation', 'glucose'
-        ]
-
-        if not any(field in data for field in vital_fields):
+        if not any(field in data for field in VITAL_FIELDS):
             logger.error("No vital sign measurements found in data")
             return False
 
@@ -174,8 +413,10 @@ class IoTDataProcessor:
             data: Parsed JSON data from IoT device
 
         Returns:
-            tuple: (VitalSign object, alerts_triggered_count)
+            tuple: (VitalSign object, alerts_queued_count)
         """
+        received_at = timezone.now()
+
         # Get or validate device
         try:
             device = Device.objects.get(device_unique_id=data['device_id'])
@@ -189,112 +430,443 @@ class IoTDataProcessor:
             logger.error(f"Device {device.device_id} not assigned to any patient")
             raise ValidationError(f"Device {device.device_id} not assigned to a patient")
 
+        cleaned = self.clean_reading(data)
+
         # Create or get encounter for device data
         encounter = self.get_or_create_device_encounter(patient, device)
 
-        # Parse timestamp
-        try:
-            if isinstance(data['timestamp'], str):
-                timestamp = datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-            else:
-                timestamp = timezone.now()
-        except (ValueError, KeyError):
-            timestamp = timezone.now()
+        # Create vital sign record (recorded_at is set on insert)
+        vital_sign = self._build_vital_sign(encounter, device, cleaned)
+        vital_sign.save()
+
+        # Queue alert evaluation; the job commits together with the vital sign
+        alerts_queued = self.queue_alerts([vital_sign], received_at=received_at)
+
+        logger.info(f"Created vital sign {vital_sign.vital_signs_id} for patient {patient.full_name}")
+
+        return vital_sign, alerts_queued
 
-        # Create vital sign record
-        vital_sign = VitalSign.objects.create(
+    def _build_vital_sign(self, encounter, device, cleaned):
+        """Unsaved VitalSign for a reading cleaned by clean_reading()"""
+        return VitalSign(
             encounter=encounter,
             data_source='device',
             device=device,
-            recorded_at=timestamp,
 
             # Vital signs data
-            heart_rate=data.get('heart_rate'),
-            blood_pressure_systolic=data.get('blood_pressure_systolic'),
-            blood_pressure_diastolic=data.get('blood_pressure_diastolic'),
-            temperature_value=data.get('temperature'),
-            temperature_unit=data.get('temperature_unit', 'F'),
-            respiratory_rate=data.get('respiratory_rate'),
-            oxygen_saturation=data.get('oxygen_saturation'),
-            glucose=data.get('glucose'),
-            weight_value=data.get('weight'),
-            weight_unit=data.get('weight_unit', 'lbs'),
+            heart_rate=cleaned.get('heart_rate'),
+            blood_pressure_systolic=cleaned.get('blood_pressure_systolic'),
+            blood_pressure_diastolic=cleaned.get('blood_pressure_diastolic'),
+            temperature=cleaned.get('temperature'),
+            temperature_unit=cleaned.get('temperature_unit', 'F'),
+            respiratory_rate=cleaned.get('respiratory_rate'),
+            oxygen_saturation=cleaned.get('oxygen_saturation'),
+            glucose=cleaned.get('glucose'),
+            weight=cleaned.get('weight'),
+            weight_unit=cleaned.get('weight_unit', 'lbs'),
 
             # Metadata
-            notes=data.get('notes', f"Automated reading from {device.device_name}")
+            notes=cleaned.get('notes', f"Automated reading from {device.device_name}")
         )
 
-        # Trigger alerts using existing alert system
-        alerts_triggered = self.trigger_alerts(vital_sign, patient, device)
+    def parse_timestamp(self, value):
+        """
+        Parse a reading timestamp, falling back to the current time
 
-        logger.info(f"Created vital sign {vital_sign.vital_signs_id} for patient {patient.full_name}")
+        Args:
+            value: ISO 8601 string or datetime from the payload
+
+        Returns:
+            datetime
+        """
+        if isinstance(value, datetime):
+            return value
 
-        return vital_sign, alerts_triggered
+        try:
+            if isinstance(value, str):
+                return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            pass
 
-    def get_or_create_device_encounter(self, patient, device):
+        return timezone.now()
+
+    def clean_reading(self, reading):
         """
-        Get or create an encounter for device data
-        Creates a virtual encounter for device readings
+        Validate a single reading and coerce its values to what the columns hold
+
+        Measurements must be finite numbers that fit their column (integers
+        for the integer vitals, at most the field's digits for the decimal
+        ones); units must be one of the model's choices and battery_level /
+        signal_quality whole numbers from 0 to 100. A reading that passes can
+        be inserted without a database error, so one bad reading cannot abort
+        the rest of its chunk.
 
         Args:
-            patient: Patient object
-            device: Device object
+            reading: dict for one reading
 
         Returns:
-            Encounter object
+            dict: Cleaned values keyed by payload field name
+
+        Raises:
+            ValidationError: If the reading is not usable
+        """
+        if not isinstance(reading, dict):
+            raise ValidationError("Reading must be a JSON object")
+
+        if not any(reading.get(field) is not None for field in VITAL_FIELDS):
+            raise ValidationError("No vital sign measurements found in reading")
+
+        cleaned = {}
+
+        for field in INTEGER_FIELDS:
+            if reading.get(field) is not None:
+                cleaned[field] = self._clean_integer(field, reading[field], INTEGER_MIN, INTEGER_MAX)
+
+        for field in DECIMAL_FIELDS:
+            value = reading.get(field)
+            if value is None:
+                continue
+            model_field = VitalSign._meta.get_field(field)
+            limit = Decimal(10) ** (model_field.max_digits - model_field.decimal_places)
+            number = self._clean_number(field, value)
+            if abs(number) >= limit:
+                raise ValidationError(f"Value out of range for {field}: {value!r}")
+            number = number.quantize(Decimal(1).scaleb(-model_field.decimal_places), rounding=ROUND_HALF_UP)
+            if abs(number) >= limit:
+                raise ValidationError(f"Value out of range for {field}: {value!r}")
+            cleaned[field] = number
+
+        for field in ('battery_level', 'signal_quality'):
+            if reading.get(field) is not None:
+                cleaned[field] = self._clean_integer(field, reading[field], 0, 100)
+
+        for field, choices in (('temperature_unit', VitalSign.TEMPERATURE_UNITS), ('weight_unit', VitalSign.WEIGHT_UNITS)):
+            value = reading.get(field)
+            if value is None:
+                continue
+            if value not in dict(choices):
+                raise ValidationError(f"Invalid value for {field}: {value!r}")
+            cleaned[field] = value
+
+        firmware = reading.get('firmware_version')
+        if firmware is not None:
+            if not isinstance(firmware, str) or len(firmware) > 50:
+                raise ValidationError(f"Invalid value for firmware_version: {firmware!r}")
+            cleaned['firmware_version'] = firmware
+
+        notes = reading.get('notes')
+        if notes is not None:
+            if not isinstance(notes, str):
+                raise ValidationError(f"Invalid value for notes: {notes!r}")
+            cleaned['notes'] = notes
+
+        return cleaned
+
+    def _clean_number(self, field, value):
+        """Finite Decimal of a payload number (booleans are not numbers)"""
+        if isinstance(value, bool) or not isinstance(value, (int, float, str, Decimal)):
+            raise ValidationError(f"Invalid value for {field}: {value!r}")
+        try:
+            number = Decimal(str(value).strip())
+        except (InvalidOperation, ValueError):
+            raise ValidationError(f"Invalid value for {field}: {value!r}")
+        if not number.is_finite():
+            raise ValidationError(f"Invalid value for {field}: {value!r}")
+        return number
+
+    def _clean_integer(self, field, value, minimum, maximum):
+        """Whole number in [minimum, maximum]"""
+        number = self._clean_number(field, value)
+        if number != number.to_integral_value():
+            raise ValidationError(f"Invalid value for {field}: {value!r}")
+        if not minimum <= number <= maximum:
+            raise ValidationError(f"Value out of range for {field}: {value!r}")
+        return int(number)
+
+    def create_vital_signs_bulk(self, device, readings, chunk_size=None):
         """
-        # Look for recent device encounter (within last 24 hours)
-        recent_encounter = Encounter.objects.filter(
-            patient=patient,
-            encounter_type='Remote Monitoring',
-            encounter_date__gte=timezone.now() - timedelta(hours=24)
-        ).first()
-
-        if recent_encounter:
-            return recent_encounter
-
-        # Create new remote monitoring encounter
-        encounter = Encounter.objects.create(
-            patient=patient,
-            provider=patient.primary_doctor,  # Use patient's primary doctor
-            encounter_date=timezone.now(),
-            encounter_type='Remote Monitoring',
-            chief_complaint=f'Automated vital signs monitoring via {device.device_name}',
-            status='In Progress',
-            notes=f'Automated encounter for IoT device data collection from {device.device_name}'
+        Create VitalSign and DeviceDataReading records for a batch of readings
+
+        Device, patient and encounter are resolved once for the whole batch,
+        every reading is validated before anything is written, and the rows
+        are inserted with chunked bulk_create.
+
+        Args:
+            device: Authenticated Device object
+            readings: list of reading dicts (payload field names)
+            chunk_size: Rows per INSERT (default: IOT_BULK_CHUNK_SIZE setting)
+
+        Returns:
+            dict: Batch statistics with a per-reading 'results' list
+        """
+        from django.conf import settings
+
+        received_at = timezone.now()
+        chunk_size = chunk_size or getattr(settings, 'IOT_BULK_CHUNK_SIZE', DEFAULT_BULK_CHUNK_SIZE)
+
+        results = {
+            'total_readings': len(readings),
+            'processed': 0,
+            'failed': 0,
+            'vitals_created': [],
+            'alerts_queued': 0,
+            'errors': [],
+            'results': [],
+        }
+
+        patient = device.patient
+        if not patient:
+            logger.error(f"Device {device.device_id} not assigned to any patient")
+            raise ValidationError(f"Device {device.device_id} not assigned to a patient")
+
+        # Validate every reading before touching the database
+        per_reading = []
+        valid = []
+        for index, reading in enumerate(readings):
+            try:
+                cleaned = self.clean_reading(reading)
+            except ValidationError as e:
+                error = '; '.join(e.messages)
+                per_reading.append({'index': index, 'success': False, 'error': error})
+                results['failed'] += 1
+                results['errors'].append(f"Reading {index}: {error}")
+                continue
+
+            entry = {'index': index, 'success': True}
+            per_reading.append(entry)
+            valid.append((entry, reading, cleaned))
+
+        created_vitals = []
+
+        if valid:
+            with transaction.atomic():
+                encounter = self.get_or_create_device_encounter(patient, device)
+                now = timezone.now()
+
+                vital_signs = []
+                for entry, reading, cleaned in valid:
+                    vital_signs.append(self._build_vital_sign(encounter, device, cleaned))
+
+                created_vitals = VitalSign.objects.bulk_create(vital_signs, batch_size=chunk_size)
+
+                device_readings = []
+                for (entry, reading, cleaned), vital_sign in zip(valid, created_vitals):
+                    device_readings.append(DeviceDataReading(
+                        device=device,
+                        patient=patient,
+                        reading_type='vital_signs',
+                        timestamp=self.parse_timestamp(reading.get('timestamp')),
+                        data=self._json_safe(reading),
+                        signal_quality=cleaned.get('signal_quality'),
+                        battery_level=cleaned.get('battery_level'),
+                        device_firmware=cleaned.get('firmware_version'),
+                        processed=True,
+                        processed_at=now,
+                        vital_sign_id=vital_sign.vital_signs_id
+                    ))
+
+                created_readings = DeviceDataReading.objects.bulk_create(device_readings, batch_size=chunk_size)
+
+                for (entry, reading, cleaned), vital_sign, device_reading in zip(valid, created_vitals, created_readings):
+                    entry['vital_sign_id'] = vital_sign.vital_signs_id
+                    entry['reading_id'] = device_reading.id
+                    results['vitals_created'].append(vital_sign.vital_signs_id)
+
+                results['processed'] = len(created_vitals)
+
+                # Update device status once for the whole batch
+                update_fields = ['last_sync']
+                device.last_sync = now
+                battery_levels = [c['battery_level'] for _, _, c in valid if c.get('battery_level') is not None]
+                if battery_levels:
+                    device.battery_level = battery_levels[-1]
+                    update_fields.append('battery_level')
+                device.save(update_fields=update_fields)
+
+                results['alerts_queued'] = self.queue_alerts(created_vitals, received_at=received_at)
+
+        results['results'] = per_reading
+
+        logger.info(
+            f"Bulk ingestion for device {device.device_id}: "
+            f"{results['processed']} created, {results['failed']} rejected"
         )
 
-        logger.info(f"Created remote monitoring encounter {encounter.encounter_id} for patient {patient.full_name}")
+        return results
+
+    def _json_safe(self, reading):
+        """Return a copy of a reading that can be stored in a JSONField"""
+        safe = {}
+        for key, value in reading.items():
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = float(value)
+            if isinstance(value, float) and not math.isfinite(value):
+                # NaN / Infinity are not valid JSON in PostgreSQL
+                value = None
+            safe[key] = value
+        return safe
+
+    def ingest_ndjson_stream(self, device, lines, chunk_size=None, max_errors=None):
+        """
+        Ingest newline-delimited JSON readings from a stream
+
+        Lines are parsed one at a time and committed in chunks through
+        create_vital_signs_bulk, so memory use does not grow with the size of
+        the upload. A malformed or invalid line is reported and skipped; a
+        chunk that fails to write is reported and the next chunk continues.
+        If the body stops being readable (truncated gzip, client disconnect),
+        the lines read so far are committed and the summary is returned with
+        truncated set, so the gateway can resume after last_vital_sign_id.
 
-        return encounter
+        Args:
+            device: Authenticated Device object
+            lines: Iterable of bytes lines; None marks a line that was too long
+            chunk_size: Readings committed per transaction (default: IOT_BULK_CHUNK_SIZE)
+            max_errors: Maximum per-line errors returned (default: IOT_STREAM_MAX_ERRORS)
 
-    def trigger_alerts(self, vital_sign, patient, device):
+        Returns:
+            dict: Upload statistics with per-line errors (and 'error' when truncated)
         """
-        Trigger alerts for critical vital signs using existing alert system
+        from django.conf import settings
+
+        chunk_size = chunk_size or getattr(settings, 'IOT_BULK_CHUNK_SIZE', DEFAULT_BULK_CHUNK_SIZE)
+        max_errors = max_errors or getattr(settings, 'IOT_STREAM_MAX_ERRORS', 1000)
+
+        if not device.patient:
+            raise ValidationError(f"Device {device.device_id} not assigned to a patient")
+
+        summary = {
+            'total_lines': 0,
+            'processed': 0,
+            'failed': 0,
+            'chunks_committed': 0,
+            'alerts_queued': 0,
+            'first_vital_sign_id': None,
+            'last_vital_sign_id': None,
+            'errors': [],
+            'errors_truncated': False,
+            'truncated': False,
+        }
+
+        def add_error(line_number, error):
+            summary['failed'] += 1
+            if len(summary['errors']) < max_errors:
+                summary['errors'].append({'line': line_number, 'error': error})
+            else:
+                summary['errors_truncated'] = True
+
+        def commit(chunk):
+            line_numbers = [line_number for line_number, _ in chunk]
+            try:
+                results = self.create_vital_signs_bulk(device, [reading for _, reading in chunk], chunk_size)
+            except Exception as e:
+                logger.error(f"NDJSON chunk for device {device.device_id} failed: {str(e)}")
+                for line_number in line_numbers:
+                    add_error(line_number, f"Chunk not saved: {str(e)}")
+                return
+
+            summary['chunks_committed'] += 1
+            summary['processed'] += results['processed']
+            summary['alerts_queued'] += results['alerts_queued']
+            for entry in results['results']:
+                if not entry['success']:
+                    add_error(line_numbers[entry['index']], entry['error'])
+            if results['vitals_created']:
+                if summary['first_vital_sign_id'] is None:
+                    summary['first_vital_sign_id'] = results['vitals_created'][0]
+                summary['last_vital_sign_id'] = results['vitals_created'][-1]
+
+        def readable(lines):
+            line_number = 0
+            try:
+                for line_number, raw_line in enumerate(lines, start=1):
+                    yield line_number, raw_line
+            except (OSError, EOFError, zlib.error) as e:
+                logger.warning(f"NDJSON stream for device {device.device_id} truncated: {str(e)}")
+                summary['truncated'] = True
+                summary['error'] = f"Body truncated after line {line_number}: {str(e)}"
+
+        chunk = []
+        for line_number, raw_line in readable(lines):
+            if raw_line is None:
+                summary['total_lines'] += 1
+                add_error(line_number, 'Line too long')
+                continue
+
+            line = raw_line.strip()
+            if not line:
+                continue
+            summary['total_lines'] += 1
+
+            try:
+                reading = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                add_error(line_number, 'Invalid JSON')
+                continue
+
+            if not isinstance(reading, dict):
+                add_error(line_number, 'Each line must be a JSON object')
+                continue
+
+            payload_device_id = reading.pop('device_id', None)
+            if payload_device_id is not None and payload_device_id not in (device.device_unique_id, device.device_id):
+                add_error(line_number, f"device_id '{payload_device_id}' does not match authenticated device")
+                continue
+
+            chunk.append((line_number, reading))
+            if len(chunk) >= chunk_size:
+                commit(chunk)
+                chunk = []
+
+        if chunk:
+            commit(chunk)
+
+        logger.info(
+            f"NDJSON ingestion for device {device.device_id}: "
+            f"{summary['processed']} created, {summary['failed']} rejected "
+            f"in {summary['chunks_committed']} chunks"
+        )
+
+        return summary
+
+    def get_or_create_device_encounter(self, patient, device):
+        """
+        Get or create an encounter for device data
+        Creates a virtual encounter for device readings
+
+        The open encounter is cached per (patient, device) until its 24-hour
+        window closes; see encounter_resolver.
 
         Args:
-            vital_sign: VitalSign object
             patient: Patient object
             device: Device object
 
         Returns:
-            int: Number of alerts triggered
+            Encounter object
         """
-        alerts_triggered = 0
+        return encounter_resolver.resolve(patient, device, logger=logger)
 
-        try:
-            # Use the existing vital_alerts.process_vital_alerts function
-            # This function handles the two-stage alert system (patient consent then provider notification)
-            alert_response = process_vital_alerts(vital_sign)
+    def queue_alerts(self, vital_signs, received_at=None):
+        """
+        Queue alert evaluation for new vital signs
 
-            if alert_response:
-                alerts_triggered = 1
-                logger.info(f"Alert triggered for vital sign {vital_sign.vital_signs_id}")
+        Alerts (email/SMS/WhatsApp) are evaluated by the run_alert_workers
+        command, not on the ingestion path; see alert_queue.
 
-        except Exception as e:
-            logger.error(f"Error triggering alert for vital sign {vital_sign.vital_signs_id}: {str(e)}")
+        Args:
+            vital_signs: list of saved VitalSign objects
+            received_at: When ingestion of the readings started (latency timing)
 
-        return alerts_triggered
+        Returns:
+            int: Number of evaluation jobs queued
+        """
+        try:
+            return enqueue_alert_evaluations(vital_signs, received_at=received_at)
+        except Exception as e:
+            logger.error(f"Error queueing alert evaluation for {len(vital_signs)} vital signs: {str(e)}")
+            raise
 
     def archive_file(self, filepath):
         """
@@ -0,0 +1,202 @@
+"""
+IoT Inbox Watcher
+
+Long-running mode for process_iot_data (--watch). The processor stays loaded
+and new files in the inbox are picked up as soon as they are written, instead
+of waiting for the next cron run.
+
+New files are detected with inotify when the optional inotify_simple package
+is available (Linux), and otherwise by polling the inbox with os.scandir.
+Files are claimed through IoTDataProcessor.claim_file, so several watchers
+(or a watcher and a cron run) can share one inbox safely.
+
+Backpressure: files are processed in batches whose size adapts to how long
+a batch takes. When the database is slow, batches shrink and the watcher
+pauses between them; database errors back off exponentially.
+"""
+import logging
+import time
+
+from django.db import DatabaseError, close_old_connections
+
+from .iot_data_processor import merge_stats, new_stats
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+
+class InboxWatcher:
+    """Watch the IoT inbox and process files as they arrive"""
+
+    def __init__(self, processor, poll_interval=0.5, max_batch=100, target_batch_seconds=2.0,
+                 stats_interval=60, failed_retry_seconds=300, use_inotify=True, on_stats=None):
+        """
+        Args:
+            processor: IoTDataProcessor instance
+            poll_interval: Seconds between inbox scans when polling
+            max_batch: Largest number of files processed between scans
+            target_batch_seconds: Batch duration above which the watcher slows down
+            stats_interval: Seconds between throughput reports
+            failed_retry_seconds: How long a file that failed is left alone before retrying
+            use_inotify: Use inotify when inotify_simple is installed
+            on_stats: Optional callable receiving the stats dict periodically
+        """
+        self.processor = processor
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+        self.target_batch_seconds = target_batch_seconds
+        self.stats_interval = stats_interval
+        self.failed_retry_seconds = failed_retry_seconds
+        self.on_stats = on_stats
+
+        self.batch_size = max_batch
+        self.stopping = False
+        self.totals = new_stats()
+        self.db_backoff = 0
+        self.retry_after = {}  # filename -> monotonic time when a failed file may be retried
+
+        self._inotify = None
+        if use_inotify and INotify is not None:
+            try:
+                self._inotify = INotify()
+                self._inotify.add_watch(
+                    processor.inbox_dir,
+                    inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+                )
+            except OSError as e:
+                logger.warning(f"inotify unavailable, falling back to polling: {str(e)}")
+                self._inotify = None
+
+    @property
+    def mode(self):
+        return 'inotify' if self._inotify is not None else 'polling'
+
+    def stop(self, *args):
+        """Ask the watcher to exit after the current file (usable as a signal handler)"""
+        self.stopping = True
+
+    def run(self):
+        """
+        Process files until stop() is called
+
+        Returns:
+            dict: Totals for the whole run
+        """
+        started = time.monotonic()
+        next_stats = started + self.stats_interval
+        window_start, window_processed = started, 0
+
+        self.totals['recovered'] = self.processor.recover_stale_claims()
+        logger.info(f"Watching {self.processor.inbox_dir} ({self.mode})")
+
+        while not self.stopping:
+            processed = self.process_available()
+            window_processed += processed
+
+            now = time.monotonic()
+            if now >= next_stats:
+                self.report(window_processed / (now - window_start))
+                window_start, window_processed = now, 0
+                next_stats = now + self.stats_interval
+                self.totals['recovered'] += self.processor.recover_stale_claims()
+
+            if not processed and not self.stopping:
+                self.wait_for_files()
+
+        if self._inotify is not None:
+            self._inotify.close()
+
+        self.report((self.totals['processed'] + self.totals['failed']) / max(time.monotonic() - started, 1e-6))
+        return self.totals
+
+    def process_available(self):
+        """
+        Process the files currently in the inbox, one adaptive batch at a time
+
+        Returns:
+            int: Number of files handled
+        """
+        handled = 0
+
+        while not self.stopping:
+            pending = self.pending_files()
+            if not pending:
+                break
+
+            batch = pending[:self.batch_size]
+            close_old_connections()
+            batch_started = time.monotonic()
+
+            try:
+                stats = self.processor.process_claimed_batch(batch, stop_check=lambda: self.stopping)
+            except DatabaseError as e:
+                self.backoff_for_database(e)
+                continue
+
+            self.db_backoff = 0
+            merge_stats(self.totals, stats)
+
+            # Failed files go back to the inbox; don't pick them up again right away
+            retry_at = time.monotonic() + self.failed_retry_seconds
+            for error in stats['errors']:
+                if error['file']:
+                    self.retry_after[error['file']] = retry_at
+
+            handled += stats['processed'] + stats['failed']
+
+            self.adjust_batch_size(time.monotonic() - batch_started)
+
+            # Nothing from this batch could be processed (every file was claimed
+            # elsewhere or failed); wait for new files instead of spinning
+            if stats['processed'] == 0:
+                break
+
+        return handled
+
+    def pending_files(self):
+        """Inbox files, skipping recently failed ones until their retry time"""
+        now = time.monotonic()
+        self.retry_after = {name: at for name, at in self.retry_after.items() if at > now}
+        return [name for name in self.processor.list_pending_files() if name not in self.retry_after]
+
+    def adjust_batch_size(self, elapsed):
+        """Shrink batches and pause when the database is slow, grow them back when it recovers"""
+        if elapsed > self.target_batch_seconds:
+            self.batch_size = max(1, self.batch_size // 2)
+            pause = min(elapsed - self.target_batch_seconds, 5.0)
+            logger.info(f"Slow batch ({elapsed:.1f}s): batch size {self.batch_size}, pausing {pause:.1f}s")
+            time.sleep(pause)
+        elif self.batch_size < self.max_batch:
+            self.batch_size = min(self.max_batch, self.batch_size * 2)
+
+    def backoff_for_database(self, error):
+        """Exponential backoff (capped at 60s) after a database error"""
+        self.db_backoff = min(60, max(1, self.db_backoff * 2))
+        self.batch_size = 1
+        logger.error(f"Database error while processing inbox, retrying in {self.db_backoff}s: {str(error)}")
+
+        deadline = time.monotonic() + self.db_backoff
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(0.2)
+
+    def wait_for_files(self):
+        """Block until new files may be present (inotify event or poll interval)"""
+        if self._inotify is not None:
+            # Short timeout so stop() is noticed promptly
+            self._inotify.read(timeout=int(max(self.poll_interval, 1.0) * 1000))
+        else:
+            time.sleep(self.poll_interval)
+
+    def report(self, files_per_second):
+        """Log throughput statistics"""
+        stats = dict(self.totals, files_per_second=round(files_per_second, 2), batch_size=self.batch_size)
+        logger.info(
+            f"IoT inbox watcher: {stats['processed']} processed, {stats['failed']} failed, "
+            f"{stats['vitals_created']} vitals, {stats['files_per_second']} files/s"
+        )
+        if self.on_stats:
+            self.on_stats(stats)
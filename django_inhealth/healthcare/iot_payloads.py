@@ -0,0 +1,210 @@
+"""
+IoT Payload Decoding
+
+Cellular devices pay per byte, so the IoT endpoints accept compact request
+bodies in addition to plain JSON:
+
+    Content-Encoding: gzip (or deflate)
+    Content-Type: application/json, application/msgpack or application/cbor
+
+MessagePack and CBOR need the optional msgpack / cbor2 packages; without them
+those content types are rejected with 415. Decompression is bounded by
+IOT_MAX_DECOMPRESSED_BYTES (default 10 MB) so a small compressed body cannot
+expand without limit.
+
+decode_request_payload() is used by the plain Django views in
+iot_api_views.py; the DRF device views use the parser classes at the bottom.
+"""
+import json
+import zlib
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+DEFAULT_MAX_DECOMPRESSED_BYTES = 10 * 1024 * 1024
+
+JSON_TYPES = ('application/json', 'text/json', '')
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+CBOR_TYPES = ('application/cbor',)
+
+
+class PayloadError(Exception):
+    """Request body could not be decoded"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def max_decompressed_bytes():
+    return getattr(settings, 'IOT_MAX_DECOMPRESSED_BYTES', DEFAULT_MAX_DECOMPRESSED_BYTES)
+
+
+def decompress_body(body, content_encoding, limit=None):
+    """
+    Undo Content-Encoding, refusing output larger than the limit
+
+    Args:
+        body: Raw request body bytes
+        content_encoding: Content-Encoding header value ('' for none)
+        limit: Maximum decompressed size (default: IOT_MAX_DECOMPRESSED_BYTES)
+
+    Returns:
+        bytes: Decoded body
+    """
+    encoding = (content_encoding or '').strip().lower()
+    limit = limit or max_decompressed_bytes()
+
+    if encoding in ('', 'identity'):
+        if len(body) > limit:
+            raise PayloadError(f'Payload exceeds {limit} bytes', status_code=413)
+        return body
+
+    if encoding in ('gzip', 'x-gzip'):
+        wbits = 16 + zlib.MAX_WBITS
+    elif encoding == 'deflate':
+        wbits = zlib.MAX_WBITS
+    else:
+        raise PayloadError(f'Unsupported Content-Encoding: {content_encoding}', status_code=415)
+
+    decompressor = zlib.decompressobj(wbits)
+    try:
+        # Ask for at most limit + 1 bytes so an oversized payload is detected
+        # without inflating the rest of it
+        data = decompressor.decompress(body, limit + 1)
+        if len(data) <= limit and not decompressor.unconsumed_tail:
+            data += decompressor.flush()
+    except zlib.error:
+        raise PayloadError('Invalid compressed body')
+
+    if len(data) > limit or decompressor.unconsumed_tail:
+        raise PayloadError(f'Decompressed payload exceeds {limit} bytes', status_code=413)
+
+    return data
+
+
+def parse_body(data, content_type):
+    """
+    Parse a decompressed body according to its media type
+
+    Args:
+        data: Body bytes
+        content_type: Content-Type header value
+
+    Returns:
+        Parsed payload (normally a dict)
+    """
+    media_type = (content_type or '').split(';')[0].strip().lower()
+
+    if media_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise PayloadError('MessagePack payloads are not supported on this server', status_code=415)
+        try:
+            return msgpack.unpackb(data, raw=False, timestamp=3)
+        except (msgpack.UnpackException, ValueError) as e:
+            raise PayloadError(f'Invalid MessagePack body: {str(e)}')
+
+    if media_type in CBOR_TYPES:
+        if cbor2 is None:
+            raise PayloadError('CBOR payloads are not supported on this server', status_code=415)
+        try:
+            return cbor2.loads(data)
+        except (cbor2.CBORDecodeError, ValueError) as e:
+            raise PayloadError(f'Invalid CBOR body: {str(e)}')
+
+    if media_type in JSON_TYPES or media_type.endswith('+json'):
+        try:
+            return json.loads(data)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise PayloadError('Invalid JSON in request body')
+
+    raise PayloadError(f'Unsupported Content-Type: {content_type}', status_code=415)
+
+
+def decode_request_payload(request):
+    """
+    Decode a Django request body (JSON, MessagePack or CBOR, optionally compressed)
+
+    Args:
+        request: Django HttpRequest
+
+    Returns:
+        Parsed payload
+    """
+    data = decompress_body(request.body, request.META.get('HTTP_CONTENT_ENCODING', ''))
+    return parse_body(data, request.META.get('CONTENT_TYPE', ''))
+
+
+def supported_formats():
+    """Media types this server can decode"""
+    formats = ['application/json']
+    if msgpack is not None:
+        formats.append('application/msgpack')
+    if cbor2 is not None:
+        formats.append('application/cbor')
+    return formats
+
+
+# ============================================================================
+# DRF parsers for the /api/v1/device/ endpoints
+# ============================================================================
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Payload too large.'
+    default_code = 'payload_too_large'
+
+
+class DevicePayloadParser(BaseParser):
+    """Base parser: honours Content-Encoding and the decompressed size limit"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        content_encoding = request.META.get('HTTP_CONTENT_ENCODING', '') if request is not None else ''
+        body = stream.read() if stream is not None else b''
+
+        try:
+            data = decompress_body(body, content_encoding)
+            return parse_body(data, media_type or self.media_type)
+        except PayloadError as e:
+            if e.status_code == 415:
+                raise UnsupportedMediaType(media_type, detail=e.message)
+            if e.status_code == 413:
+                raise PayloadTooLarge(e.message)
+            raise ParseError(e.message)
+
+
+class DeviceJSONParser(DevicePayloadParser):
+    media_type = 'application/json'
+
+
+class DeviceMessagePackParser(DevicePayloadParser):
+    media_type = 'application/msgpack'
+
+
+class DeviceXMessagePackParser(DeviceMessagePackParser):
+    media_type = 'application/x-msgpack'
+
+
+class DeviceCBORParser(DevicePayloadParser):
+    media_type = 'application/cbor'
+
+
+DEVICE_PARSER_CLASSES = [DeviceJSONParser]
+if msgpack is not None:
+    DEVICE_PARSER_CLASSES += [DeviceMessagePackParser, DeviceXMessagePackParser]
+if cbor2 is not None:
+    DEVICE_PARSER_CLASSES.append(DeviceCBORParser)
@@ -0,0 +1,211 @@
+"""
+Keyset Pagination
+
+Paginates large listings (vital signs, patients, messages) by seeking past
+the last row shown instead of OFFSET: page N costs the same as page 1, and no
+COUNT(*) is run. Pages are addressed by opaque cursors (see cursors) holding
+the sort key of the first or last row shown, e.g. (recorded_at,
+vital_signs_id), so rows inserted while paging do not shift the pages.
+
+    paginator = KeysetPaginator(vitals, ('-recorded_at', '-vital_signs_id'), per_page=50)
+    page = paginator.page(request.GET.get('cursor'), params=request.GET)
+
+The ordering must end with a unique field (normally the primary key) and its
+fields must not be NULL. A page only knows whether there are more rows
+before and after it; estimated_count() gives a PostgreSQL planner estimate of
+the total when a page needs an indication of the listing size (a listing that
+fits on one page is simply counted with len(page)).
+
+Templates render the navigation with
+{% include 'healthcare/includes/keyset_pagination.html' with page=page %}.
+"""
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.http import QueryDict
+
+from .cursors import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+CURSOR_PARAM = 'cursor'
+
+# Cursor value types by model field type
+_FIELD_TYPES = {
+    'DateTimeField': datetime,
+    'DateField': date.fromisoformat,
+    'DecimalField': Decimal,
+    'FloatField': float,
+    'CharField': str,
+    'TextField': str,
+    'EmailField': str,
+    'SlugField': str,
+}
+
+
+def estimated_count(queryset):
+    """
+    Planner estimate of a queryset's row count, without running COUNT(*)
+
+    Returns:
+        int, or None when no estimate is available (not PostgreSQL)
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (DatabaseError, ValueError, KeyError, IndexError, TypeError) as e:
+        logger.warning(f"Could not estimate row count: {str(e)}")
+        return None
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing"""
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, params=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.estimated_count = None
+        self._params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _query(self, cursor):
+        params = self._params.copy() if self._params is not None else QueryDict(mutable=True)
+        params.pop(CURSOR_PARAM, None)
+        if cursor:
+            params[CURSOR_PARAM] = cursor
+        query = params.urlencode()
+        return f'?{query}' if query else '?'
+
+    @property
+    def first_url(self):
+        """Query string of the first page (other parameters kept)"""
+        return self._query(None)
+
+    @property
+    def next_url(self):
+        return self._query(self.next_cursor) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._query(self.previous_cursor) if self.has_previous else None
+
+
+class KeysetPaginator:
+    """Seek-method paginator over a fixed ordering"""
+
+    def __init__(self, queryset, ordering, per_page=50, estimate_count=False):
+        """
+        Args:
+            queryset: Rows to paginate (its own ordering is replaced)
+            ordering: Sort fields, e.g. ('-recorded_at', '-vital_signs_id');
+                the last one must be unique
+            per_page: Rows per page
+            estimate_count: Set page.estimated_count (PostgreSQL planner
+                estimate) when the listing spans more than one page
+        """
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.estimate_count = estimate_count
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.descending = [field.startswith('-') for field in self.ordering]
+
+    def _types(self):
+        types = []
+        for name in self.fields:
+            field = self.queryset.model._meta.get_field(name)
+            internal_type = field.get_internal_type()
+            types.append(_FIELD_TYPES.get(internal_type, int))
+        return types
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            return [obj[name] for name in self.fields]
+        return [getattr(obj, name) for name in self.fields]
+
+    def _seek(self, values, forward):
+        """Q for the rows after (forward) or before the position `values`"""
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            ascending = not self.descending[index]
+            lookup = 'gt' if ascending == forward else 'lt'
+            clause = Q(**{f'{name}__{lookup}': values[index]})
+            for prior in range(index):
+                clause &= Q(**{self.fields[prior]: values[prior]})
+            condition |= clause
+        return condition
+
+    def _reversed_ordering(self):
+        return [name if descending else f'-{name}' for name, descending in zip(self.fields, self.descending)]
+
+    def page(self, cursor=None, params=None):
+        """
+        Page at a cursor
+
+        Args:
+            cursor: Cursor from a page's next_cursor / previous_cursor (None,
+                malformed or holding a NULL key: the first page)
+            params: Request query parameters kept in the page URLs
+
+        Returns:
+            KeysetPage
+        """
+        direction, values = None, None
+        if cursor:
+            try:
+                decoded = decode_cursor(cursor, [str] + self._types())
+            except ValueError:
+                decoded = None
+            # Keys are never NULL, so a cursor holding one is invalid too
+            if decoded and decoded[0] in ('next', 'prev') and None not in decoded:
+                direction, values = decoded[0], decoded[1:]
+
+        if direction == 'prev':
+            rows = list(
+                self.queryset.filter(self._seek(values, forward=False))
+                .order_by(*self._reversed_ordering())[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            queryset = self.queryset
+            if direction == 'next':
+                queryset = queryset.filter(self._seek(values, forward=True))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = direction == 'next'
+
+        page = KeysetPage(
+            rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=encode_cursor('next', *self._key(rows[-1])) if rows else None,
+            previous_cursor=encode_cursor('prev', *self._key(rows[0])) if rows else None,
+            params=params
+        )
+        if self.estimate_count and page.has_other_pages:
+            page.estimated_count = estimated_count(self.queryset)
+        return page
@@ -0,0 +1,135 @@
+"""
+Management command to benchmark vital alert fan-out without real providers
+
+Creates N synthetic critical vital signs across M synthetic patients and runs
+process_vital_alerts on them at a target rate. Notifications go to a
+stand-in backend instead of SMTP/Twilio: email to a local SMTP sink
+(--smtp-sink) or a simulated delay, SMS and WhatsApp to a simulated delay.
+Reports alerts/sec, p50/p95/p99 latency per stage and per channel, and
+database queries per alert. The synthetic data is deleted afterwards.
+
+Alert storm suppression is turned off for the run (every reading notifies)
+unless --with-suppression is given.
+
+Run this against a development or staging database, never production.
+
+Usage:
+    python manage.py benchmark_alert_fanout --alerts 500 --patients 50
+    python manage.py benchmark_alert_fanout --alerts 1000 --rate 50 --concurrency 8 --smtp-sink
+"""
+import contextlib
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from healthcare.alert_benchmark import (
+    SMTPSink, StandInBackend, create_synthetic_data, delete_synthetic_data, run_benchmark, summarize
+)
+from healthcare.notification_dispatcher import NotificationDispatcher, set_notification_dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Benchmark vital alert fan-out with stand-in email/SMS/WhatsApp channels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alerts', type=int, default=200, help='Synthetic critical readings (default: 200)')
+        parser.add_argument('--patients', type=int, default=20, help='Synthetic patients (default: 20)')
+        parser.add_argument('--rate', type=float, default=0, help='Target alerts/second (default: 0, unpaced)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel alert drivers (default: 4)')
+        parser.add_argument('--email-latency-ms', type=float, default=50, help='Simulated email send time (default: 50)')
+        parser.add_argument('--sms-latency-ms', type=float, default=150, help='Simulated SMS API call time (default: 150)')
+        parser.add_argument('--whatsapp-latency-ms', type=float, default=150, help='Simulated WhatsApp API call time (default: 150)')
+        parser.add_argument(
+            '--smtp-sink',
+            action='store_true',
+            help='Send email over SMTP to a local sink instead of simulating it',
+        )
+        parser.add_argument(
+            '--no-rate-limit',
+            action='store_true',
+            help='Disable the per-channel NOTIFICATION_RATE_LIMITS during the run',
+        )
+        parser.add_argument(
+            '--with-suppression',
+            action='store_true',
+            help='Keep alert storm suppression on (repeat readings are folded, not notified)',
+        )
+        parser.add_argument('--keep-data', action='store_true', help='Do not delete the synthetic data afterwards')
+        parser.add_argument('--verbose', action='store_true', help='Show the alert pipeline output')
+
+    def handle(self, *args, **options):
+        if options['alerts'] < 1 or options['patients'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--alerts, --patients and --concurrency must be at least 1')
+
+        sink = SMTPSink().start() if options['smtp_sink'] else None
+        backend = StandInBackend(
+            latency_ms={
+                'email': options['email_latency_ms'],
+                'sms': options['sms_latency_ms'],
+                'whatsapp': options['whatsapp_latency_ms'],
+            },
+            smtp_sink=sink
+        )
+        rate_limits = {'email': 0, 'sms': 0, 'whatsapp': 0} if options['no_rate_limit'] else None
+        dispatcher = NotificationDispatcher(backend=backend, rate_limits=rate_limits)
+        previous = set_notification_dispatcher(dispatcher)
+
+        overrides = {'ALERT_TIMING_ENABLED': True}
+        if not options['with_suppression']:
+            overrides['ALERT_SUPPRESSION_WINDOW_MINUTES'] = 0
+
+        run_id = None
+        try:
+            run_id, vital_sign_ids = create_synthetic_data(options['alerts'], options['patients'])
+            self.stdout.write(
+                f"Run {run_id}: {len(vital_sign_ids)} critical readings across {options['patients']} patients, "
+                f"{options['concurrency']} drivers, rate {options['rate'] or 'unpaced'}"
+            )
+
+            output = contextlib.nullcontext() if options['verbose'] else contextlib.redirect_stdout(io.StringIO())
+            with override_settings(**overrides), output:
+                run = run_benchmark(vital_sign_ids, rate=options['rate'], concurrency=options['concurrency'])
+        finally:
+            set_notification_dispatcher(previous)
+            dispatcher.shutdown()
+            if sink is not None:
+                sink.stop()
+            if run_id and not options['keep_data']:
+                delete_synthetic_data(run_id)
+
+        self.report(summarize(run), run['errors'], backend, sink)
+
+    def report(self, summary, errors, backend, sink):
+        """Print the benchmark results"""
+        def fmt(value):
+            return '-' if value is None else f'{value:.1f}'
+
+        self.stdout.write(self.style.WARNING('=' * 70))
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['alerts']} alerts in {summary['wall_seconds']:.2f}s = "
+            f"{summary['alerts_per_second']:.1f} alerts/sec ({summary['errors']} errors)"
+        ))
+
+        latency = summary['alert_latency_ms']
+        self.stdout.write(
+            f"Alert latency (ms): p50 {fmt(latency['p50'])}  p95 {fmt(latency['p95'])}  p99 {fmt(latency['p99'])}"
+        )
+        queries = summary['queries_per_alert']
+        self.stdout.write(f"DB queries per alert: mean {queries['mean']:.1f}  max {queries['max']}")
+
+        self.stdout.write('')
+        self.stdout.write(f"{'Stage / channel (ms)':<24}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for name, stats in summary['series_ms'].items():
+            self.stdout.write(
+                f"{name:<24}{stats['count']:>8}{fmt(stats['p50']):>10}{fmt(stats['p95']):>10}{fmt(stats['p99']):>10}"
+            )
+
+        sent = ', '.join(f'{channel}: {count}' for channel, count in sorted(backend.sent.items())) or 'none'
+        self.stdout.write('')
+        self.stdout.write(f"Messages handled by the stand-in backend: {sent}")
+        if sink is not None:
+            self.stdout.write(f"Messages received by the SMTP sink: {sink.messages}")
+
+        for error in errors[:10]:
+            self.stdout.write(self.style.ERROR(f'✗ {error}'))
+        self.stdout.write(self.style.WARNING('=' * 70))
@@ -2,17 +2,27 @@
 Management command to check for timed-out vital sign alert responses
 and auto-escalate them to providers.
 
-This should be run as a cron job or scheduled task every 1-5 minutes.
+Due alerts are found through the indexed escalation_deadline column and
+claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several copies of this
+command can run at the same time.
+
+Run it once from cron every 1-5 minutes, or as a daemon (--daemon) that
+sleeps until the next deadline and escalates within seconds of the timeout.
 
 Usage:
     python manage.py check_vital_alert_timeouts
 
     # In cron (every 5 minutes):
     */5 * * * * cd /path/to/project && python manage.py check_vital_alert_timeouts
+
+    # As a long-running service (systemd, supervisord):
+    python manage.py check_vital_alert_timeouts --daemon
 """
+import signal
+
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from healthcare.models import VitalSignAlertResponse
+from healthcare.alert_escalation import EscalationScheduler, due_alerts, escalate_due_alerts
 
 
 class Command(BaseCommand):
@@ -29,66 +39,50 @@ class Command(BaseCommand):
             action='store_true',
             help='Show detailed output',
         )
+        parser.add_argument(
+            '--daemon',
+            action='store_true',
+            help='Keep running and escalate each alert as soon as its deadline passes',
+        )
+        parser.add_argument(
+            '--refresh-interval',
+            type=float,
+            default=5.0,
+            help='Daemon mode: seconds between re-reading upcoming deadlines (default: 5)',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         verbose = options['verbose']
 
+        if options['daemon'] and not dry_run:
+            self.run_daemon(options['refresh_interval'])
+            return
+
         if verbose or dry_run:
             self.stdout.write(self.style.WARNING('='*70))
             self.stdout.write(self.style.WARNING('Checking for timed-out vital sign alerts...'))
             self.stdout.write(self.style.WARNING(f'Time: {timezone.now()}'))
             self.stdout.write(self.style.WARNING('='*70))
 
-        # Get all pending alerts
-        pending_alerts = VitalSignAlertResponse.objects.filter(
-            patient_response_status='pending',
-            auto_escalated=False
-        )
-
-        if verbose:
-            self.stdout.write(f'Found {pending_alerts.count()} pending alerts')
-
-        # Check each alert for timeout
-        escalated_count = 0
-        for alert in pending_alerts:
-            if alert.should_auto_escalate():
+        if dry_run:
+            escalated_count = 0
+            for alert in due_alerts().select_related('patient'):
                 escalated_count += 1
-
-                patient_name = alert.patient.full_name
-                alert_id = alert.alert_id
                 minutes_elapsed = (timezone.now() - alert.created_at).total_seconds() / 60
-
-                if dry_run:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'[DRY RUN] Would escalate Alert #{alert_id} for {patient_name} '
-                            f'(elapsed: {minutes_elapsed:.1f} min, timeout: {alert.timeout_minutes} min)'
-                        )
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'[DRY RUN] Would escalate Alert #{alert.alert_id} for {alert.patient.full_name} '
+                        f'(elapsed: {minutes_elapsed:.1f} min, timeout: {alert.timeout_minutes} min)'
                     )
-                else:
-                    if verbose:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f'Escalating Alert #{alert_id} for {patient_name} '
-                                f'(elapsed: {minutes_elapsed:.1f} min, timeout: {alert.timeout_minutes} min)'
-                            )
-                        )
-
-                    # Auto-escalate the alert
-                    try:
-                        alert.auto_escalate()
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f'✓ Alert #{alert_id} auto-escalated successfully'
-                            )
-                        )
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f'✗ Error escalating Alert #{alert_id}: {str(e)}'
-                            )
-                        )
+                )
+        else:
+            escalated, failed = escalate_due_alerts()
+            for alert in escalated:
+                self.report(alert, None)
+            for alert in failed:
+                self.report(alert, alert.escalation_error)
+            escalated_count = len(escalated)
 
         # Summary
         if verbose or dry_run or escalated_count > 0:
@@ -106,3 +100,22 @@ class Command(BaseCommand):
                     )
                 )
             self.stdout.write(self.style.WARNING('='*70))
+
+    def run_daemon(self, refresh_interval):
+        """Escalate alerts as their deadlines pass until SIGTERM/SIGINT"""
+        scheduler = EscalationScheduler(refresh_interval=refresh_interval, on_escalated=self.report)
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+
+        self.stdout.write(self.style.SUCCESS('=== Vital Alert Escalation Scheduler ==='))
+        scheduler.run()
+        self.stdout.write(self.style.SUCCESS(
+            f'\nStopped: {scheduler.escalated} escalated, {scheduler.failed} failed'
+        ))
+
+    def report(self, alert, error):
+        """Print the outcome for one alert"""
+        if error:
+            self.stdout.write(self.style.ERROR(f'✗ Error escalating Alert #{alert.alert_id}: {error}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Alert #{alert.alert_id} auto-escalated successfully'))
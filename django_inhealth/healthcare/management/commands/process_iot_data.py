@@ -5,11 +5,19 @@ Run this command periodically (e.g., via cron) to process pending IoT data files
 Usage:
     python manage.py process_iot_data
     python manage.py process_iot_data --cleanup  # Also cleanup old archives
+    python manage.py process_iot_data --workers 4  # Process files in parallel
+    python manage.py process_iot_data --watch      # Run as a daemon, processing files as they arrive
+
+Files are claimed by renaming them into a per-worker processing directory, so
+overlapping runs (e.g. a slow cron run and the next one) never ingest the same
+file twice, and files left behind by a crashed run are moved back to the inbox.
 """
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from healthcare.iot_data_processor import IoTDataProcessor
+from healthcare.iot_inbox_watcher import InboxWatcher
 import logging
+import signal
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +37,35 @@ class Command(BaseCommand):
             default=90,
             help='Number of days to keep archived files (default: 90)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'IOT_PROCESSING_WORKERS', 1),
+            help='Number of worker processes (default: 1)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Files handed to a worker process at a time (default: 100)',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep running and process new files as they arrive (stop with SIGTERM)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=0.5,
+            help='Seconds between inbox scans in --watch mode without inotify (default: 0.5)',
+        )
+        parser.add_argument(
+            '--stats-interval',
+            type=int,
+            default=60,
+            help='Seconds between throughput reports in --watch mode (default: 60)',
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('=== IoT Data Processor ==='))
@@ -40,17 +77,28 @@ class Command(BaseCommand):
         self.stdout.write(f'Inbox directory: {processor.inbox_dir}')
         self.stdout.write(f'Archive directory: {processor.archive_dir}')
 
+        if options['watch']:
+            self.watch(processor, options)
+            return
+
         # Process all pending files
         self.stdout.write('\nProcessing pending files...')
-        stats = processor.process_all_pending_files()
+        stats = processor.process_all_pending_files(
+            workers=max(1, options['workers']),
+            batch_size=max(1, options['batch_size'])
+        )
 
         # Display results
         self.stdout.write(self.style.SUCCESS('\n=== Processing Results ==='))
         self.stdout.write(f'Total files found: {stats["total_files"]}')
+        if stats['recovered']:
+            self.stdout.write(self.style.WARNING(f'Recovered from interrupted runs: {stats["recovered"]}'))
+        if stats['skipped']:
+            self.stdout.write(f'Skipped (claimed by another run): {stats["skipped"]}')
         self.stdout.write(self.style.SUCCESS(f'Successfully processed: {stats["processed"]}'))
         self.stdout.write(self.style.ERROR(f'Failed: {stats["failed"]}'))
         self.stdout.write(f'Vital signs created: {stats["vitals_created"]}')
-        self.stdout.write(f'Alerts triggered: {stats["alerts_triggered"]}')
+        self.stdout.write(f'Alert evaluations queued: {stats["alerts_queued"]}')
 
         # Show errors if any
         if stats['errors']:
@@ -69,3 +117,31 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f'Deleted {deleted_count} old archived files'))
 
         self.stdout.write(self.style.SUCCESS('\n=== Complete ==='))
+
+    def watch(self, processor, options):
+        """Run until SIGTERM/SIGINT, processing files as they arrive"""
+        watcher = InboxWatcher(
+            processor,
+            poll_interval=options['poll_interval'],
+            max_batch=max(1, options['batch_size']),
+            stats_interval=options['stats_interval'],
+            on_stats=self.write_watch_stats,
+        )
+
+        signal.signal(signal.SIGTERM, watcher.stop)
+        signal.signal(signal.SIGINT, watcher.stop)
+
+        self.stdout.write(f'\nWatching inbox ({watcher.mode}); send SIGTERM to stop...')
+        stats = watcher.run()
+
+        self.stdout.write(self.style.SUCCESS('\n=== Watcher Stopped ==='))
+        self.stdout.write(f'Processed: {stats["processed"]}, failed: {stats["failed"]}, '
+                          f'vital signs created: {stats["vitals_created"]}')
+
+    def write_watch_stats(self, stats):
+        """Periodic throughput line for --watch mode"""
+        self.stdout.write(
+            f'[{stats["files_per_second"]} files/s, batch {stats["batch_size"]}] '
+            f'processed {stats["processed"]}, failed {stats["failed"]}, '
+            f'vitals {stats["vitals_created"]}, alert jobs {stats["alerts_queued"]}'
+        )
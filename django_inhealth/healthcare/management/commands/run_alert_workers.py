@@ -0,0 +1,162 @@
+"""
+Management command to run alert evaluation workers
+
+Device ingestion queues one AlertEvaluationJob per vital sign; these workers
+claim jobs from the table and run the vital sign alert pipeline (email, SMS,
+WhatsApp and dashboard notifications) off the request path.
+
+Usage:
+    python manage.py run_alert_workers --workers 4
+    python manage.py run_alert_workers --once      # Drain the queue and exit
+    python manage.py run_alert_workers --stats     # Show queue depth and lag
+
+Run it under a process supervisor (systemd, supervisord); it stops cleanly on
+SIGTERM/SIGINT after finishing the jobs it has claimed.
+"""
+import signal
+import socket
+import os
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from healthcare.alert_queue import claim_jobs, purge_finished_jobs, queue_stats, renew_claim, run_job
+from healthcare.alert_timing import purge_timing_spans
+
+
+class Command(BaseCommand):
+    help = 'Run workers that evaluate queued vital sign alerts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Number of worker threads (default: 2)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Jobs claimed per worker at a time (default: 10)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when the queue is empty (default: 1.0)',
+        )
+        parser.add_argument(
+            '--stats-interval',
+            type=int,
+            default=60,
+            help='Seconds between queue lag reports (default: 60)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process all runnable jobs and exit',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue statistics and exit',
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=None,
+            help='Delete completed jobs older than this many days (and expired timing spans) and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        if options['purge_days'] is not None:
+            deleted = purge_finished_jobs(days=options['purge_days'])
+            spans_deleted = purge_timing_spans()
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {deleted} completed alert jobs and {spans_deleted} expired timing spans'
+            ))
+            return
+
+        self.stop = threading.Event()
+        self.processed = 0
+        self.failed = 0
+        self.counter_lock = threading.Lock()
+
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self.request_stop)
+            signal.signal(signal.SIGINT, self.request_stop)
+
+        worker_count = max(1, options['workers'])
+        prefix = f"{socket.gethostname()}_{os.getpid()}"
+
+        self.stdout.write(self.style.SUCCESS(f'=== Alert Workers ({worker_count}) ==='))
+
+        threads = [
+            threading.Thread(
+                target=self.worker_loop,
+                args=(f"{prefix}_{n}", options['batch_size'], options['poll_interval'], options['once']),
+                name=f'alert-worker-{n}',
+                daemon=True
+            )
+            for n in range(worker_count)
+        ]
+        for thread in threads:
+            thread.start()
+
+        next_stats = time.monotonic() + options['stats_interval']
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+            if not options['once'] and time.monotonic() >= next_stats:
+                self.print_stats()
+                next_stats = time.monotonic() + options['stats_interval']
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nStopped: {self.processed} jobs completed, {self.failed} failed attempts'
+        ))
+
+    def request_stop(self, signum, frame):
+        """Signal handler: finish claimed jobs, then exit"""
+        self.stdout.write(self.style.WARNING('\nShutting down alert workers...'))
+        self.stop.set()
+
+    def worker_loop(self, worker_id, batch_size, poll_interval, once):
+        """Claim and run jobs until stopped (or, with --once, until the queue is empty)"""
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                jobs = claim_jobs(worker_id, batch_size=batch_size)
+
+                if not jobs:
+                    if once:
+                        return
+                    self.stop.wait(poll_interval)
+                    continue
+
+                for job in jobs:
+                    if not renew_claim(job):
+                        continue
+                    completed = run_job(job)
+                    with self.counter_lock:
+                        if completed:
+                            self.processed += 1
+                        else:
+                            self.failed += 1
+        finally:
+            connection.close()
+
+    def print_stats(self):
+        """Print queue depth and lag"""
+        close_old_connections()
+        stats = queue_stats()
+        self.stdout.write(
+            f"Alert queue: {stats['pending']} pending, {stats['running']} running, "
+            f"{stats['failed']} failed | lag {stats['queue_lag_seconds']:.1f}s "
+            f"(avg start lag {stats['avg_start_lag_seconds']:.1f}s)"
+        )
@@ -0,0 +1,58 @@
+"""
+Management command to send alert digests to users in digest mode
+
+Collects the PendingDigestAlert rows of every user whose digest window
+(NotificationPreferences.digest_frequency_hours) has elapsed and sends each
+of them a single summary message. Users inside their quiet hours are skipped
+and picked up by a later run.
+
+This should be run as a cron job every 5-15 minutes.
+
+Usage:
+    python manage.py send_alert_digests
+    python manage.py send_alert_digests --dry-run
+
+    # In cron (every 10 minutes):
+    */10 * * * * cd /path/to/project && python manage.py send_alert_digests
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from healthcare.alert_digest import due_digests, send_digest
+
+
+class Command(BaseCommand):
+    help = 'Send alert digests to users whose digest window has elapsed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show which digests would be sent without sending them',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        now = timezone.now()
+
+        due = due_digests(now)
+        sent_users = 0
+        sent_alerts = 0
+
+        for user_id, prefs in due:
+            try:
+                count = send_digest(user_id, prefs, now=now, dry_run=dry_run)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'✗ Error sending digest to user {user_id}: {str(e)}'))
+                continue
+
+            if count:
+                sent_users += 1
+                sent_alerts += count
+                prefix = '[DRY RUN] Would send' if dry_run else 'Sent'
+                self.stdout.write(f'{prefix} digest of {count} alert(s) to user {user_id}')
+
+        if dry_run or sent_users:
+            prefix = '[DRY RUN] Would have sent' if dry_run else 'Sent'
+            self.stdout.write(self.style.SUCCESS(
+                f'{prefix} {sent_users} digest(s) covering {sent_alerts} alert(s)'
+            ))
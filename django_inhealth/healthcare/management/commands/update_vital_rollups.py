@@ -0,0 +1,63 @@
+"""
+Management command to maintain the hourly and daily vital sign rollups
+
+Folds the readings recorded since the last run into vital_rollups_hourly and
+vital_rollups_daily (see healthcare.vital_rollups). --rebuild recomputes the
+rollups from scratch, for example after deleting readings or changing
+TIME_ZONE; with --patient only those patients are rebuilt.
+
+This should be run as a cron job every minute.
+
+Usage:
+    python manage.py update_vital_rollups
+    python manage.py update_vital_rollups --rebuild
+    python manage.py update_vital_rollups --rebuild --patient 42 --patient 57
+
+    # In cron (every minute):
+    * * * * * cd /path/to/project && python manage.py update_vital_rollups
+"""
+from django.core.management.base import BaseCommand, CommandError
+from healthcare.vital_rollups import rebuild_vital_rollups, rolled_up_through, update_vital_rollups
+
+
+class Command(BaseCommand):
+    help = 'Fold new vital signs into the hourly and daily rollups (or rebuild them)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Delete and recompute the rollups from the raw vital signs',
+        )
+        parser.add_argument(
+            '--patient',
+            type=int,
+            action='append',
+            help='With --rebuild: only rebuild this patient (repeatable)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Vital signs per transaction (default: VITAL_ROLLUP_BATCH_SIZE or 5000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['patient'] and not options['rebuild']:
+            raise CommandError('--patient requires --rebuild')
+
+        if options['rebuild'] and options['patient']:
+            rebuild_vital_rollups(options['patient'], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Rebuilt the rollups of {len(options['patient'])} patient(s)"
+            ))
+            return
+
+        if options['rebuild']:
+            processed = rebuild_vital_rollups(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt the rollups from {processed} vital signs'))
+        else:
+            processed = update_vital_rollups(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✓ Folded {processed} vital signs into the rollups'))
+
+        self.stdout.write(f'Rolled up through vital sign {rolled_up_through()}')
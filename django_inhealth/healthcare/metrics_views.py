@@ -0,0 +1,77 @@
+"""
+Alert Pipeline Metrics Views
+Exports alert pipeline latency (see alert_timing) in the Prometheus text format
+"""
+import hmac
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .alert_timing import latency_histograms
+from .permissions import is_admin
+
+METRIC_NAME = 'inhealth_alert_stage_duration_seconds'
+
+# Longest ?window= (larger values are clamped; spans are purged long before a year)
+MAX_WINDOW_MINUTES = 366 * 24 * 60
+
+
+def _authorized(request):
+    """System administrators, or scrapers presenting ALERT_METRICS_TOKEN as a bearer token"""
+    token = getattr(settings, 'ALERT_METRICS_TOKEN', '')
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and auth_header.startswith('Bearer '):
+        return hmac.compare_digest(auth_header[len('Bearer '):].strip(), token)
+    return request.user.is_authenticated and (request.user.is_superuser or is_admin(request.user))
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def render_histograms(histograms):
+    """Render latency_histograms() rows as Prometheus histogram samples"""
+    lines = [
+        f"# HELP {METRIC_NAME} Duration of vital alert pipeline stages",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for row in histograms:
+        labels = f'stage="{row["stage"]}",channel="{row["channel"]}",alert_type="{row["alert_type"]}"'
+        for bound, count in row['buckets']:
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{_format_bound(bound)}"}} {count}')
+        lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {row["count"]}')
+        lines.append(f'{METRIC_NAME}_sum{{{labels}}} {row["sum_seconds"]:.6f}')
+        lines.append(f'{METRIC_NAME}_count{{{labels}}} {row["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+@require_GET
+def alert_latency_metrics(request):
+    """
+    Alert pipeline stage latency histograms
+
+    Counts cover all retained spans (see purge_timing_spans); pass
+    ?window=<minutes> to only count spans from the last few minutes (at most
+    MAX_WINDOW_MINUTES).
+    """
+    if not _authorized(request):
+        return HttpResponseForbidden('Forbidden')
+
+    since = None
+    window = request.GET.get('window')
+    if window:
+        try:
+            minutes = int(window)
+            if minutes < 1:
+                raise ValueError(window)
+            since = timezone.now() - timedelta(minutes=min(minutes, MAX_WINDOW_MINUTES))
+        except (ValueError, OverflowError):
+            return HttpResponse('window must be a positive whole number of minutes', status=400)
+
+    return HttpResponse(
+        render_histograms(latency_histograms(since)),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,17 @@
+# Generated migration to add a composite index for remote-monitoring encounter lookups
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0017_add_familyhistory_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='encounter',
+            index=models.Index(fields=['patient', 'encounter_type', '-encounter_date'], name='idx_encounter_patient_type'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated migration to add the alert evaluation job queue
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0018_add_encounter_patient_type_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertEvaluationJob',
+            fields=[
+                ('job_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('dedupe_key', models.CharField(help_text='One job per vital sign (vital_sign:<id>)', max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('enqueued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time the job may run (retry backoff)')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('alert_triggered', models.BooleanField(default=False)),
+                ('last_error', models.TextField(blank=True)),
+                ('vital_sign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_jobs', to='healthcare.vitalsign')),
+            ],
+            options={
+                'verbose_name': 'Alert Evaluation Job',
+                'verbose_name_plural': 'Alert Evaluation Jobs',
+                'db_table': 'alert_evaluation_jobs',
+                'ordering': ['enqueued_at'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='idx_alert_job_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated migration to add the alert digest pending table
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('healthcare', '0019_add_alert_evaluation_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingDigestAlert',
+            fields=[
+                ('pending_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('patient_name', models.CharField(max_length=200)),
+                ('alert_type', models.CharField(choices=[('critical', 'Critical'), ('warning', 'Warning')], max_length=20)),
+                ('summary', models.CharField(help_text='Short list of the critical vitals', max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('patient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='healthcare.patient')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_digest_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Pending Digest Alert',
+                'verbose_name_plural': 'Pending Digest Alerts',
+                'db_table': 'pending_digest_alerts',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='idx_digest_user_created')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated migration to add the indexed escalation deadline to vital sign alerts
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_escalation_deadlines(apps, schema_editor):
+    """Set the deadline of alerts that are still waiting for a patient response"""
+    VitalSignAlertResponse = apps.get_model('healthcare', 'VitalSignAlertResponse')
+
+    pending = VitalSignAlertResponse.objects.filter(
+        patient_response_status='pending',
+        auto_escalated=False,
+        created_at__isnull=False
+    ).only('alert_id', 'created_at', 'timeout_minutes')
+
+    batch = []
+    for alert in pending.iterator():
+        alert.escalation_deadline = alert.created_at + timedelta(minutes=alert.timeout_minutes)
+        batch.append(alert)
+        if len(batch) >= 500:
+            VitalSignAlertResponse.objects.bulk_update(batch, ['escalation_deadline'])
+            batch = []
+    if batch:
+        VitalSignAlertResponse.objects.bulk_update(batch, ['escalation_deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0020_add_pending_digest_alerts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vitalsignalertresponse',
+            name='escalation_deadline',
+            field=models.DateTimeField(blank=True, help_text='When this alert auto-escalates if the patient has not responded (cleared once handled)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vitalsignalertresponse',
+            index=models.Index(fields=['escalation_deadline'], name='idx_alert_escalation_deadline'),
+        ),
+        migrations.RunPython(backfill_escalation_deadlines, migrations.RunPython.noop),
+    ]
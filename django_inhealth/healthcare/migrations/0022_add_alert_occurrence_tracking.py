@@ -0,0 +1,27 @@
+# Generated migration to track repeat readings folded into vital sign alerts
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0021_add_alert_escalation_deadline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vitalsignalertresponse',
+            name='occurrence_count',
+            field=models.IntegerField(default=1, help_text='Readings folded into this alert'),
+        ),
+        migrations.AddField(
+            model_name='vitalsignalertresponse',
+            name='last_occurrence_at',
+            field=models.DateTimeField(blank=True, help_text='Latest reading folded into this alert', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vitalsignalertresponse',
+            index=models.Index(fields=['patient', 'last_occurrence_at'], name='idx_alert_patient_last_seen'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated migration to record alert pipeline stage timings
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0022_add_alert_occurrence_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertevaluationjob',
+            name='received_at',
+            field=models.DateTimeField(blank=True, help_text='When the device request carrying the reading arrived', null=True),
+        ),
+        migrations.CreateModel(
+            name='AlertTimingSpan',
+            fields=[
+                ('span_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stage', models.CharField(choices=[('ingest', 'Ingest (device request to queued)'), ('queue_wait', 'Queue wait'), ('classify', 'Classify vitals'), ('create_alert', 'Create alert record'), ('send', 'Channel send'), ('delivered', 'Device request to message sent')], max_length=20)),
+                ('channel', models.CharField(blank=True, help_text='email, sms or whatsapp for send/delivered spans', max_length=10)),
+                ('alert_type', models.CharField(blank=True, max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('duration_ms', models.FloatField()),
+                ('success', models.BooleanField(default=True)),
+                ('alert_response', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='timing_spans', to='healthcare.vitalsignalertresponse')),
+                ('vital_sign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_timing_spans', to='healthcare.vitalsign')),
+            ],
+            options={
+                'verbose_name': 'Alert Timing Span',
+                'verbose_name_plural': 'Alert Timing Spans',
+                'db_table': 'alert_timing_spans',
+                'indexes': [models.Index(fields=['stage', 'started_at'], name='idx_alert_span_stage')],
+            },
+        ),
+    ]
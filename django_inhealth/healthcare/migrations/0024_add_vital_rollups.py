@@ -0,0 +1,67 @@
+# Generated migration for hourly and daily vital sign rollups
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0023_add_alert_timing_spans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyVitalRollup',
+            fields=[
+                ('period_start', models.DateTimeField()),
+                ('reading_count', models.IntegerField(default=0)),
+                ('critical_count', models.IntegerField(default=0, help_text='Readings with at least one orange/red/blue vital')),
+                ('stats', models.JSONField(default=dict, help_text='Per vital: count, sum, min, max, last, critical and min_at/max_at/last_at')),
+                ('last_recorded_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rollup_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='healthcare.patient')),
+            ],
+            options={
+                'verbose_name': 'Hourly Vital Rollup',
+                'verbose_name_plural': 'Hourly Vital Rollups',
+                'db_table': 'vital_rollups_hourly',
+                'ordering': ['period_start'],
+                'constraints': [models.UniqueConstraint(fields=('patient', 'period_start'), name='uniq_vital_rollup_hour')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyVitalRollup',
+            fields=[
+                ('period_start', models.DateTimeField()),
+                ('reading_count', models.IntegerField(default=0)),
+                ('critical_count', models.IntegerField(default=0, help_text='Readings with at least one orange/red/blue vital')),
+                ('stats', models.JSONField(default=dict, help_text='Per vital: count, sum, min, max, last, critical and min_at/max_at/last_at')),
+                ('last_recorded_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rollup_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='healthcare.patient')),
+            ],
+            options={
+                'verbose_name': 'Daily Vital Rollup',
+                'verbose_name_plural': 'Daily Vital Rollups',
+                'db_table': 'vital_rollups_daily',
+                'ordering': ['period_start'],
+                'constraints': [models.UniqueConstraint(fields=('patient', 'period_start'), name='uniq_vital_rollup_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VitalRollupCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_vital_signs_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Vital Rollup Checkpoint',
+                'verbose_name_plural': 'Vital Rollup Checkpoints',
+                'db_table': 'vital_rollup_checkpoints',
+            },
+        ),
+    ]
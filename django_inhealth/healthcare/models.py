@@ -351,6 +351,7 @@ class Encounter(models.Model):
         ordering = ['-encounter_date']
         indexes = [
             models.Index(fields=['-encounter_date'], name='idx_encounter_date'),
+            models.Index(fields=['patient', 'encounter_type', '-encounter_date'], name='idx_encounter_patient_type'),
         ]
 
     def __str__(self):
@@ -369,10 +370,20 @@ class VitalSign(models.Model):
         ('kg', 'Kilograms'),
     ]
 
+    DATA_SOURCES = [
+        ('manual', 'Manual Entry'),
+        ('device', 'IoT Device'),
+    ]
+
     vital_signs_id = models.AutoField(primary_key=True)
     encounter = models.ForeignKey(Encounter, on_delete=models.CASCADE, related_name='vital_signs')
     recorded_at = models.DateTimeField(auto_now_add=True)
     recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='recorded_vitals')
+    recorded_by_nurse = models.ForeignKey('Nurse', on_delete=models.SET_NULL, null=True, blank=True, related_name='recorded_vitals')
+
+    # Where the reading came from (columns added in migration 0007)
+    data_source = models.CharField(max_length=10, choices=DATA_SOURCES, default='manual')
+    device = models.ForeignKey('Device', on_delete=models.SET_NULL, null=True, blank=True, related_name='vitals_recorded')
 
     # Vital measurements
     blood_pressure_systolic = models.IntegerField(null=True, blank=True)
@@ -412,6 +423,41 @@ class VitalSign(models.Model):
             return f"{self.temperature}°{self.temperature_unit}"
         return "N/A"
 
+    # Status methods return (color, contact_level); bands live in vital_classifier
+    def get_heart_rate_status(self):
+        from .vital_classifier import classify_value
+        return classify_value('heart_rate', self.heart_rate)
+
+    def get_sbp_status(self):
+        from .vital_classifier import classify_value
+        return classify_value('blood_pressure_systolic', self.blood_pressure_systolic)
+
+    def get_dbp_status(self):
+        from .vital_classifier import classify_value
+        return classify_value('blood_pressure_diastolic', self.blood_pressure_diastolic)
+
+    def get_temperature_status(self):
+        from .vital_classifier import classify_value
+        return classify_value('temperature', self.temperature, self.temperature_unit)
+
+    def get_respiratory_rate_status(self):
+        from .vital_classifier import classify_value
+        return classify_value('respiratory_rate', self.respiratory_rate)
+
+    def get_oxygen_saturation_status(self):
+        from .vital_classifier import classify_value
+        return classify_value('oxygen_saturation', self.oxygen_saturation)
+
+    def get_glucose_status(self):
+        from .vital_classifier import classify_value
+        return classify_value('glucose', self.glucose)
+
+    def has_critical_values(self):
+        """True if any vital is in the orange, red or blue band"""
+        from .vital_classifier import classify_columns, columns_from_vitals
+        columns, units = columns_from_vitals([self])
+        return classify_columns(columns, units, use_numpy=False).critical_count() > 0
+
 
 class Diagnosis(models.Model):
     """Diagnosis model for patient diagnoses"""
@@ -948,6 +994,40 @@ class NotificationPreferences(models.Model):
     def __str__(self):
         return f"Notification Preferences for {self.user.username}"
 
+    def is_quiet_hours(self, now=None):
+        """Whether the given time (default: now, local time) falls within quiet hours"""
+        if not self.enable_quiet_hours or not self.quiet_start_time or not self.quiet_end_time:
+            return False
+
+        current = timezone.localtime(now or timezone.now()).time()
+        if self.quiet_start_time <= self.quiet_end_time:
+            return self.quiet_start_time <= current < self.quiet_end_time
+        # Window crosses midnight (e.g. 22:00 - 08:00)
+        return current >= self.quiet_start_time or current < self.quiet_end_time
+
+    def _channel_allows(self, channel, alert_type):
+        if not getattr(self, f'{channel}_enabled'):
+            return False
+        if alert_type != 'emergency' and self.is_quiet_hours():
+            return False
+        return getattr(self, f'{channel}_{alert_type}', getattr(self, f'{channel}_critical'))
+
+    def should_send_email(self, alert_type):
+        """Whether an alert of this type should be emailed now"""
+        return self._channel_allows('email', alert_type)
+
+    def should_send_sms(self, alert_type):
+        """Whether an alert of this type should be sent by SMS now"""
+        return self._channel_allows('sms', alert_type)
+
+    def should_send_whatsapp(self, alert_type):
+        """Whether an alert of this type should be sent by WhatsApp now"""
+        return self._channel_allows('whatsapp', alert_type)
+
+    def uses_digest(self, alert_type):
+        """Whether alerts of this type are collected into the digest (emergencies never are)"""
+        return self.digest_mode and alert_type != 'emergency'
+
 
 class VitalSignAlertResponse(models.Model):
     """
@@ -988,6 +1068,10 @@ class VitalSignAlertResponse(models.Model):
     timeout_minutes = models.IntegerField(default=15, help_text='Minutes to wait for patient response before auto-escalation')
     auto_escalated = models.BooleanField(default=False, help_text='Was this alert auto-escalated due to no response?')
     auto_escalation_time = models.DateTimeField(null=True, blank=True)
+    escalation_deadline = models.DateTimeField(
+        null=True, blank=True,
+        help_text='When this alert auto-escalates if the patient has not responded (cleared once handled)'
+    )
 
     # Notification tracking
     doctor_notified = models.BooleanField(default=False)
@@ -1001,6 +1085,10 @@ class VitalSignAlertResponse(models.Model):
     # Vital signs that triggered the alert
     critical_vitals_json = models.JSONField(default=dict, help_text='JSON data of vital signs that triggered this alert')
 
+    # Repeat readings folded into this alert (see alert_suppression)
+    occurrence_count = models.IntegerField(default=1, help_text='Readings folded into this alert')
+    last_occurrence_at = models.DateTimeField(null=True, blank=True, help_text='Latest reading folded into this alert')
+
     created_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(null=True, blank=True)
 
@@ -1013,11 +1101,59 @@ class VitalSignAlertResponse(models.Model):
             models.Index(fields=['response_token'], name='idx_response_token'),
             models.Index(fields=['patient_response_status'], name='idx_patient_response'),
             models.Index(fields=['auto_escalated'], name='idx_auto_escalated'),
+            models.Index(fields=['escalation_deadline'], name='idx_alert_escalation_deadline'),
+            models.Index(fields=['patient', 'last_occurrence_at'], name='idx_alert_patient_last_seen'),
         ]
 
     def __str__(self):
         return f"Alert {self.alert_id} - {self.patient.get_full_name()} - {self.get_alert_type_display()}"
 
+    def save(self, *args, **kwargs):
+        now = timezone.now()
+        if self.created_at is None:
+            self.created_at = now
+        self.updated_at = now
+
+        # Keep the escalation deadline in step with the alert state so the
+        # escalation scheduler only ever looks at alerts that can still escalate
+        if self.patient_response_status == 'pending' and not self.auto_escalated:
+            if self.escalation_deadline is None:
+                self.escalation_deadline = self.created_at + timezone.timedelta(minutes=self.timeout_minutes)
+        else:
+            self.escalation_deadline = None
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'updated_at', 'escalation_deadline'}
+
+        super().save(*args, **kwargs)
+
+    def should_auto_escalate(self, now=None):
+        """Check if alert should be auto-escalated (no patient response before the deadline)"""
+        if self.patient_response_status != 'pending' or self.auto_escalated:
+            return False
+        if self.escalation_deadline is None:
+            return False
+        return (now or timezone.now()) >= self.escalation_deadline
+
+    def auto_escalate(self):
+        """
+        Auto-escalate for patient safety when the patient has not responded
+
+        The doctor is always notified; emergencies also go to EMS.
+        """
+        from .vital_alerts import send_alert_to_providers
+
+        self.auto_escalated = True
+        self.auto_escalation_time = timezone.now()
+        self.patient_response_status = 'timeout'
+        self.patient_wants_doctor = True
+        if self.alert_type == 'emergency':
+            self.patient_wants_ems = True
+        self.save()
+
+        send_alert_to_providers(self)
+
     def record_patient_response(self, status, wants_doctor=False, wants_nurse=False, wants_ems=False, response_method='email'):
         """Record patient's response to the alert"""
         self.patient_response_status = status
@@ -1043,6 +1179,208 @@ class VitalSignAlertResponse(models.Model):
         self.save()
 
 
+class AlertEvaluationJob(models.Model):
+    """
+    Queued alert evaluation for a vital sign
+
+    Device ingestion enqueues one job per vital sign instead of running
+    process_vital_alerts (SMTP/Twilio) inside the request. Jobs are claimed
+    by the run_alert_workers command with SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    job_id = models.BigAutoField(primary_key=True)
+    dedupe_key = models.CharField(max_length=100, unique=True, help_text='One job per vital sign (vital_sign:<id>)')
+    vital_sign = models.ForeignKey(VitalSign, on_delete=models.CASCADE, related_name='alert_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    received_at = models.DateTimeField(null=True, blank=True, help_text='When the device request carrying the reading arrived')
+    enqueued_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now, help_text='Earliest time the job may run (retry backoff)')
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    alert_triggered = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'alert_evaluation_jobs'
+        verbose_name = 'Alert Evaluation Job'
+        verbose_name_plural = 'Alert Evaluation Jobs'
+        ordering = ['enqueued_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='idx_alert_job_status'),
+        ]
+
+    def __str__(self):
+        return f"Alert job {self.job_id} - vital sign {self.vital_sign_id} - {self.status}"
+
+    @property
+    def queue_lag_seconds(self):
+        """Seconds between enqueue and the (latest) start of evaluation"""
+        if not self.started_at:
+            return None
+        return (self.started_at - self.enqueued_at).total_seconds()
+
+
+class AlertTimingSpan(models.Model):
+    """
+    Duration of one stage of the vital alert pipeline for one reading
+
+    Written by alert_timing for readings that raised an alert and exported as
+    latency histograms by the alert latency metrics endpoint. 'send' and
+    'delivered' spans are recorded per care team message, with its channel.
+    """
+    STAGE_CHOICES = [
+        ('ingest', 'Ingest (device request to queued)'),
+        ('queue_wait', 'Queue wait'),
+        ('classify', 'Classify vitals'),
+        ('create_alert', 'Create alert record'),
+        ('send', 'Channel send'),
+        ('delivered', 'Device request to message sent'),
+    ]
+
+    span_id = models.BigAutoField(primary_key=True)
+    vital_sign = models.ForeignKey(VitalSign, on_delete=models.CASCADE, related_name='alert_timing_spans')
+    alert_response = models.ForeignKey(VitalSignAlertResponse, on_delete=models.CASCADE, null=True, blank=True, related_name='timing_spans')
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    channel = models.CharField(max_length=10, blank=True, help_text='email, sms or whatsapp for send/delivered spans')
+    alert_type = models.CharField(max_length=20, blank=True)
+    started_at = models.DateTimeField()
+    duration_ms = models.FloatField()
+    success = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'alert_timing_spans'
+        verbose_name = 'Alert Timing Span'
+        verbose_name_plural = 'Alert Timing Spans'
+        indexes = [
+            models.Index(fields=['stage', 'started_at'], name='idx_alert_span_stage'),
+        ]
+
+    def __str__(self):
+        channel = f" ({self.channel})" if self.channel else ""
+        return f"{self.stage}{channel} - vital sign {self.vital_sign_id} - {self.duration_ms:.0f} ms"
+
+
+class PendingDigestAlert(models.Model):
+    """
+    Alert held for a user's next digest
+
+    Users with NotificationPreferences.digest_mode get one summary message per
+    digest window instead of a message per alert. The send_alert_digests
+    command renders and sends the rows for each user whose window has elapsed
+    and deletes them.
+    """
+    ALERT_TYPE_CHOICES = [
+        ('critical', 'Critical'),
+        ('warning', 'Warning'),
+    ]
+
+    pending_id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pending_digest_alerts')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    patient_name = models.CharField(max_length=200)
+    alert_type = models.CharField(max_length=20, choices=ALERT_TYPE_CHOICES)
+    summary = models.CharField(max_length=255, help_text='Short list of the critical vitals')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'pending_digest_alerts'
+        verbose_name = 'Pending Digest Alert'
+        verbose_name_plural = 'Pending Digest Alerts'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='idx_digest_user_created'),
+        ]
+
+    def __str__(self):
+        return f"Digest alert for {self.user.username} - {self.patient_name} - {self.alert_type}"
+
+
+class VitalSignRollup(models.Model):
+    """
+    Summary of one patient's vital signs over one period (hour or day)
+
+    Maintained incrementally by vital_rollups from a high-water mark on
+    vital_signs_id, so long-range charts and trends read one row per period
+    instead of every reading. stats holds, per vital, the count, sum, min,
+    max and last value (temperature in Fahrenheit), when the min/max/last
+    readings were recorded, and how many readings were orange or above.
+    """
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='+')
+    period_start = models.DateTimeField()
+    reading_count = models.IntegerField(default=0)
+    critical_count = models.IntegerField(default=0, help_text='Readings with at least one orange/red/blue vital')
+    stats = models.JSONField(default=dict, help_text='Per vital: count, sum, min, max, last, critical and min_at/max_at/last_at')
+    last_recorded_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def mean(self, vital):
+        """Mean of one vital over the period, or None without readings"""
+        vital_stats = self.stats.get(vital)
+        if not vital_stats or not vital_stats['count']:
+            return None
+        return vital_stats['sum'] / vital_stats['count']
+
+
+class HourlyVitalRollup(VitalSignRollup):
+    """Vital signs of a patient summarized per hour"""
+    rollup_id = models.BigAutoField(primary_key=True)
+
+    class Meta:
+        db_table = 'vital_rollups_hourly'
+        verbose_name = 'Hourly Vital Rollup'
+        verbose_name_plural = 'Hourly Vital Rollups'
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'period_start'], name='uniq_vital_rollup_hour'),
+        ]
+
+    def __str__(self):
+        return f"Vitals of patient {self.patient_id} - hour {self.period_start:%Y-%m-%d %H:00} - {self.reading_count} readings"
+
+
+class DailyVitalRollup(VitalSignRollup):
+    """Vital signs of a patient summarized per day"""
+    rollup_id = models.BigAutoField(primary_key=True)
+
+    class Meta:
+        db_table = 'vital_rollups_daily'
+        verbose_name = 'Daily Vital Rollup'
+        verbose_name_plural = 'Daily Vital Rollups'
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'period_start'], name='uniq_vital_rollup_day'),
+        ]
+
+    def __str__(self):
+        return f"Vitals of patient {self.patient_id} - day {self.period_start:%Y-%m-%d} - {self.reading_count} readings"
+
+
+class VitalRollupCheckpoint(models.Model):
+    """Highest vital_signs_id folded into the vital sign rollups"""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_vital_signs_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'vital_rollup_checkpoints'
+        verbose_name = 'Vital Rollup Checkpoint'
+        verbose_name_plural = 'Vital Rollup Checkpoints'
+
+    def __str__(self):
+        return f"{self.name}: vital sign {self.last_vital_signs_id}"
+
+
 class AIProposedTreatmentPlan(models.Model):
     """
     AI-generated treatment plan proposals
@@ -12,6 +12,9 @@ import secrets
 import hashlib
 from datetime import timedelta
 from .models import Device, Patient
+from .device_alert_rules import rule_predicate
+from .device_auth_cache import verified_key_cache
+from .usage_counters import get_usage_counter
 
 
 class DeviceAPIKey(models.Model):
@@ -49,9 +52,28 @@ class DeviceAPIKey(models.Model):
             models.Index(fields=['device', 'is_active']),
         ]
 
+    # Fields written on every authenticated request; saving only these
+    # does not change whether a key is valid
+    USAGE_FIELDS = {'last_used', 'request_count_today', 'last_reset_date'}
+
     def __str__(self):
         return f"{self.device.device_name} - {self.key_name} ({self.key_prefix}...)"
 
+    def save(self, *args, **kwargs):
+        """Save and drop cached verifications when key state changes"""
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) - self.USAGE_FIELDS:
+            verified_key_cache.invalidate(self.pk)
+
+    def delete(self, *args, **kwargs):
+        """Delete and drop cached verifications"""
+        api_key_id = self.pk
+        result = super().delete(*args, **kwargs)
+        verified_key_cache.invalidate(api_key_id)
+        return result
+
     @staticmethod
     def generate_key():
         """Generate a new API key"""
@@ -89,20 +111,33 @@ class DeviceAPIKey(models.Model):
         if self.expires_at and timezone.now() > self.expires_at:
             return False
 
-        return check_password(key, self.hashed_key)
+        # Skip PBKDF2 for keys verified recently against this same row
+        if verified_key_cache.is_verified(self, key):
+            return True
+
+        if check_password(key, self.hashed_key):
+            verified_key_cache.store(self, key)
+            return True
+
+        return False
 
     def record_usage(self):
-        """Record API key usage"""
+        """
+        Record API key usage
+
+        The increment is coalesced in memory and applied to the row with an
+        atomic update by the usage flusher (see usage_counters.py).
+        """
         now = timezone.now()
 
-        # Reset counter if it's a new day
+        # Keep this instance consistent for the rest of the request
         if self.last_reset_date != now.date():
             self.request_count_today = 0
             self.last_reset_date = now.date()
-
         self.last_used = now
         self.request_count_today += 1
-        self.save(update_fields=['last_used', 'request_count_today', 'last_reset_date'])
+
+        get_usage_counter().record(self.pk, now)
 
 
 class DeviceDataReading(models.Model):
@@ -260,15 +295,6 @@ class DeviceAlertRule(models.Model):
         if not self.is_active:
             return False
 
-        if self.condition == 'gt':
-            return value > self.threshold_value
-        elif self.condition == 'lt':
-            return value < self.threshold_value
-        elif self.condition == 'eq':
-            return value == self.threshold_value
-        elif self.condition == 'gte':
-            return value >= self.threshold_value
-        elif self.condition == 'lte':
-            return value <= self.threshold_value
-
-        return False
+        # Same compiled predicate the rule engine uses
+        predicate = rule_predicate(self.condition, self.threshold_value)
+        return predicate is not None and predicate(float(value))
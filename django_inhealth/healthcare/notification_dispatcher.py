@@ -0,0 +1,421 @@
+"""
+Outbound Notification Dispatcher
+
+Sends vital sign alert emails, SMS and WhatsApp messages from a bounded
+worker pool instead of one at a time on the caller's thread:
+
+    - all messages for one alert are sent in parallel (send_all)
+    - each worker thread keeps its SMTP connection and Twilio client (and so
+      its HTTP session) open between messages instead of reconnecting per
+      recipient
+    - each channel has a token-bucket rate limit shared by all workers
+    - transient failures are retried with exponential backoff
+
+Settings:
+    NOTIFICATION_BACKEND: 'live' (default: SMTP + Twilio), 'file' (append JSON
+        lines to NOTIFICATION_FILE_PATH) or 'console' (log messages); the last
+        two never contact a provider and are meant for development and load tests
+    NOTIFICATION_FILE_PATH: Output file for the 'file' backend
+        (default 'notifications.log')
+    NOTIFICATION_WORKERS: Worker threads per process (default 8)
+    NOTIFICATION_RATE_LIMITS: Messages per second per channel
+        (default {'email': 10, 'sms': 5, 'whatsapp': 5}; 0 disables the limit)
+    NOTIFICATION_MAX_ATTEMPTS: Attempts per message (default 3)
+    NOTIFICATION_RETRY_SECONDS: First retry delay, doubled per attempt (default 1.0)
+"""
+import atexit
+import json
+import logging
+import os
+import smtplib
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('email', 'sms', 'whatsapp')
+
+DEFAULT_RATE_LIMITS = {'email': 10, 'sms': 5, 'whatsapp': 5}
+
+OutboundMessage = namedtuple('OutboundMessage', ['channel', 'to', 'body', 'subject', 'html_body'])
+OutboundMessage.__new__.__defaults__ = ('', '')
+
+
+def email_message(to, subject, body='', html_body=''):
+    """OutboundMessage for the email channel"""
+    return OutboundMessage('email', to, body, subject, html_body)
+
+
+def sms_message(to, body):
+    """OutboundMessage for the SMS channel (to: E.164 number)"""
+    return OutboundMessage('sms', to, body)
+
+
+def whatsapp_message(to, body):
+    """OutboundMessage for the WhatsApp channel (to: E.164 number)"""
+    return OutboundMessage('whatsapp', to, body)
+
+
+def whatsapp_sender():
+    """Twilio WhatsApp sender address from settings"""
+    whatsapp_from = getattr(settings, 'TWILIO_WHATSAPP_NUMBER', None)
+    if not whatsapp_from:
+        # Twilio WhatsApp sandbox format
+        return f"whatsapp:{settings.TWILIO_PHONE_NUMBER}"
+    if not whatsapp_from.startswith('whatsapp:'):
+        return f"whatsapp:{whatsapp_from}"
+    return whatsapp_from
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts up to `rate`"""
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+def is_retryable(error):
+    """
+    Whether a send failure is worth retrying
+
+    Permanent rejections (SMTP 5xx, refused recipients, Twilio 4xx other than
+    429) are not retried; dropped connections, timeouts, SMTP 4xx and Twilio
+    5xx responses are.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code < 500
+    status = getattr(error, 'status', None)
+    if isinstance(status, int) and 400 <= status < 500 and status != 429:
+        return False
+    return True
+
+
+class LiveBackend:
+    """SMTP through Django's email backend, SMS/WhatsApp through Twilio"""
+
+    def __init__(self):
+        self._local = threading.local()
+        # Every worker's open SMTP connection (connection -> owning pid), so
+        # close() can reach the connections held by the pool threads
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+
+    def send(self, message):
+        if message.channel == 'email':
+            self._send_email(message)
+        else:
+            self._send_twilio(message)
+
+    def _send_email(self, message):
+        connection = getattr(self._local, 'smtp', None)
+        if connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            self._local.smtp = connection
+            with self._connections_lock:
+                self._connections[connection] = os.getpid()
+
+        email = EmailMultiAlternatives(
+            message.subject,
+            message.body,
+            settings.DEFAULT_FROM_EMAIL,
+            [message.to],
+            connection=connection
+        )
+        if message.html_body:
+            email.attach_alternative(message.html_body, 'text/html')
+
+        try:
+            email.send()
+        except Exception:
+            # Drop the connection; the next message (or retry) reconnects
+            self._close_smtp()
+            raise
+
+    def _close_smtp(self):
+        connection = getattr(self._local, 'smtp', None)
+        self._local.smtp = None
+        if connection is not None:
+            with self._connections_lock:
+                self._connections.pop(connection, None)
+            self._close_connection(connection)
+
+    def _close_connection(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _send_twilio(self, message):
+        client = getattr(self._local, 'twilio', None)
+        if client is None:
+            from twilio.rest import Client
+
+            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+            self._local.twilio = client
+
+        if message.channel == 'whatsapp':
+            sender, to = whatsapp_sender(), f"whatsapp:{message.to}"
+        else:
+            sender, to = settings.TWILIO_PHONE_NUMBER, message.to
+
+        client.messages.create(body=message.body, from_=sender, to=to)
+
+    def close(self):
+        """
+        Close the SMTP connections of every worker thread
+
+        Call once the worker pool has shut down. Connections inherited from a
+        parent process are forgotten rather than closed, so a forked child
+        does not end the parent's SMTP sessions.
+        """
+        pid = os.getpid()
+        with self._connections_lock:
+            connections, self._connections = self._connections, {}
+        for connection, owner in connections.items():
+            if owner == pid:
+                self._close_connection(connection)
+        self._local.smtp = None
+
+
+class FileBackend:
+    """Append each message as a JSON line to a local file"""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'NOTIFICATION_FILE_PATH', 'notifications.log')
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        line = json.dumps(dict(message._asdict(), sent_at=timezone.now().isoformat()))
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as output:
+                output.write(line + '\n')
+
+    def close(self):
+        pass
+
+
+class ConsoleBackend:
+    """Log each message instead of sending it"""
+
+    def send(self, message):
+        logger.info(f"[{message.channel}] to {message.to}: {message.subject or message.body[:80]}")
+
+    def close(self):
+        pass
+
+
+def make_backend(name):
+    if name == 'live':
+        return LiveBackend()
+    if name == 'file':
+        return FileBackend()
+    if name == 'console':
+        return ConsoleBackend()
+    raise ValueError(f"Unknown notification backend: {name}")
+
+
+class NotificationDispatcher:
+    """Bounded worker pool with per-channel rate limits and retries"""
+
+    def __init__(self, backend=None, workers=None, rate_limits=None, max_attempts=None, retry_seconds=None):
+        """
+        Args:
+            backend: Backend name ('live', 'file', 'console') or a backend object
+                with send(message) and close() (default: NOTIFICATION_BACKEND)
+        """
+        if backend is None or isinstance(backend, str):
+            self.backend_name = backend or getattr(settings, 'NOTIFICATION_BACKEND', 'live')
+            self.backend = make_backend(self.backend_name)
+        else:
+            self.backend_name = type(backend).__name__
+            self.backend = backend
+        self.workers = workers or getattr(settings, 'NOTIFICATION_WORKERS', 8)
+        self.max_attempts = max_attempts or getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 3)
+        self.retry_seconds = retry_seconds if retry_seconds is not None else getattr(
+            settings, 'NOTIFICATION_RETRY_SECONDS', 1.0
+        )
+
+        limits = dict(DEFAULT_RATE_LIMITS)
+        limits.update(rate_limits or getattr(settings, 'NOTIFICATION_RATE_LIMITS', {}))
+        self.rate_limiters = {channel: RateLimiter(limits.get(channel, 0)) for channel in CHANNELS}
+
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def _get_executor(self):
+        """Create the worker pool (again after a fork)"""
+        pid = os.getpid()
+        if self._executor is not None and self._pid == pid:
+            return self._executor
+
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='notification-sender'
+                )
+                self._pid = pid
+            return self._executor
+
+    def deliver(self, message):
+        """
+        Send one message on the current thread, with rate limiting and retries
+
+        Returns:
+            bool: True if the message was sent
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            self.rate_limiters[message.channel].acquire()
+            try:
+                self.backend.send(message)
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    logger.error(f"Failed to send {message.channel} to {message.to}: {str(e)}")
+                    with self._stats_lock:
+                        self.failed += 1
+                    return False
+
+                delay = self.retry_seconds * (2 ** (attempt - 1))
+                logger.warning(
+                    f"Sending {message.channel} to {message.to} failed (attempt {attempt}), "
+                    f"retrying in {delay:.1f}s: {str(e)}"
+                )
+                with self._stats_lock:
+                    self.retried += 1
+                time.sleep(delay)
+                continue
+
+            with self._stats_lock:
+                self.sent += 1
+            return True
+
+        return False
+
+    def _deliver_and_report(self, message, on_done):
+        sent = self.deliver(message)
+        try:
+            on_done(message, sent)
+        except Exception as e:
+            logger.error(f"Notification callback failed for {message.channel} to {message.to}: {str(e)}")
+        return sent
+
+    def submit(self, message, on_done=None):
+        """
+        Queue a message without waiting; returns a Future resolving to bool
+
+        on_done(message, sent) is called on the worker thread once the message
+        is handled, before the Future resolves.
+        """
+        if on_done is None:
+            return self._get_executor().submit(self.deliver, message)
+        return self._get_executor().submit(self._deliver_and_report, message, on_done)
+
+    def send_all(self, messages, timeout=None, on_done=None):
+        """
+        Send messages in parallel and wait for them
+
+        Args:
+            messages: Iterable of OutboundMessage (None entries are skipped)
+            timeout: Maximum seconds to wait (None waits for all)
+            on_done: Optional callable(message, sent) run as each message is handled
+
+        Returns:
+            list: bool per non-None message, in order (False if not finished in time)
+        """
+        futures = [self.submit(message, on_done) for message in messages if message is not None]
+        if not futures:
+            return []
+
+        wait(futures, timeout=timeout)
+        return [future.done() and not future.exception() and future.result() for future in futures]
+
+    def send(self, message):
+        """Send one message through the pool and wait for it"""
+        results = self.send_all([message])
+        return bool(results and results[0])
+
+    def stats(self):
+        return {
+            'backend': self.backend_name,
+            'workers': self.workers,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+        }
+
+    def shutdown(self):
+        """Wait for queued messages, then close the workers' connections"""
+        executor = self._executor
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=True)
+        self._executor = None
+        self.backend.close()
+
+
+# Process-wide dispatcher used by vital_alerts (created on first use)
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_notification_dispatcher():
+    """Return the process-wide dispatcher, configuring it from settings on first use"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NotificationDispatcher()
+                atexit.register(_dispatcher.shutdown)
+    return _dispatcher
+
+
+def set_notification_dispatcher(dispatcher):
+    """
+    Replace the process-wide dispatcher (e.g. with a stand-in backend for
+    benchmarks)
+
+    Returns:
+        The previous dispatcher (None if none was created yet)
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        previous, _dispatcher = _dispatcher, dispatcher
+    return previous
+
+
+def dispatch_notifications(messages, timeout=None, on_done=None):
+    """Send a batch of OutboundMessages in parallel through the process-wide dispatcher"""
+    return get_notification_dispatcher().send_all(messages, timeout=timeout, on_done=on_done)
@@ -80,6 +80,33 @@ def can_view_patient(user, patient):
     return False
 
 
+def can_view_vital_charts(user, patient):
+    """
+    Check if user can view a patient's vital sign charts: the primary doctor,
+    nurses of the doctor's hospital, the patient and system admins
+    """
+    if is_admin(user):
+        return True
+
+    if is_doctor(user):
+        provider = get_provider_for_user(user)
+        return provider is not None and patient.primary_doctor_id == provider.pk
+
+    if is_nurse(user):
+        nurse = getattr(user, 'nurse_profile', None)
+        if nurse is None:
+            return False
+        if not nurse.hospital_id:
+            return True
+        return patient.primary_doctor is not None and patient.primary_doctor.hospital_id == nurse.hospital_id
+
+    if is_patient(user):
+        user_patient = get_patient_for_user(user)
+        return user_patient is not None and user_patient.pk == patient.pk
+
+    return False
+
+
 def can_edit_patient(user, patient):
     """Check if user can edit a specific patient's information"""
     # System admins, office admins, and doctors can edit patient information
@@ -5,6 +5,7 @@ Handles serialization/deserialization of device data for the REST API.
 """
 
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
 from .models import Device, Patient, VitalSign
 from .models_iot import DeviceAPIKey, DeviceDataReading, DeviceActivityLog, DeviceAlertRule
@@ -103,7 +104,7 @@ class BulkVitalSignsSerializer(serializers.Serializer):
     readings = serializers.ListField(
         child=VitalSignsDataSerializer(),
         min_length=1,
-        max_length=100,  # Limit bulk uploads to 100 readings
+        max_length=getattr(settings, 'IOT_BULK_MAX_READINGS', 2000),
         help_text="Array of vital signs readings"
     )
 
@@ -1,9 +1,14 @@
 """
 Django signals for automatic profile creation and management
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import UserProfile, Patient, Provider
+from .alert_recipients import invalidate_care_team
+from .device_alert_rules import invalidate_device_alert_rules
+from .encounter_resolver import invalidate_remote_encounter
+from .models import UserProfile, Patient, Provider, Nurse, Encounter, VitalSign
+from .models_iot import DeviceAlertRule
+from .vital_rollups import refresh_vital_rollups
 
 
 @receiver(post_save, sender=UserProfile)
@@ -56,3 +61,49 @@ def create_profile_records(sender, instance, created, **kwargs):
                 except Exception as e:
                     # Log the error but don't prevent profile creation
                     print(f"Error creating Provider record for user {user.id}: {e}")
+
+
+@receiver(post_save, sender=Encounter)
+@receiver(post_delete, sender=Encounter)
+def invalidate_cached_remote_encounter(sender, instance, **kwargs):
+    """
+    Drop a cached remote-monitoring encounter when it is edited or deleted
+    so device ingestion does not keep attaching readings to it
+    """
+    invalidate_remote_encounter(instance.pk)
+
+
+@receiver(post_save, sender=DeviceAlertRule)
+@receiver(post_delete, sender=DeviceAlertRule)
+def reload_device_alert_rules(sender, instance, **kwargs):
+    """Rebuild the device alert rule index when a rule changes"""
+    invalidate_device_alert_rules()
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def invalidate_patient_care_team(sender, instance, **kwargs):
+    """Drop a patient's cached alert recipients when the patient changes"""
+    invalidate_care_team(instance.pk)
+
+
+@receiver(post_save, sender=Provider)
+@receiver(post_delete, sender=Provider)
+@receiver(post_save, sender=Nurse)
+@receiver(post_delete, sender=Nurse)
+def invalidate_care_teams(sender, instance, **kwargs):
+    """
+    Drop all cached alert rosters when staff assignments change (nurse
+    rosters are shared between patients; preferences are not cached)
+    """
+    invalidate_care_team()
+
+
+@receiver(post_save, sender=VitalSign)
+def refresh_edited_vital_rollups(sender, instance, created, raw=False, **kwargs):
+    """
+    Recompute the rollups of an edited reading (new readings are picked up
+    by update_vital_rollups)
+    """
+    if not created and not raw:
+        refresh_vital_rollups(instance)
@@ -0,0 +1,204 @@
+"""
+Tests for IoT vital sign ingestion (single, bulk and NDJSON stream paths)
+"""
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from healthcare.iot_data_processor import IoTDataProcessor
+from healthcare.models import Device, Patient, VitalSign
+from healthcare.models_iot import DeviceActivityLog, DeviceAPIKey, DeviceDataReading
+
+
+class IoTIngestionTestCase(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name='Test',
+            last_name='Patient',
+            date_of_birth=date(1970, 1, 1),
+            gender='M',
+            mrn='TEST-IOT-0001',
+            phone='555-0100',
+            address='1 Test Street',
+            city='Testville',
+            state='VA',
+            zip_code='22000',
+        )
+        self.device = Device.objects.create(
+            patient=self.patient,
+            device_unique_id='TEST-WATCH-0001',
+            device_name='Test Watch',
+            device_type='Watch',
+        )
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir, ignore_errors=True)
+        self.processor = IoTDataProcessor(inbox_dir=data_dir, archive_dir=data_dir)
+
+        settings_override = override_settings(
+            IOT_INBOX_DIR=data_dir,
+            IOT_ARCHIVE_DIR=data_dir,
+            DEVICE_ACTIVITY_LOG_MODE='sync',
+            DEVICE_API_KEY_USAGE_MODE='sync',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class BulkIngestionTests(IoTIngestionTestCase):
+    def test_bulk_creates_vital_signs_and_readings(self):
+        readings = [
+            {'timestamp': '2026-01-01T10:00:00Z', 'heart_rate': 72, 'temperature': 98.6, 'battery_level': 80},
+            {'timestamp': '2026-01-01T10:01:00Z', 'oxygen_saturation': '97.5', 'weight': 180, 'weight_unit': 'lbs'},
+        ]
+
+        results = self.processor.create_vital_signs_bulk(self.device, readings)
+
+        self.assertEqual(results['processed'], 2)
+        self.assertEqual(results['failed'], 0)
+        vitals = VitalSign.objects.filter(vital_signs_id__in=results['vitals_created']).order_by('vital_signs_id')
+        self.assertEqual(len(vitals), 2)
+        self.assertEqual(vitals[0].data_source, 'device')
+        self.assertEqual(vitals[0].device_id, self.device.device_id)
+        self.assertEqual(vitals[0].heart_rate, 72)
+        self.assertEqual(vitals[0].temperature, Decimal('98.60'))
+        self.assertEqual(vitals[1].oxygen_saturation, Decimal('97.50'))
+        self.assertEqual(vitals[1].weight, Decimal('180.00'))
+        self.assertEqual(
+            set(DeviceDataReading.objects.values_list('vital_sign_id', flat=True)),
+            set(results['vitals_created'])
+        )
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.battery_level, 80)
+
+    def test_bad_readings_are_rejected_one_at_a_time(self):
+        readings = [
+            {'heart_rate': float('nan')},
+            {'temperature': float('inf')},
+            {'temperature': 1e6},
+            {'heart_rate': 10 ** 12},
+            {'heart_rate': 72.5},
+            {'heart_rate': 72, 'battery_level': 55.5},
+            {'heart_rate': 72, 'signal_quality': 101},
+            {'heart_rate': 72, 'temperature': 37, 'temperature_unit': 'Celsius'},
+            {'heart_rate': True},
+            {'heart_rate': 75},
+        ]
+
+        results = self.processor.create_vital_signs_bulk(self.device, readings)
+
+        self.assertEqual(results['processed'], 1)
+        self.assertEqual(results['failed'], 9)
+        self.assertEqual(
+            [entry['index'] for entry in results['results'] if not entry['success']],
+            list(range(9))
+        )
+        self.assertEqual(VitalSign.objects.get().heart_rate, 75)
+
+    def test_single_reading_path(self):
+        vital_sign, _ = self.processor.create_vital_sign_from_data({
+            'device_id': self.device.device_unique_id,
+            'timestamp': '2026-01-01T10:00:00Z',
+            'heart_rate': 64,
+            'temperature': 37.2,
+            'temperature_unit': 'C',
+        })
+
+        vital_sign.refresh_from_db()
+        self.assertEqual(vital_sign.device_id, self.device.device_id)
+        self.assertEqual(vital_sign.temperature, Decimal('37.20'))
+        self.assertEqual(vital_sign.temperature_unit, 'C')
+
+        with self.assertRaises(ValidationError):
+            self.processor.create_vital_sign_from_data({
+                'device_id': self.device.device_unique_id,
+                'timestamp': '2026-01-01T10:00:00Z',
+                'heart_rate': float('nan'),
+            })
+
+
+class StreamIngestionTests(IoTIngestionTestCase):
+    def ndjson(self, readings):
+        return b''.join(
+            (reading if isinstance(reading, bytes) else json.dumps(reading).encode('utf-8')) + b'\n'
+            for reading in readings
+        )
+
+    def test_stream_commits_chunks_and_reports_bad_lines(self):
+        lines = self.ndjson([
+            {'timestamp': '2026-01-01T10:00:00Z', 'heart_rate': 70},
+            b'not json',
+            {'timestamp': '2026-01-01T10:01:00Z', 'heart_rate': 71, 'temperature': 98.4},
+            {'timestamp': '2026-01-01T10:02:00Z', 'temperature': 'NaN'},
+            {'timestamp': '2026-01-01T10:03:00Z', 'oxygen_saturation': 96},
+        ]).splitlines(keepends=True)
+
+        summary = self.processor.ingest_ndjson_stream(self.device, lines, chunk_size=2)
+
+        self.assertEqual(summary['total_lines'], 5)
+        self.assertEqual(summary['processed'], 3)
+        self.assertEqual(summary['failed'], 2)
+        self.assertEqual(summary['chunks_committed'], 2)
+        self.assertEqual([error['line'] for error in summary['errors']], [2, 4])
+        self.assertEqual(VitalSign.objects.filter(device=self.device, data_source='device').count(), 3)
+
+    def test_stream_endpoint(self):
+        api_key, key = DeviceAPIKey.create_key(self.device, 'Test gateway')
+        body = self.ndjson([
+            {'timestamp': '2026-01-01T10:00:00Z', 'heart_rate': 70},
+            {'timestamp': '2026-01-01T10:01:00Z', 'heart_rate': 71},
+        ])
+
+        response = self.client.post(
+            reverse('iot_submit_vitals_stream'),
+            data=gzip.compress(body),
+            content_type='application/x-ndjson',
+            HTTP_AUTHORIZATION=f'Bearer {key}',
+            HTTP_CONTENT_ENCODING='gzip',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['processed'], 2)
+        self.assertEqual(data['failed'], 0)
+        self.assertEqual(VitalSign.objects.filter(device=self.device).count(), 2)
+        log = DeviceActivityLog.objects.get(device=self.device)
+        self.assertEqual(log.action_type, 'data_post')
+        self.assertEqual(log.status_code, 200)
+        self.assertEqual(log.endpoint, reverse('iot_submit_vitals_stream'))
+        api_key.refresh_from_db()
+        self.assertEqual(api_key.request_count_today, 1)
+        self.assertIsNotNone(api_key.last_used)
+
+    @override_settings(IOT_BULK_CHUNK_SIZE=50)
+    def test_truncated_gzip_stream_reports_committed_readings(self):
+        _, key = DeviceAPIKey.create_key(self.device, 'Test gateway')
+        body = gzip.compress(self.ndjson([
+            {'timestamp': f'2026-01-01T{minute // 60:02d}:{minute % 60:02d}:00Z', 'heart_rate': 60 + minute % 40}
+            for minute in range(1000)
+        ]))
+
+        response = self.client.post(
+            reverse('iot_submit_vitals_stream'),
+            data=body[:len(body) // 2],
+            content_type='application/x-ndjson',
+            HTTP_AUTHORIZATION=f'Bearer {key}',
+            HTTP_CONTENT_ENCODING='gzip',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertFalse(data['success'])
+        self.assertTrue(data['truncated'])
+        self.assertIn('truncated', data['error'])
+        self.assertGreater(data['chunks_committed'], 0)
+        vitals = VitalSign.objects.filter(device=self.device)
+        self.assertEqual(vitals.count(), data['processed'])
+        self.assertEqual(max(vitals.values_list('vital_signs_id', flat=True)), data['last_vital_sign_id'])
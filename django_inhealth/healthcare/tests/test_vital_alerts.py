@@ -0,0 +1,101 @@
+"""
+Tests for vital alert suppression and auto-escalation
+"""
+from datetime import date, timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from healthcare.alert_escalation import escalate_due_alerts
+from healthcare.alert_recipients import recipient_resolver
+from healthcare.alert_suppression import claim_alert
+from healthcare.models import Encounter, Patient, Provider, VitalSign, VitalSignAlertResponse
+from healthcare.notification_dispatcher import NotificationDispatcher, set_notification_dispatcher
+
+
+class RecordingBackend:
+    """Notification backend that keeps the messages instead of sending them"""
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message)
+
+    def close(self):
+        pass
+
+
+@override_settings(EMS_CONTACT_EMAIL='ems@example.com', EMS_CONTACT_PHONE=None, TWILIO_ACCOUNT_SID='')
+class AutoEscalationTests(TestCase):
+    def setUp(self):
+        self.doctor = Provider.objects.create(
+            first_name='Test',
+            last_name='Doctor',
+            specialty='Other',
+            npi='TEST-NPI-0001',
+            license_number='TEST-LIC-0001',
+            email='doctor@example.com',
+            phone='555-0101',
+        )
+        self.patient = Patient.objects.create(
+            first_name='Test',
+            last_name='Patient',
+            date_of_birth=date(1970, 1, 1),
+            gender='M',
+            mrn='TEST-ALERT-0001',
+            phone='555-0100',
+            address='1 Test Street',
+            city='Testville',
+            state='VA',
+            zip_code='22000',
+        )
+        encounter = Encounter.objects.create(
+            patient=self.patient,
+            provider=self.doctor,
+            encounter_date=timezone.now(),
+            encounter_type='Remote Monitoring',
+            status='In Progress',
+        )
+        self.vital_sign = VitalSign.objects.create(encounter=encounter, heart_rate=190, oxygen_saturation=82)
+        self.critical_vitals = [
+            ('Heart Rate', 190, 'blue', 'Emergency'),
+            ('Oxygen Saturation', '82%', 'blue', 'Emergency'),
+        ]
+
+        recipient_resolver.clear()
+        self.backend = RecordingBackend()
+        previous = set_notification_dispatcher(NotificationDispatcher(backend=self.backend, rate_limits={}))
+        self.addCleanup(set_notification_dispatcher, previous)
+
+    def claim(self):
+        alert, notify = claim_alert(self.vital_sign, self.patient, self.critical_vitals, 'emergency')
+        self.assertTrue(notify)
+        return alert
+
+    def test_auto_escalate_notifies_doctor_and_ems(self):
+        alert = self.claim()
+
+        alert.auto_escalate()
+
+        alert.refresh_from_db()
+        self.assertTrue(alert.auto_escalated)
+        self.assertTrue(alert.doctor_notified)
+        self.assertTrue(alert.ems_notified)
+        recipients = {message.to for message in self.backend.messages if message.channel == 'email'}
+        self.assertEqual(recipients, {'doctor@example.com', 'ems@example.com'})
+        ems_email = next(message for message in self.backend.messages if message.to == 'ems@example.com')
+        self.assertIn('Heart Rate', ems_email.html_body)
+
+    def test_due_alert_escalates_without_error(self):
+        alert = self.claim()
+        VitalSignAlertResponse.objects.filter(pk=alert.pk).update(
+            escalation_deadline=timezone.now() - timedelta(minutes=1)
+        )
+
+        escalated, failed = escalate_due_alerts()
+
+        self.assertEqual([a.pk for a in escalated], [alert.pk])
+        self.assertEqual(failed, [])
+        alert.refresh_from_db()
+        self.assertTrue(alert.ems_notified)
@@ -0,0 +1,24 @@
+"""
+Tests for the chart window parsing of the vital sign chart pages
+"""
+from django.http import QueryDict
+from django.test import SimpleTestCase
+
+from healthcare.vital_charts import MAX_CHART_DAYS, parse_chart_range
+
+
+class ParseChartRangeTests(SimpleTestCase):
+    def test_default_window(self):
+        start, end, days = parse_chart_range(QueryDict())
+        self.assertEqual(days, 30)
+        self.assertIsNone(end)
+
+    def test_invalid_days_fall_back_to_default(self):
+        for value in ('abc', '0', '-5'):
+            _, _, days = parse_chart_range(QueryDict(f'days={value}'))
+            self.assertEqual(days, 30)
+
+    def test_huge_days_are_clamped(self):
+        start, end, days = parse_chart_range(QueryDict('days=99999999999'))
+        self.assertEqual(days, MAX_CHART_DAYS)
+        self.assertIsNotNone(start)
@@ -3,6 +3,8 @@ from . import views
 from . import iot_file_management_views
 from . import api_key_views
 from . import device_api_key_views
+from . import metrics_views
+from . import vital_series_views
 
 urlpatterns = [
     # Enterprise Authentication URLs
@@ -250,6 +252,8 @@ urlpatterns = [
     path('nurse/vitals/', views.nurse_vitals_list, name='nurse_vitals_list'),
     path('nurse/vitals/add/', views.nurse_add_vitals, name='nurse_add_vitals'),
     path('nurse/vitals/charts/', views.nurse_vitals_charts, name='nurse_vitals_charts'),
+    path('nurse/patients/<int:patient_id>/vitals/chart/', views.nurse_patient_vitals_chart, name='nurse_patient_vitals_chart'),
+    path('vitals/series/<int:patient_id>/', vital_series_views.patient_vitals_series, name='patient_vitals_series'),
     path('nurse/patients/<int:patient_id>/vitals/create/', views.nurse_vital_create, name='nurse_vital_create'),
     path('nurse/vitals/<int:vital_signs_id>/edit/', views.nurse_vital_edit, name='nurse_vital_edit'),
 
@@ -264,8 +268,14 @@ urlpatterns = [
     # ============================================================================
     path('api/iot/vitals/', views.iot_submit_vitals, name='iot_submit_vitals'),
     path('api/iot/vitals/batch/', views.iot_submit_vitals_batch, name='iot_submit_vitals_batch'),
+    path('api/iot/vitals/stream/', views.iot_submit_vitals_stream, name='iot_submit_vitals_stream'),
     path('api/iot/status/', views.iot_device_status, name='iot_device_status'),
 
+    # ============================================================================
+    # ALERT PIPELINE METRICS (Prometheus text format)
+    # ============================================================================
+    path('metrics/alert-latency/', metrics_views.alert_latency_metrics, name='alert_latency_metrics'),
+
     # ============================================================================
     # IOT FILE MANAGEMENT URLS (Admin dashboard for managing IoT data files)
     # ============================================================================
@@ -0,0 +1,169 @@
+"""
+Coalesced usage counters for DeviceAPIKey
+
+DeviceAPIKey.record_usage used to do a read-modify-write save() on every
+authenticated request. Usage is now accumulated in memory per (key, day) and a
+background thread applies the deltas with atomic F() updates, so concurrent
+workers never lose increments and a busy key costs one UPDATE per flush
+interval instead of one per request.
+
+The daily reset is decided by the database row, not by process state: a delta
+for day D adds to request_count_today when last_reset_date == D and replaces
+it when last_reset_date is older. Deltas for a day that is already behind the
+stored last_reset_date are discarded. This stays correct across restarts and
+across workers.
+
+Settings:
+    DEVICE_API_KEY_USAGE_MODE: 'buffered' (default) or 'sync' (apply each
+        request immediately, still with an atomic update); read on every
+        request, so override_settings applies to the process-wide counter
+    DEVICE_API_KEY_USAGE_FLUSH_SECONDS: Flush interval (default 10)
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Case, F, Value, When
+
+logger = logging.getLogger(__name__)
+
+
+class UsageCounter:
+    """Accumulate DeviceAPIKey usage deltas and apply them periodically"""
+
+    def __init__(self, mode=None, flush_seconds=None):
+        self._mode = mode
+        self.flush_seconds = flush_seconds or getattr(settings, 'DEVICE_API_KEY_USAGE_FLUSH_SECONDS', 10)
+
+        self._pending = {}  # (api_key_id, date) -> [count, last_used]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.flushes = 0
+        self.rows_updated = 0
+
+    @property
+    def mode(self):
+        """'buffered' or 'sync' (DEVICE_API_KEY_USAGE_MODE unless set on the counter)"""
+        return self._mode or getattr(settings, 'DEVICE_API_KEY_USAGE_MODE', 'buffered')
+
+    def record(self, api_key_id, used_at):
+        """
+        Record one authenticated request
+
+        Args:
+            api_key_id: DeviceAPIKey primary key
+            used_at: Timezone-aware datetime of the request
+        """
+        if self.mode == 'sync':
+            self._apply({(api_key_id, used_at.date()): [1, used_at]})
+            return
+
+        self._ensure_started()
+
+        key = (api_key_id, used_at.date())
+        with self._lock:
+            delta = self._pending.get(key)
+            if delta is None:
+                self._pending[key] = [1, used_at]
+            else:
+                delta[0] += 1
+                if used_at > delta[1]:
+                    delta[1] = used_at
+
+    def flush(self):
+        """Apply all pending deltas now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if pending:
+            self._apply(pending)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the flusher thread and apply remaining deltas"""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        """Return counter state"""
+        with self._lock:
+            pending_requests = sum(delta[0] for delta in self._pending.values())
+        return {
+            'mode': self.mode,
+            'pending_keys': len(self._pending),
+            'pending_requests': pending_requests,
+            'flushes': self.flushes,
+            'rows_updated': self.rows_updated,
+        }
+
+    def _ensure_started(self):
+        """Start the flusher thread (again after a fork)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # Deltas inherited from the parent process belong to the parent
+                self._pending = {}
+            self._stop.clear()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='device-api-key-usage-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Flusher loop"""
+        try:
+            while not self._stop.wait(self.flush_seconds):
+                close_old_connections()
+                self.flush()
+        finally:
+            connection.close()
+
+    def _apply(self, pending):
+        """Apply deltas oldest day first with atomic conditional updates"""
+        from .models_iot import DeviceAPIKey
+
+        for (api_key_id, day), (count, last_used) in sorted(pending.items(), key=lambda item: item[0][1]):
+            try:
+                updated = DeviceAPIKey.objects.filter(
+                    pk=api_key_id,
+                    last_reset_date__lte=day
+                ).update(
+                    last_used=last_used,
+                    request_count_today=Case(
+                        When(last_reset_date=day, then=F('request_count_today') + count),
+                        default=Value(count)
+                    ),
+                    last_reset_date=day
+                )
+                self.rows_updated += updated
+            except Exception as e:
+                logger.error(f"Failed to apply usage for device API key {api_key_id}: {str(e)}")
+
+        self.flushes += 1
+
+
+# Process-wide counter used by DeviceAPIKey.record_usage (created on first use)
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_usage_counter():
+    """Return the process-wide usage counter"""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = UsageCounter()
+                atexit.register(_counter.shutdown)
+    return _counter
@@ -14,6 +14,10 @@ from .models import (
     Billing, BillingItem, Payment, Device, UserProfile, AIProposedTreatmentPlan
 )
 from .models_iot import DeviceAPIKey
+from .vital_charts import chart_max_points, load_chart_series, parse_chart_range
+from .vital_rollups import vital_totals
+from .keyset_pagination import KeysetPaginator
+from .vital_series_views import chart_poll_seconds, reading_cursor
 from .forms import (
     UserRegistrationForm, ProfilePictureForm, PasswordResetRequestForm,
     PasswordResetConfirmForm, UsernameRecoveryForm, UserPasswordChangeForm
@@ -307,8 +311,21 @@ def patient_list(request):
             Q(ssn__icontains=search)
         )
 
-    patients = patients.order_by('last_name', 'first_name')
-    return render(request, 'healthcare/patients/index.html', {'patients': patients, 'search': search})
+    # Keyset pagination by name; the total is exact when every match fits on
+    # the page, otherwise a planner estimate instead of COUNT(*)
+    paginator = KeysetPaginator(patients, ('last_name', 'first_name', 'patient_id'), per_page=50, estimate_count=True)
+    page = paginator.page(request.GET.get('cursor'), params=request.GET)
+    if page.has_other_pages and page.estimated_count is not None:
+        patient_count = page.estimated_count
+    else:
+        patient_count = len(page)
+
+    return render(request, 'healthcare/patients/index.html', {
+        'patients': page,
+        'search': search,
+        'patient_count': patient_count,
+        'patient_count_estimated': page.has_other_pages and page.estimated_count is not None,
+    })
 
 
 @login_required
@@ -2043,10 +2060,12 @@ def patient_device_detail(request, patient_id, device_id):
 @login_required
 def message_inbox(request):
     """Display inbox messages for the logged-in user"""
-    messages_list = request.user.received_messages.all().order_by('-created_at')
+    messages_list = request.user.received_messages.all()
+
+    paginator = KeysetPaginator(messages_list, ('-created_at', '-message_id'), per_page=50)
 
     context = {
-        'messages_list': messages_list,
+        'messages_list': paginator.page(request.GET.get('cursor'), params=request.GET),
         'unread_count': messages_list.filter(is_read=False).count(),
     }
 
@@ -2056,10 +2075,12 @@ def message_inbox(request):
 @login_required
 def message_sent(request):
     """Display sent messages for the logged-in user"""
-    messages_list = request.user.sent_messages.all().order_by('-created_at')
+    messages_list = request.user.sent_messages.all()
+
+    paginator = KeysetPaginator(messages_list, ('-created_at', '-message_id'), per_page=50)
 
     context = {
-        'messages_list': messages_list,
+        'messages_list': paginator.page(request.GET.get('cursor'), params=request.GET),
     }
 
     return render(request, 'healthcare/messages/sent.html', context)
@@ -2192,12 +2213,13 @@ def doctor_inbox(request):
     unread_messages = messages_list.filter(is_read=False).count()
     unread_notifications = notifications_queryset.filter(is_read=False).count()
 
-    # Slice for display
+    # Slice for display; older messages are reached by cursor
     notifications_list = notifications_queryset[:20]
+    paginator = KeysetPaginator(messages_list, ('-created_at', '-message_id'), per_page=20)
 
     context = {
         'provider': provider,
-        'messages_list': messages_list[:20],
+        'messages_list': paginator.page(request.GET.get('cursor'), params=request.GET),
         'notifications_list': notifications_list,
         'unread_messages': unread_messages,
         'unread_notifications': unread_notifications,
@@ -2264,10 +2286,11 @@ def doctor_compose_message(request):
             )
 
             # Create notification for the recipient
-            Notification.objects.create(
-                user=recipient,
-                title=f'New message from Dr. {provider.full_name}',
-                message=f'Subject: {subject[:50]}...' if len(subject) > 50 else f'Subject: {subject}',
+            from .vital_alerts import create_dashboard_notification
+            create_dashboard_notification(
+                recipient,
+                f'New message from Dr. {provider.full_name}',
+                f'Subject: {subject[:50]}...' if len(subject) > 50 else f'Subject: {subject}',
                 notification_type='message'
             )
 
@@ -2394,29 +2417,21 @@ def doctor_view_all_vitals(request):
         'encounter__patient',
         'encounter__provider',
         'recorded_by'
-    ).order_by('-recorded_at')
+    )
 
-    # Pagination (optional, but recommended for large datasets)
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-    paginator = Paginator(vitals_list, 50)  # Show 50 vitals per page
-    page = request.GET.get('page')
+    # Keyset pagination: deep pages cost the same as the first
+    paginator = KeysetPaginator(vitals_list, ('-recorded_at', '-vital_signs_id'), per_page=50)
+    vitals = paginator.page(request.GET.get('cursor'), params=request.GET)
 
-    try:
-        vitals = paginator.page(page)
-    except PageNotAnInteger:
-        vitals = paginator.page(1)
-    except EmptyPage:
-        vitals = paginator.page(paginator.num_pages)
-
-    # Get statistics
-    total_vitals = vitals_list.count()
-    critical_vitals = sum(1 for v in vitals_list if v.has_critical_values())
+    # Get statistics from the daily rollups
+    totals = vital_totals(patient_ids)
 
     context = {
         'provider': provider,
         'vitals': vitals,
-        'total_vitals': total_vitals,
-        'critical_vitals': critical_vitals,
+        'total_vitals': totals['reading_count'],
+        'critical_vitals': totals['critical_count'],
+        'patients_with_vitals': totals['patient_count'],
     }
 
     return render(request, 'healthcare/providers/all_vitals.html', context)
@@ -2440,147 +2455,43 @@ def patient_vitals_chart(request, patient_id):
         messages.error(request, 'You do not have access to this patient.')
         return redirect('provider_dashboard')
 
-    # Get date range from query params (default: last 30 days)
-    from datetime import datetime, timedelta
-    from django.utils import timezone
-
-    days = request.GET.get('days', '30')
-    try:
-        days = int(days)
-    except:
-        days = 30
-
-    start_date = timezone.now() - timedelta(days=days)
-
-    # Get all vitals for this patient within date range
-    vitals_list = VitalSign.objects.filter(
-        encounter__patient=patient,
-        recorded_at__gte=start_date
-    ).select_related(
-        'encounter',
-        'recorded_by'
-    ).order_by('recorded_at')
+    # Get date range from query params (default: last 30 days, or ?start=&end=)
+    start_date, end_date, days = parse_chart_range(request.GET)
 
     # Get all vitals (no date filter) for total count
     all_vitals = VitalSign.objects.filter(
         encounter__patient=patient
-    ).order_by('-recorded_at')
-
-    # Prepare data for charts
-    chart_data = {
-        'dates': [],
-        'heart_rate': [],
-        'sbp': [],
-        'dbp': [],
-        'temperature': [],
-        'respiratory_rate': [],
-        'oxygen_saturation': [],
-        'glucose': [],
-        'heart_rate_colors': [],
-        'sbp_colors': [],
-        'dbp_colors': [],
-        'temperature_colors': [],
-        'respiratory_rate_colors': [],
-        'oxygen_saturation_colors': [],
-        'glucose_colors': [],
-    }
-
-    # Color mapping
-    color_map = {
-        'blue': 'rgba(33, 150, 243, 0.8)',  # Emergency
-        'red': 'rgba(244, 67, 54, 0.8)',    # Doctor
-        'orange': 'rgba(255, 152, 0, 0.8)', # Nurse
-        'green': 'rgba(76, 175, 80, 0.8)',  # Normal
-    }
-
-    for vital in vitals_list:
-        date_str = vital.recorded_at.strftime('%Y-%m-%d %H:%M')
-        chart_data['dates'].append(date_str)
+    ).order_by('-recorded_at', '-vital_signs_id')
 
-        # Heart Rate
-        if vital.heart_rate:
-            chart_data['heart_rate'].append(float(vital.heart_rate))
-            status = vital.get_heart_rate_status()
-            chart_data['heart_rate_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['heart_rate'].append(None)
-            chart_data['heart_rate_colors'].append(color_map['green'])
-
-        # SBP
-        if vital.blood_pressure_systolic:
-            chart_data['sbp'].append(float(vital.blood_pressure_systolic))
-            status = vital.get_sbp_status()
-            chart_data['sbp_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['sbp'].append(None)
-            chart_data['sbp_colors'].append(color_map['green'])
-
-        # DBP
-        if vital.blood_pressure_diastolic:
-            chart_data['dbp'].append(float(vital.blood_pressure_diastolic))
-            status = vital.get_dbp_status()
-            chart_data['dbp_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['dbp'].append(None)
-            chart_data['dbp_colors'].append(color_map['green'])
-
-        # Temperature (convert to Fahrenheit for display if needed)
-        if vital.temperature_value:
-            temp = float(vital.temperature_value)
-            if vital.temperature_unit == 'C':
-                temp = (temp * 9/5) + 32  # Convert to Fahrenheit
-            chart_data['temperature'].append(temp)
-            status = vital.get_temperature_status()
-            chart_data['temperature_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['temperature'].append(None)
-            chart_data['temperature_colors'].append(color_map['green'])
-
-        # Respiratory Rate
-        if vital.respiratory_rate:
-            chart_data['respiratory_rate'].append(float(vital.respiratory_rate))
-            status = vital.get_respiratory_rate_status()
-            chart_data['respiratory_rate_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['respiratory_rate'].append(None)
-            chart_data['respiratory_rate_colors'].append(color_map['green'])
-
-        # Oxygen Saturation
-        if vital.oxygen_saturation:
-            chart_data['oxygen_saturation'].append(float(vital.oxygen_saturation))
-            status = vital.get_oxygen_saturation_status()
-            chart_data['oxygen_saturation_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['oxygen_saturation'].append(None)
-            chart_data['oxygen_saturation_colors'].append(color_map['green'])
-
-        # Glucose
-        if vital.glucose:
-            chart_data['glucose'].append(float(vital.glucose))
-            status = vital.get_glucose_status()
-            chart_data['glucose_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['glucose'].append(None)
-            chart_data['glucose_colors'].append(color_map['green'])
+    # Chart series from the vital columns (rollups for long windows), capped at the point budget
+    series = load_chart_series(patient, start_date, end_date)
+    chart_data, downsampled = series.chart_data()
 
-    # Calculate statistics
-    total_readings = all_vitals.count()
-    critical_readings = sum(1 for v in vitals_list if v.has_critical_values())
+    # Calculate statistics (reading total from the rollups)
+    total_readings = vital_totals([patient.pk])['reading_count']
+    critical_readings = series.critical_count()
 
     # Get latest vital
-    latest_vital = all_vitals.first() if all_vitals.exists() else None
+    latest_vital = all_vitals.first()
 
     import json
     context = {
         'provider': provider,
         'patient': patient,
-        'vitals_list': vitals_list,
         'all_vitals': all_vitals[:100],  # Show last 100 for table
         'chart_data_json': json.dumps(chart_data),
         'total_readings': total_readings,
         'critical_readings': critical_readings,
         'latest_vital': latest_vital,
         'days': days,
+        'start_date': start_date,
+        'end_date': end_date,
+        'downsampled': downsampled,
+        'shown_points': len(chart_data['dates']),
+        'window_readings': len(series),
+        'series_cursor': reading_cursor(latest_vital.recorded_at, latest_vital.vital_signs_id) if latest_vital else '',
+        'poll_seconds': chart_poll_seconds(),
+        'max_points': chart_max_points(),
     }
 
     return render(request, 'healthcare/providers/patient_vitals_chart.html', context)
@@ -2596,146 +2507,42 @@ def patient_my_vitals_chart(request):
         messages.error(request, 'No patient profile found for your account.')
         return redirect('index')
 
-    # Get date range from query params (default: last 30 days)
-    from datetime import datetime, timedelta
-    from django.utils import timezone
-
-    days = request.GET.get('days', '30')
-    try:
-        days = int(days)
-    except:
-        days = 30
-
-    start_date = timezone.now() - timedelta(days=days)
-
-    # Get all vitals for this patient within date range
-    vitals_list = VitalSign.objects.filter(
-        encounter__patient=patient,
-        recorded_at__gte=start_date
-    ).select_related(
-        'encounter',
-        'recorded_by'
-    ).order_by('recorded_at')
+    # Get date range from query params (default: last 30 days, or ?start=&end=)
+    start_date, end_date, days = parse_chart_range(request.GET)
 
     # Get all vitals (no date filter) for total count
     all_vitals = VitalSign.objects.filter(
         encounter__patient=patient
-    ).order_by('-recorded_at')
-
-    # Prepare data for charts
-    chart_data = {
-        'dates': [],
-        'heart_rate': [],
-        'sbp': [],
-        'dbp': [],
-        'temperature': [],
-        'respiratory_rate': [],
-        'oxygen_saturation': [],
-        'glucose': [],
-        'heart_rate_colors': [],
-        'sbp_colors': [],
-        'dbp_colors': [],
-        'temperature_colors': [],
-        'respiratory_rate_colors': [],
-        'oxygen_saturation_colors': [],
-        'glucose_colors': [],
-    }
-
-    # Color mapping
-    color_map = {
-        'blue': 'rgba(33, 150, 243, 0.8)',  # Emergency
-        'red': 'rgba(244, 67, 54, 0.8)',    # Doctor
-        'orange': 'rgba(255, 152, 0, 0.8)', # Nurse
-        'green': 'rgba(76, 175, 80, 0.8)',  # Normal
-    }
-
-    for vital in vitals_list:
-        date_str = vital.recorded_at.strftime('%Y-%m-%d %H:%M')
-        chart_data['dates'].append(date_str)
+    ).order_by('-recorded_at', '-vital_signs_id')
 
-        # Heart Rate
-        if vital.heart_rate:
-            chart_data['heart_rate'].append(float(vital.heart_rate))
-            status = vital.get_heart_rate_status()
-            chart_data['heart_rate_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['heart_rate'].append(None)
-            chart_data['heart_rate_colors'].append(color_map['green'])
-
-        # SBP
-        if vital.blood_pressure_systolic:
-            chart_data['sbp'].append(float(vital.blood_pressure_systolic))
-            status = vital.get_sbp_status()
-            chart_data['sbp_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['sbp'].append(None)
-            chart_data['sbp_colors'].append(color_map['green'])
-
-        # DBP
-        if vital.blood_pressure_diastolic:
-            chart_data['dbp'].append(float(vital.blood_pressure_diastolic))
-            status = vital.get_dbp_status()
-            chart_data['dbp_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['dbp'].append(None)
-            chart_data['dbp_colors'].append(color_map['green'])
-
-        # Temperature (convert to Fahrenheit for display if needed)
-        if vital.temperature_value:
-            temp = float(vital.temperature_value)
-            if vital.temperature_unit == 'C':
-                temp = (temp * 9/5) + 32  # Convert to Fahrenheit
-            chart_data['temperature'].append(temp)
-            status = vital.get_temperature_status()
-            chart_data['temperature_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['temperature'].append(None)
-            chart_data['temperature_colors'].append(color_map['green'])
-
-        # Respiratory Rate
-        if vital.respiratory_rate:
-            chart_data['respiratory_rate'].append(float(vital.respiratory_rate))
-            status = vital.get_respiratory_rate_status()
-            chart_data['respiratory_rate_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['respiratory_rate'].append(None)
-            chart_data['respiratory_rate_colors'].append(color_map['green'])
-
-        # Oxygen Saturation
-        if vital.oxygen_saturation:
-            chart_data['oxygen_saturation'].append(float(vital.oxygen_saturation))
-            status = vital.get_oxygen_saturation_status()
-            chart_data['oxygen_saturation_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['oxygen_saturation'].append(None)
-            chart_data['oxygen_saturation_colors'].append(color_map['green'])
-
-        # Glucose
-        if vital.glucose:
-            chart_data['glucose'].append(float(vital.glucose))
-            status = vital.get_glucose_status()
-            chart_data['glucose_colors'].append(color_map.get(status[0], color_map['green']))
-        else:
-            chart_data['glucose'].append(None)
-            chart_data['glucose_colors'].append(color_map['green'])
+    # Chart series from the vital columns (rollups for long windows), capped at the point budget
+    series = load_chart_series(patient, start_date, end_date)
+    chart_data, downsampled = series.chart_data()
 
-    # Calculate statistics
-    total_readings = all_vitals.count()
-    critical_readings = sum(1 for v in vitals_list if v.has_critical_values())
+    # Calculate statistics (reading total from the rollups)
+    total_readings = vital_totals([patient.pk])['reading_count']
+    critical_readings = series.critical_count()
 
     # Get latest vital
-    latest_vital = all_vitals.first() if all_vitals.exists() else None
+    latest_vital = all_vitals.first()
 
     import json
     context = {
         'patient': patient,
-        'vitals_list': vitals_list,
         'all_vitals': all_vitals[:100],  # Show last 100 for table
         'chart_data_json': json.dumps(chart_data),
         'total_readings': total_readings,
         'critical_readings': critical_readings,
         'latest_vital': latest_vital,
         'days': days,
+        'start_date': start_date,
+        'end_date': end_date,
+        'downsampled': downsampled,
+        'shown_points': len(chart_data['dates']),
+        'window_readings': len(series),
+        'series_cursor': reading_cursor(latest_vital.recorded_at, latest_vital.vital_signs_id) if latest_vital else '',
+        'poll_seconds': chart_poll_seconds(),
+        'max_points': chart_max_points(),
     }
 
     return render(request, 'healthcare/patients/my_vitals_chart.html', context)
@@ -2942,12 +2749,13 @@ def patient_inbox(request):
     unread_messages = messages_list.filter(is_read=False).count()
     unread_notifications = notifications_queryset.filter(is_read=False).count()
 
-    # Slice for display
+    # Slice for display; older messages are reached by cursor
     notifications_list = notifications_queryset[:20]
+    paginator = KeysetPaginator(messages_list, ('-created_at', '-message_id'), per_page=20)
 
     context = {
         'patient': patient,
-        'messages_list': messages_list[:20],
+        'messages_list': paginator.page(request.GET.get('cursor'), params=request.GET),
         'notifications_list': notifications_list,
         'unread_messages': unread_messages,
         'unread_notifications': unread_notifications,
@@ -3014,10 +2822,11 @@ def patient_compose_message(request):
             )
 
             # Create notification for the recipient
-            Notification.objects.create(
-                user=recipient,
-                title=f'New message from patient {patient.full_name}',
-                message=f'Subject: {subject[:50]}...' if len(subject) > 50 else f'Subject: {subject}',
+            from .vital_alerts import create_dashboard_notification
+            create_dashboard_notification(
+                recipient,
+                f'New message from patient {patient.full_name}',
+                f'Subject: {subject[:50]}...' if len(subject) > 50 else f'Subject: {subject}',
                 notification_type='message'
             )
 
@@ -4202,7 +4011,7 @@ def nurse_vitals_list(request):
 
     vitals = VitalSign.objects.select_related(
         'encounter__patient', 'encounter__provider', 'recorded_by'
-    ).order_by('-recorded_at')
+    )
 
     if date_filter == 'today':
         vitals = vitals.filter(recorded_at__date=timezone.now().date())
@@ -4221,8 +4030,9 @@ def nurse_vitals_list(request):
             Q(encounter__patient__last_name__icontains=patient_search)
         )
 
-    # Paginate results
-    vitals = vitals[:100]  # Limit to recent 100
+    # Paginate results, latest first
+    paginator = KeysetPaginator(vitals, ('-recorded_at', '-vital_signs_id'), per_page=100)
+    vitals = paginator.page(request.GET.get('cursor'), params=request.GET)
 
     context = {
         'vitals': vitals,
@@ -4430,6 +4240,58 @@ def nurse_vitals_charts(request):
     return render(request, 'healthcare/nurse/vitals_charts.html', context)
 
 
+@login_required
+@require_role('nurse')
+def nurse_patient_vitals_chart(request, patient_id):
+    """Nurse view of a patient's vital signs with charts, graphs, and historical data"""
+    try:
+        nurse = request.user.nurse_profile
+    except:
+        messages.error(request, 'No nurse profile found for your account.')
+        return redirect('index')
+
+    patient = get_object_or_404(Patient.objects.select_related('primary_doctor'), patient_id=patient_id)
+
+    # Same hospital restriction as the patient search
+    if nurse.hospital and (not patient.primary_doctor or patient.primary_doctor.hospital_id != nurse.hospital_id):
+        messages.error(request, 'You do not have access to this patient.')
+        return redirect('nurse_vitals_charts')
+
+    # Get date range from query params (default: last 30 days, or ?start=&end=)
+    start_date, end_date, days = parse_chart_range(request.GET)
+
+    all_vitals = VitalSign.objects.filter(
+        encounter__patient=patient
+    ).order_by('-recorded_at', '-vital_signs_id')
+
+    series = load_chart_series(patient, start_date, end_date)
+    chart_data, downsampled = series.chart_data()
+    latest_vital = all_vitals.first()
+
+    import json
+    context = {
+        'nurse': nurse,
+        'provider': patient.primary_doctor,
+        'patient': patient,
+        'all_vitals': all_vitals[:100],  # Show last 100 for table
+        'chart_data_json': json.dumps(chart_data),
+        'total_readings': vital_totals([patient.pk])['reading_count'],
+        'critical_readings': series.critical_count(),
+        'latest_vital': latest_vital,
+        'days': days,
+        'start_date': start_date,
+        'end_date': end_date,
+        'downsampled': downsampled,
+        'shown_points': len(chart_data['dates']),
+        'window_readings': len(series),
+        'series_cursor': reading_cursor(latest_vital.recorded_at, latest_vital.vital_signs_id) if latest_vital else '',
+        'poll_seconds': chart_poll_seconds(),
+        'max_points': chart_max_points(),
+    }
+
+    return render(request, 'healthcare/providers/patient_vitals_chart.html', context)
+
+
 # ============================================================================
 # MULTI-FACTOR AUTHENTICATION (MFA) VIEWS
 # ============================================================================
@@ -5387,3 +5249,4 @@ def mfa_disable(request):
 
     return render(request, 'healthcare/mfa_disable.html')
 from .iot_api_views import submit_vitals_batch as iot_submit_vitals_batch
+from .iot_api_views import submit_vitals_stream as iot_submit_vitals_stream
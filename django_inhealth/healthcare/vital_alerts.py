@@ -5,12 +5,15 @@ Two-stage intelligent alert system:
 2. Sends alerts to doctor/nurse/EMS only based on patient's response
 3. Auto-escalates if patient doesn't respond within timeout
 """
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
-from twilio.rest import Client
-import uuid
+from . import alert_timing
+from .alert_digest import add_to_digest
+from .alert_recipients import recipient_resolver
+from .notification_dispatcher import (
+    dispatch_notifications, email_message, get_notification_dispatcher, sms_message, whatsapp_message
+)
 
 
 def get_user_notification_preferences(user):
@@ -27,30 +30,72 @@ def get_user_notification_preferences(user):
         return NotificationPreferences.objects.create(user=user)
 
 
-def create_dashboard_notification(user, title, message, notification_type='vital_alert'):
+def build_dashboard_notification(user, title, message, notification_type='vital_alert', link=''):
     """
-    Create in-app dashboard notification for user
+    Build (without saving) an in-app dashboard notification for user
 
     Args:
         user: User object to notify
         title: Notification title
         message: Notification message
         notification_type: Type of notification (default: 'vital_alert')
+        link: Optional URL the notification points to
 
     Returns:
-        Notification object created
+        Unsaved Notification, or None if there is no user
     """
     from .models import Notification
 
-    notification = Notification.objects.create(
+    if user is None:
+        return None
+
+    return Notification(
         user=user,
         title=title,
         message=message,
         notification_type=notification_type,
+        link=link,
         is_read=False
     )
 
-    return notification
+
+def create_dashboard_notifications(notifications):
+    """
+    Save the dashboard notifications for one event in a single INSERT
+
+    Args:
+        notifications: Iterable of Notifications from build_dashboard_notification
+            (None entries are skipped)
+
+    Returns:
+        list: Notification objects created
+    """
+    from .models import Notification
+
+    notifications = [notification for notification in notifications if notification is not None]
+    if not notifications:
+        return []
+
+    return Notification.objects.bulk_create(notifications)
+
+
+def create_dashboard_notification(user, title, message, notification_type='vital_alert'):
+    """
+    Create in-app dashboard notification for user
+
+    Args:
+        user: User object to notify
+        title: Notification title
+        message: Notification message
+        notification_type: Type of notification (default: 'vital_alert')
+
+    Returns:
+        Notification object created
+    """
+    created = create_dashboard_notifications([
+        build_dashboard_notification(user, title, message, notification_type)
+    ])
+    return created[0] if created else None
 
 
 def get_critical_vitals(vital_sign):
@@ -58,179 +103,162 @@ def get_critical_vitals(vital_sign):
     Analyze all vital signs and return critical ones with their status
     Returns: list of tuples (vital_name, value, color, contact_level)
     """
+    from .vital_classifier import ALERT_COLORS, classify_vital_sign
+
+    statuses = classify_vital_sign(vital_sign)
     critical_vitals = []
 
     # Check Heart Rate
-    hr_status = vital_sign.get_heart_rate_status()
-    if hr_status[0] in ['blue', 'red', 'orange']:
+    hr_status = statuses['heart_rate']
+    if hr_status[0] in ALERT_COLORS:
         critical_vitals.append(('Heart Rate', vital_sign.heart_rate, hr_status[0], hr_status[1]))
 
     # Check Systolic BP
-    sbp_status = vital_sign.get_sbp_status()
-    if sbp_status[0] in ['blue', 'red', 'orange']:
+    sbp_status = statuses['blood_pressure_systolic']
+    if sbp_status[0] in ALERT_COLORS:
         critical_vitals.append(('Systolic BP', vital_sign.blood_pressure_systolic, sbp_status[0], sbp_status[1]))
 
     # Check Diastolic BP
-    dbp_status = vital_sign.get_dbp_status()
-    if dbp_status[0] in ['blue', 'red', 'orange']:
+    dbp_status = statuses['blood_pressure_diastolic']
+    if dbp_status[0] in ALERT_COLORS:
         critical_vitals.append(('Diastolic BP', vital_sign.blood_pressure_diastolic, dbp_status[0], dbp_status[1]))
 
     # Check Temperature
-    temp_status = vital_sign.get_temperature_status()
-    if temp_status[0] in ['blue', 'red', 'orange']:
+    temp_status = statuses['temperature']
+    if temp_status[0] in ALERT_COLORS:
         temp_display = f"{vital_sign.temperature_value}°{vital_sign.temperature_unit}"
         critical_vitals.append(('Temperature', temp_display, temp_status[0], temp_status[1]))
 
     # Check Respiratory Rate
-    rr_status = vital_sign.get_respiratory_rate_status()
-    if rr_status[0] in ['blue', 'red', 'orange']:
+    rr_status = statuses['respiratory_rate']
+    if rr_status[0] in ALERT_COLORS:
         critical_vitals.append(('Respiratory Rate', vital_sign.respiratory_rate, rr_status[0], rr_status[1]))
 
     # Check Oxygen Saturation
-    o2_status = vital_sign.get_oxygen_saturation_status()
-    if o2_status[0] in ['blue', 'red', 'orange']:
+    o2_status = statuses['oxygen_saturation']
+    if o2_status[0] in ALERT_COLORS:
         critical_vitals.append(('Oxygen Saturation', f"{vital_sign.oxygen_saturation}%", o2_status[0], o2_status[1]))
 
     # Check Glucose
-    glucose_status = vital_sign.get_glucose_status()
-    if glucose_status[0] in ['blue', 'red', 'orange']:
+    glucose_status = statuses['glucose']
+    if glucose_status[0] in ALERT_COLORS:
         critical_vitals.append(('Blood Glucose', f"{vital_sign.glucose} mg/dL", glucose_status[0], glucose_status[1]))
 
     return critical_vitals
 
 
-def send_vital_alert_email(recipient_email, recipient_name, patient_name, critical_vitals, alert_type):
+def format_phone_number(phone_number):
+    """Normalise a phone number to E.164, assuming +1 when no country code is given"""
+    if phone_number.startswith('+'):
+        return phone_number
+    return f"+1{phone_number.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')}"
+
+
+def build_vital_alert_email(recipient_email, recipient_name, patient_name, critical_vitals, alert_type):
     """
-    Send email alert for critical vital signs
+    Build the email alert for critical vital signs
     alert_type: 'emergency', 'doctor', or 'nurse'
+    Returns: OutboundMessage, or None if there is no recipient
     """
     if not recipient_email:
-        return False
+        return None
 
-    try:
-        subject = f"🚨 Critical Vital Signs Alert - {patient_name}"
-
-        message = render_to_string('healthcare/email/vital_alert_email.html', {
-            'recipient_name': recipient_name,
-            'patient_name': patient_name,
-            'critical_vitals': critical_vitals,
-            'alert_type': alert_type,
-        })
-
-        send_mail(
-            subject,
-            '',
-            settings.DEFAULT_FROM_EMAIL,
-            [recipient_email],
-            html_message=message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to send email to {recipient_email}: {str(e)}")
-        return False
+    subject = f"🚨 Critical Vital Signs Alert - {patient_name}"
 
+    message = render_to_string('healthcare/email/vital_alert_email.html', {
+        'recipient_name': recipient_name,
+        'patient_name': patient_name,
+        'critical_vitals': critical_vitals,
+        'alert_type': alert_type,
+    })
 
-def send_vital_alert_sms(phone_number, patient_name, critical_vitals, alert_type):
+    return email_message(recipient_email, subject, html_body=message)
+
+
+def build_vital_alert_sms(phone_number, patient_name, critical_vitals, alert_type):
     """
-    Send SMS alert for critical vital signs
+    Build the SMS alert for critical vital signs
+    Returns: OutboundMessage, or None if SMS cannot be sent
     """
     if not phone_number or not settings.TWILIO_ACCOUNT_SID:
-        return False
-
-    try:
-        # Format phone number
-        if not phone_number.startswith('+'):
-            phone_number = f"+1{phone_number.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')}"
+        return None
 
-        # Build SMS message
-        alert_emoji = "🚨" if alert_type in ['emergency', 'doctor'] else "⚠️"
-        message = f"{alert_emoji} InHealth Alert: Critical vitals for {patient_name}. "
+    # Build SMS message
+    alert_emoji = "🚨" if alert_type in ['emergency', 'doctor'] else "⚠️"
+    message = f"{alert_emoji} InHealth Alert: Critical vitals for {patient_name}. "
 
-        for vital_name, value, color, contact_level in critical_vitals[:3]:  # Limit to 3 vitals for SMS
-            message += f"{vital_name}: {value} ({contact_level}). "
+    for vital_name, value, color, contact_level in critical_vitals[:3]:  # Limit to 3 vitals for SMS
+        message += f"{vital_name}: {value} ({contact_level}). "
 
-        message += "Please check your email for details."
+    message += "Please check your email for details."
 
-        # Send SMS via Twilio
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        client.messages.create(
-            body=message,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone_number
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to send SMS to {phone_number}: {str(e)}")
-        return False
+    return sms_message(format_phone_number(phone_number), message)
 
 
-def send_vital_alert_whatsapp(whatsapp_number, patient_name, critical_vitals, alert_type):
+def build_vital_alert_whatsapp(whatsapp_number, patient_name, critical_vitals, alert_type):
     """
-    Send WhatsApp alert for critical vital signs via Twilio WhatsApp API
+    Build the WhatsApp alert for critical vital signs (Twilio WhatsApp API)
+    Returns: OutboundMessage, or None if WhatsApp cannot be sent
     """
     if not whatsapp_number or not settings.TWILIO_ACCOUNT_SID:
-        return False
+        return None
 
-    try:
-        # Format phone number for WhatsApp
-        if not whatsapp_number.startswith('+'):
-            whatsapp_number = f"+1{whatsapp_number.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')}"
+    # Build WhatsApp message (can be longer and more detailed than SMS)
+    if alert_type == 'emergency':
+        alert_level = "⚠️ *EMERGENCY ALERT*"
+    elif alert_type == 'doctor':
+        alert_level = "🔴 *CRITICAL ALERT*"
+    else:
+        alert_level = "⚠️ *WARNING ALERT*"
+
+    message = f"{alert_level}\n\n"
+    message += f"*InHealth EHR - Vital Signs Alert*\n"
+    message += f"Patient: *{patient_name}*\n\n"
+    message += f"*Critical Vital Signs Detected:*\n"
+
+    for vital_name, value, color, contact_level in critical_vitals:
+        # Use emojis for visual impact
+        if color == 'blue':
+            status_emoji = "🔵"
+        elif color == 'red':
+            status_emoji = "🔴"
+        else:
+            status_emoji = "🟠"
 
-        # Build WhatsApp message (can be longer and more detailed than SMS)
-        alert_emoji = "🚨" if alert_type in ['emergency', 'doctor'] else "⚠️"
+        message += f"{status_emoji} {vital_name}: *{value}* ({contact_level})\n"
 
-        if alert_type == 'emergency':
-            alert_level = "⚠️ *EMERGENCY ALERT*"
-        elif alert_type == 'doctor':
-            alert_level = "🔴 *CRITICAL ALERT*"
-        else:
-            alert_level = "⚠️ *WARNING ALERT*"
-
-        message = f"{alert_level}\n\n"
-        message += f"*InHealth EHR - Vital Signs Alert*\n"
-        message += f"Patient: *{patient_name}*\n\n"
-        message += f"*Critical Vital Signs Detected:*\n"
-
-        for vital_name, value, color, contact_level in critical_vitals:
-            # Use emojis for visual impact
-            if color == 'blue':
-                status_emoji = "🔵"
-            elif color == 'red':
-                status_emoji = "🔴"
-            else:
-                status_emoji = "🟠"
-
-            message += f"{status_emoji} {vital_name}: *{value}* ({contact_level})\n"
-
-        message += f"\n📧 Check your email for complete details and recommended actions.\n"
-
-        if alert_type == 'emergency':
-            message += f"\n⚠️ *IMMEDIATE ACTION REQUIRED*\n"
-            message += f"Please seek medical attention immediately."
-
-        # Send WhatsApp message via Twilio
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-
-        # Get WhatsApp sender number from settings or use default format
-        whatsapp_from = getattr(settings, 'TWILIO_WHATSAPP_NUMBER', None)
-        if not whatsapp_from:
-            # Twilio WhatsApp sandbox format
-            whatsapp_from = f"whatsapp:{settings.TWILIO_PHONE_NUMBER}"
-        elif not whatsapp_from.startswith('whatsapp:'):
-            whatsapp_from = f"whatsapp:{whatsapp_from}"
-
-        whatsapp_to = f"whatsapp:{whatsapp_number}"
-
-        client.messages.create(
-            body=message,
-            from_=whatsapp_from,
-            to=whatsapp_to
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to send WhatsApp message to {whatsapp_number}: {str(e)}")
-        return False
+    message += f"\n📧 Check your email for complete details and recommended actions.\n"
+
+    if alert_type == 'emergency':
+        message += f"\n⚠️ *IMMEDIATE ACTION REQUIRED*\n"
+        message += f"Please seek medical attention immediately."
+
+    return whatsapp_message(format_phone_number(whatsapp_number), message)
+
+
+def send_vital_alert_email(recipient_email, recipient_name, patient_name, critical_vitals, alert_type):
+    """
+    Send email alert for critical vital signs
+    alert_type: 'emergency', 'doctor', or 'nurse'
+    """
+    message = build_vital_alert_email(recipient_email, recipient_name, patient_name, critical_vitals, alert_type)
+    return message is not None and get_notification_dispatcher().send(message)
+
+
+def send_vital_alert_sms(phone_number, patient_name, critical_vitals, alert_type):
+    """
+    Send SMS alert for critical vital signs
+    """
+    message = build_vital_alert_sms(phone_number, patient_name, critical_vitals, alert_type)
+    return message is not None and get_notification_dispatcher().send(message)
+
+
+def send_vital_alert_whatsapp(whatsapp_number, patient_name, critical_vitals, alert_type):
+    """
+    Send WhatsApp alert for critical vital signs via Twilio WhatsApp API
+    """
+    message = build_vital_alert_whatsapp(whatsapp_number, patient_name, critical_vitals, alert_type)
+    return message is not None and get_notification_dispatcher().send(message)
 
 
 def get_active_nurses(patient):
@@ -245,173 +273,196 @@ def get_active_nurses(patient):
         return Nurse.objects.filter(
             hospital=patient.hospital,
             is_active=True
-        )
+        ).select_related('user')
 
     # If no hospital, get all active nurses (fallback)
-    return Nurse.objects.filter(is_active=True)[:5]  # Limit to 5 nurses
+    return Nurse.objects.filter(is_active=True).select_related('user')[:5]  # Limit to 5 nurses
 
 
-def send_patient_permission_request_email(patient_email, patient_name, critical_vitals, alert_type, response_token):
+def build_care_team_alerts(recipient, patient, critical_vitals, alert_type):
     """
-    Send email to patient asking for permission to notify providers
+    Build the email/SMS/WhatsApp alerts for one care team member
+    Honours the recipient's notification preferences and digest mode
+
+    Args:
+        recipient: alert_recipients.Recipient
+        patient: Patient the alert is about
+        critical_vitals: list of (vital_name, value, color, contact_level)
+        alert_type: 'emergency', 'critical' or 'warning'
+
+    Returns:
+        tuple: (list of OutboundMessage, whether the recipient counts as notified)
+    """
+    patient_name = patient.full_name
+
+    if recipient.user is None:
+        # No user account, send alerts by default
+        outbound = [
+            build_vital_alert_email(recipient.email, recipient.name, patient_name, critical_vitals, alert_type),
+            build_vital_alert_sms(recipient.phone, patient_name, critical_vitals, alert_type),
+        ]
+        return outbound, bool(recipient.email)
+
+    prefs = recipient.prefs
+
+    # Non-emergency alerts for digest users are held for the next digest
+    if add_to_digest(recipient.user, prefs, patient, critical_vitals, alert_type):
+        return [], True
+
+    outbound = []
+    notified = False
+
+    # Send email if enabled
+    if recipient.email and prefs.should_send_email(alert_type):
+        outbound.append(build_vital_alert_email(recipient.email, recipient.name, patient_name, critical_vitals, alert_type))
+        notified = True
+
+    # Send SMS if enabled
+    if recipient.phone and prefs.should_send_sms(alert_type):
+        outbound.append(build_vital_alert_sms(recipient.phone, patient_name, critical_vitals, alert_type))
+
+    # Send WhatsApp if enabled
+    if recipient.whatsapp and prefs.should_send_whatsapp(alert_type):
+        outbound.append(build_vital_alert_whatsapp(recipient.whatsapp, patient_name, critical_vitals, alert_type))
+
+    return outbound, notified
+
+
+def build_patient_permission_request_email(patient_email, patient_name, critical_vitals, alert_type, response_token):
+    """
+    Build the email asking the patient for permission to notify providers
     Includes interactive buttons/links for patient response
     """
     if not patient_email:
-        return False
+        return None
 
-    try:
-        subject = f"🚨 Health Alert - Your Response Needed - {patient_name}"
-
-        # Build response URLs
-        base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
-        approve_doctor_url = f"{base_url}/vital-alert/respond/{response_token}/approve_doctor/"
-        approve_nurse_url = f"{base_url}/vital-alert/respond/{response_token}/approve_nurse/"
-        approve_ems_url = f"{base_url}/vital-alert/respond/{response_token}/approve_ems/"
-        approve_all_url = f"{base_url}/vital-alert/respond/{response_token}/approve_all/"
-        decline_url = f"{base_url}/vital-alert/respond/{response_token}/decline/"
-
-        message = render_to_string('healthcare/email/patient_permission_request.html', {
-            'patient_name': patient_name,
-            'critical_vitals': critical_vitals,
-            'alert_type': alert_type,
-            'approve_doctor_url': approve_doctor_url,
-            'approve_nurse_url': approve_nurse_url,
-            'approve_ems_url': approve_ems_url,
-            'approve_all_url': approve_all_url,
-            'decline_url': decline_url,
-        })
-
-        send_mail(
-            subject,
-            '',
-            settings.DEFAULT_FROM_EMAIL,
-            [patient_email],
-            html_message=message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to send permission request email to {patient_email}: {str(e)}")
-        return False
+    subject = f"🚨 Health Alert - Your Response Needed - {patient_name}"
 
+    # Build response URLs
+    base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
+    approve_doctor_url = f"{base_url}/vital-alert/respond/{response_token}/approve_doctor/"
+    approve_nurse_url = f"{base_url}/vital-alert/respond/{response_token}/approve_nurse/"
+    approve_ems_url = f"{base_url}/vital-alert/respond/{response_token}/approve_ems/"
+    approve_all_url = f"{base_url}/vital-alert/respond/{response_token}/approve_all/"
+    decline_url = f"{base_url}/vital-alert/respond/{response_token}/decline/"
 
-def send_patient_permission_request_sms(phone_number, patient_name, critical_vitals, alert_type, response_token):
+    message = render_to_string('healthcare/email/patient_permission_request.html', {
+        'patient_name': patient_name,
+        'critical_vitals': critical_vitals,
+        'alert_type': alert_type,
+        'approve_doctor_url': approve_doctor_url,
+        'approve_nurse_url': approve_nurse_url,
+        'approve_ems_url': approve_ems_url,
+        'approve_all_url': approve_all_url,
+        'decline_url': decline_url,
+    })
+
+    return email_message(patient_email, subject, html_body=message)
+
+
+def build_patient_permission_request_sms(phone_number, patient_name, critical_vitals, alert_type, response_token):
     """
-    Send SMS to patient asking for permission to notify providers
+    Build the SMS asking the patient for permission to notify providers
     Includes response link
     """
     if not phone_number or not settings.TWILIO_ACCOUNT_SID:
-        return False
+        return None
 
-    try:
-        # Format phone number
-        if not phone_number.startswith('+'):
-            phone_number = f"+1{phone_number.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')}"
-
-        # Build response URL (shortened for SMS)
-        base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
-        response_url = f"{base_url}/vital-alert/respond/{response_token}/"
-
-        # Build SMS message
-        alert_emoji = "🚨" if alert_type == 'emergency' else "⚠️"
-        critical_count = len(critical_vitals)
-
-        message = f"{alert_emoji} HEALTH ALERT: {critical_count} critical vital sign(s) detected for {patient_name}. "
-        message += f"Should we notify your healthcare team? Respond: {response_url}"
-
-        # Send SMS via Twilio
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        client.messages.create(
-            body=message,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone_number
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to send permission request SMS to {phone_number}: {str(e)}")
-        return False
+    # Build response URL (shortened for SMS)
+    base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
+    response_url = f"{base_url}/vital-alert/respond/{response_token}/"
 
+    # Build SMS message
+    alert_emoji = "🚨" if alert_type == 'emergency' else "⚠️"
+    critical_count = len(critical_vitals)
 
-def send_patient_permission_request_whatsapp(whatsapp_number, patient_name, critical_vitals, alert_type, response_token):
+    message = f"{alert_emoji} HEALTH ALERT: {critical_count} critical vital sign(s) detected for {patient_name}. "
+    message += f"Should we notify your healthcare team? Respond: {response_url}"
+
+    return sms_message(format_phone_number(phone_number), message)
+
+
+def build_patient_permission_request_whatsapp(whatsapp_number, patient_name, critical_vitals, alert_type, response_token):
     """
-    Send WhatsApp message to patient asking for permission to notify providers
+    Build the WhatsApp message asking the patient for permission to notify providers
     Includes interactive response options
     """
     if not whatsapp_number or not settings.TWILIO_ACCOUNT_SID:
-        return False
+        return None
 
-    try:
-        # Format phone number for WhatsApp
-        if not whatsapp_number.startswith('+'):
-            whatsapp_number = f"+1{whatsapp_number.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')}"
-
-        # Build response URLs
-        base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
-        approve_doctor_url = f"{base_url}/vital-alert/respond/{response_token}/approve_doctor/"
-        approve_nurse_url = f"{base_url}/vital-alert/respond/{response_token}/approve_nurse/"
-        approve_ems_url = f"{base_url}/vital-alert/respond/{response_token}/approve_ems/"
-        approve_all_url = f"{base_url}/vital-alert/respond/{response_token}/approve_all/"
-        decline_url = f"{base_url}/vital-alert/respond/{response_token}/decline/"
-
-        # Build WhatsApp message
-        if alert_type == 'emergency':
-            alert_level = "🚨 *EMERGENCY HEALTH ALERT*"
-        elif alert_type == 'doctor':
-            alert_level = "🔴 *CRITICAL HEALTH ALERT*"
-        else:
-            alert_level = "⚠️ *HEALTH WARNING ALERT*"
-
-        message = f"{alert_level}\n\n"
-        message += f"*InHealth EHR - Your Response Needed*\n"
-        message += f"Patient: *{patient_name}*\n\n"
-        message += f"*Critical Vital Signs Detected:*\n"
-
-        for vital_name, value, color, contact_level in critical_vitals:
-            # Use emojis for visual impact
-            if color == 'blue':
-                status_emoji = "🔵"
-            elif color == 'red':
-                status_emoji = "🔴"
-            else:
-                status_emoji = "🟠"
-
-            message += f"{status_emoji} {vital_name}: *{value}* ({contact_level})\n"
-
-        message += f"\n*Would you like us to notify your healthcare team?*\n\n"
-        message += f"Please choose one of the following options:\n\n"
-        message += f"1️⃣ Notify Doctor: {approve_doctor_url}\n\n"
-        message += f"2️⃣ Notify Nurse: {approve_nurse_url}\n\n"
-        message += f"3️⃣ Call EMS: {approve_ems_url}\n\n"
-        message += f"4️⃣ Notify All: {approve_all_url}\n\n"
-        message += f"❌ No Action Needed: {decline_url}\n\n"
-
-        if alert_type == 'emergency':
-            message += f"⏰ *Please respond within 15 minutes, or we will automatically notify your doctor.*"
+    # Build response URLs
+    base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
+    approve_doctor_url = f"{base_url}/vital-alert/respond/{response_token}/approve_doctor/"
+    approve_nurse_url = f"{base_url}/vital-alert/respond/{response_token}/approve_nurse/"
+    approve_ems_url = f"{base_url}/vital-alert/respond/{response_token}/approve_ems/"
+    approve_all_url = f"{base_url}/vital-alert/respond/{response_token}/approve_all/"
+    decline_url = f"{base_url}/vital-alert/respond/{response_token}/decline/"
+
+    # Build WhatsApp message
+    if alert_type == 'emergency':
+        alert_level = "🚨 *EMERGENCY HEALTH ALERT*"
+    elif alert_type == 'doctor':
+        alert_level = "🔴 *CRITICAL HEALTH ALERT*"
+    else:
+        alert_level = "⚠️ *HEALTH WARNING ALERT*"
+
+    message = f"{alert_level}\n\n"
+    message += f"*InHealth EHR - Your Response Needed*\n"
+    message += f"Patient: *{patient_name}*\n\n"
+    message += f"*Critical Vital Signs Detected:*\n"
+
+    for vital_name, value, color, contact_level in critical_vitals:
+        # Use emojis for visual impact
+        if color == 'blue':
+            status_emoji = "🔵"
+        elif color == 'red':
+            status_emoji = "🔴"
         else:
-            message += f"⏰ Please respond within 15 minutes."
+            status_emoji = "🟠"
+
+        message += f"{status_emoji} {vital_name}: *{value}* ({contact_level})\n"
+
+    message += f"\n*Would you like us to notify your healthcare team?*\n\n"
+    message += f"Please choose one of the following options:\n\n"
+    message += f"1️⃣ Notify Doctor: {approve_doctor_url}\n\n"
+    message += f"2️⃣ Notify Nurse: {approve_nurse_url}\n\n"
+    message += f"3️⃣ Call EMS: {approve_ems_url}\n\n"
+    message += f"4️⃣ Notify All: {approve_all_url}\n\n"
+    message += f"❌ No Action Needed: {decline_url}\n\n"
+
+    if alert_type == 'emergency':
+        message += f"⏰ *Please respond within 15 minutes, or we will automatically notify your doctor.*"
+    else:
+        message += f"⏰ Please respond within 15 minutes."
 
-        # Send WhatsApp message via Twilio
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    return whatsapp_message(format_phone_number(whatsapp_number), message)
 
-        # Get WhatsApp sender number from settings or use default format
-        whatsapp_from = getattr(settings, 'TWILIO_WHATSAPP_NUMBER', None)
-        if not whatsapp_from:
-            # Twilio WhatsApp sandbox format
-            whatsapp_from = f"whatsapp:{settings.TWILIO_PHONE_NUMBER}"
-        elif not whatsapp_from.startswith('whatsapp:'):
-            whatsapp_from = f"whatsapp:{whatsapp_from}"
 
-        whatsapp_to = f"whatsapp:{whatsapp_number}"
+def send_patient_permission_request_email(patient_email, patient_name, critical_vitals, alert_type, response_token):
+    """
+    Send email to patient asking for permission to notify providers
+    Includes interactive buttons/links for patient response
+    """
+    message = build_patient_permission_request_email(patient_email, patient_name, critical_vitals, alert_type, response_token)
+    return message is not None and get_notification_dispatcher().send(message)
+
+
+def send_patient_permission_request_sms(phone_number, patient_name, critical_vitals, alert_type, response_token):
+    """
+    Send SMS to patient asking for permission to notify providers
+    Includes response link
+    """
+    message = build_patient_permission_request_sms(phone_number, patient_name, critical_vitals, alert_type, response_token)
+    return message is not None and get_notification_dispatcher().send(message)
+
 
-        client.messages.create(
-            body=message,
-            from_=whatsapp_from,
-            to=whatsapp_to
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to send WhatsApp permission request to {whatsapp_number}: {str(e)}")
-        return False
+def send_patient_permission_request_whatsapp(whatsapp_number, patient_name, critical_vitals, alert_type, response_token):
+    """
+    Send WhatsApp message to patient asking for permission to notify providers
+    Includes interactive response options
+    """
+    message = build_patient_permission_request_whatsapp(whatsapp_number, patient_name, critical_vitals, alert_type, response_token)
+    return message is not None and get_notification_dispatcher().send(message)
 
 
 def send_alert_to_providers(alert_response):
@@ -423,152 +474,37 @@ def send_alert_to_providers(alert_response):
         alert_response: VitalSignAlertResponse instance with patient's decision
     """
     from .models import VitalSignAlertResponse
+    from .alert_suppression import critical_vitals_from_json
 
     vital_sign = alert_response.vital_sign
     patient = alert_response.patient
     patient_name = patient.full_name
-    critical_vitals = alert_response.critical_vitals_json
+    critical_vitals = critical_vitals_from_json(alert_response.critical_vitals_json)
     alert_type = alert_response.alert_type
 
     # Get doctor and nurses
     doctor = vital_sign.encounter.provider if hasattr(vital_sign, 'encounter') else None
-    active_nurses = get_active_nurses(patient)
 
     # Track who was notified
     doctor_notified = False
     nurses_notified = 0
     ems_notified = False
 
-    # ============================================================================
-    # NOTIFY DOCTOR (if patient approved)
-    # ============================================================================
-    if alert_response.patient_wants_doctor and doctor:
-        doctor_email = None
-        doctor_user = getattr(doctor, 'user', None)
-
-        if doctor_user and doctor_user.email:
-            doctor_email = doctor_user.email
-        elif hasattr(doctor, 'email') and doctor.email:
-            doctor_email = doctor.email
-
-        # Check notification preferences
-        if doctor_user:
-            prefs = get_user_notification_preferences(doctor_user)
-
-            # Send email if enabled
-            if doctor_email and prefs.should_send_email(alert_type):
-                send_vital_alert_email(
-                    doctor_email,
-                    f"Dr. {doctor.full_name}",
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-                doctor_notified = True
-
-            # Send SMS if enabled
-            if hasattr(doctor, 'phone') and doctor.phone and prefs.should_send_sms(alert_type):
-                send_vital_alert_sms(
-                    doctor.phone,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-
-            # Send WhatsApp if enabled
-            doctor_whatsapp = prefs.whatsapp_number if prefs.whatsapp_number else (doctor.phone if hasattr(doctor, 'phone') else None)
-            if doctor_whatsapp and prefs.should_send_whatsapp(alert_type):
-                send_vital_alert_whatsapp(
-                    doctor_whatsapp,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-        else:
-            # No user account, send alerts by default
-            if doctor_email:
-                send_vital_alert_email(
-                    doctor_email,
-                    f"Dr. {doctor.full_name}",
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-                doctor_notified = True
-
-            if hasattr(doctor, 'phone') and doctor.phone:
-                send_vital_alert_sms(
-                    doctor.phone,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
+    # Outbound email/SMS/WhatsApp messages, sent together in parallel below
+    outbound = []
 
     # ============================================================================
-    # NOTIFY NURSES (if patient approved)
+    # NOTIFY DOCTOR AND NURSES (if patient approved)
     # ============================================================================
-    if alert_response.patient_wants_nurse:
-        for nurse in active_nurses:
-            nurse_user = getattr(nurse, 'user', None)
-            nurse_email = None
-
-            if nurse_user and nurse_user.email:
-                nurse_email = nurse_user.email
-            elif hasattr(nurse, 'email') and nurse.email:
-                nurse_email = nurse.email
-
-            # Check notification preferences
-            if nurse_user:
-                prefs = get_user_notification_preferences(nurse_user)
-
-                # Send email if enabled
-                if nurse_email and prefs.should_send_email(alert_type):
-                    send_vital_alert_email(
-                        nurse_email,
-                        nurse.full_name,
-                        patient_name,
-                        critical_vitals,
-                        alert_type
-                    )
-                    nurses_notified += 1
-
-                # Send SMS if enabled
-                if hasattr(nurse, 'phone') and nurse.phone and prefs.should_send_sms(alert_type):
-                    send_vital_alert_sms(
-                        nurse.phone,
-                        patient_name,
-                        critical_vitals,
-                        alert_type
-                    )
-
-                # Send WhatsApp if enabled
-                nurse_whatsapp = prefs.whatsapp_number if prefs.whatsapp_number else (nurse.phone if hasattr(nurse, 'phone') else None)
-                if nurse_whatsapp and prefs.should_send_whatsapp(alert_type):
-                    send_vital_alert_whatsapp(
-                        nurse_whatsapp,
-                        patient_name,
-                        critical_vitals,
-                        alert_type
-                    )
-            else:
-                # No user account, send alerts by default
-                if nurse_email:
-                    send_vital_alert_email(
-                        nurse_email,
-                        nurse.full_name,
-                        patient_name,
-                        critical_vitals,
-                        alert_type
-                    )
-                    nurses_notified += 1
-
-                if hasattr(nurse, 'phone') and nurse.phone:
-                    send_vital_alert_sms(
-                        nurse.phone,
-                        patient_name,
-                        critical_vitals,
-                        alert_type
-                    )
+    for recipient in recipient_resolver.resolve(patient, doctor):
+        if recipient.role == 'doctor' and alert_response.patient_wants_doctor:
+            messages, doctor_notified = build_care_team_alerts(recipient, patient, critical_vitals, alert_type)
+        elif recipient.role == 'nurse' and alert_response.patient_wants_nurse:
+            messages, notified = build_care_team_alerts(recipient, patient, critical_vitals, alert_type)
+            nurses_notified += int(notified)
+        else:
+            continue
+        outbound += messages
 
     # ============================================================================
     # NOTIFY EMS (if patient approved)
@@ -579,22 +515,24 @@ def send_alert_to_providers(alert_response):
         ems_phone = getattr(settings, 'EMS_CONTACT_PHONE', None)
 
         if ems_email:
-            send_vital_alert_email(
+            outbound.append(build_vital_alert_email(
                 ems_email,
                 "EMS Dispatch",
                 patient_name,
                 critical_vitals,
                 'emergency'  # EMS always gets emergency level
-            )
+            ))
             ems_notified = True
 
         if ems_phone:
-            send_vital_alert_sms(
+            outbound.append(build_vital_alert_sms(
                 ems_phone,
                 patient_name,
                 critical_vitals,
                 'emergency'
-            )
+            ))
+
+    dispatch_notifications(outbound)
 
     # Update the alert response record
     alert_response.doctor_notified = doctor_notified
@@ -625,12 +563,13 @@ def process_vital_alerts(vital_sign):
     - Auto-escalate to EMS if no response on emergencies
     """
     # Get all critical vitals
-    critical_vitals = get_critical_vitals(vital_sign)
+    with alert_timing.span('classify'):
+        critical_vitals = get_critical_vitals(vital_sign)
 
     if not critical_vitals:
         return  # No critical vitals, no alerts needed
 
-    from .models import VitalSignAlertResponse
+    from .alert_suppression import claim_alert
 
     # Get patient info
     patient = vital_sign.encounter.patient
@@ -649,6 +588,23 @@ def process_vital_alerts(vital_sign):
     else:
         alert_type = 'warning'
 
+    # ============================================================================
+    # ALERT STORM SUPPRESSION: Fold repeats into the patient's open alert
+    # Only new or more severe vitals open a new alert and notify anyone
+    # ============================================================================
+
+    with alert_timing.span('create_alert'):
+        alert_response, notify = claim_alert(vital_sign, patient, critical_vitals, alert_type)
+    # A new alert may have inherited a higher severity from the alert it superseded
+    alert_type = alert_response.alert_type
+    if not notify:
+        print(f"Vital alert for {patient_name} folded into open alert {alert_response.alert_id} "
+              f"({alert_response.occurrence_count} occurrences)")
+        return alert_response
+
+    # Keep this reading's stage timings (see alert_timing)
+    alert_timing.record_alert(alert_response)
+
     # ============================================================================
     # IMMEDIATE NOTIFICATION: Notify Doctor and Nurses RIGHT AWAY
     # This ensures medical staff know about critical vitals immediately
@@ -656,196 +612,63 @@ def process_vital_alerts(vital_sign):
 
     print(f"CRITICAL VITAL ALERT for {patient_name} - Notifying care team immediately...")
 
-    # NOTIFY DOCTOR IMMEDIATELY
+    # Outbound email/SMS/WhatsApp messages for the care team, sent together in parallel
+    outbound = []
+
+    # NOTIFY DOCTOR AND ALL NURSES IMMEDIATELY
     doctor_notified = False
-    if doctor:
-        doctor_email = None
-        doctor_user = getattr(doctor, 'user', None)
-
-        if doctor_user and doctor_user.email:
-            doctor_email = doctor_user.email
-        elif hasattr(doctor, 'email') and doctor.email:
-            doctor_email = doctor.email
-
-        # Check notification preferences
-        if doctor_user:
-            prefs = get_user_notification_preferences(doctor_user)
-
-            # Send email if enabled
-            if doctor_email and prefs.should_send_email(alert_type):
-                send_vital_alert_email(
-                    doctor_email,
-                    f"Dr. {doctor.full_name}",
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-                doctor_notified = True
-
-            # Send SMS if enabled
-            if hasattr(doctor, 'phone') and doctor.phone and prefs.should_send_sms(alert_type):
-                send_vital_alert_sms(
-                    doctor.phone,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-
-            # Send WhatsApp if enabled
-            doctor_whatsapp = prefs.whatsapp_number if prefs.whatsapp_number else (doctor.phone if hasattr(doctor, 'phone') else None)
-            if doctor_whatsapp and prefs.should_send_whatsapp(alert_type):
-                send_vital_alert_whatsapp(
-                    doctor_whatsapp,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-
-            # Create dashboard notification for doctor
-            alert_emoji = "🚨" if alert_type == 'emergency' else ("🔴" if alert_type == 'critical' else "⚠️")
-            vitals_summary = ", ".join([f"{v[0]}: {v[1]}" for v in critical_vitals[:3]])
-            create_dashboard_notification(
-                user=doctor_user,
-                title=f"{alert_emoji} Critical Vitals Alert - {patient_name}",
-                message=f"Patient {patient_name} has critical vital signs: {vitals_summary}. Please review immediately.",
-                notification_type='vital_alert'
-            )
-            doctor_notified = True
-        else:
-            # No user account, send alerts by default
-            if doctor_email:
-                send_vital_alert_email(
-                    doctor_email,
-                    f"Dr. {doctor.full_name}",
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-                doctor_notified = True
-
-            if hasattr(doctor, 'phone') and doctor.phone:
-                send_vital_alert_sms(
-                    doctor.phone,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-
-    # NOTIFY ALL NURSES IMMEDIATELY
-    active_nurses = get_active_nurses(patient)
     nurses_notified = 0
+    alert_emoji = "🚨" if alert_type == 'emergency' else ("🔴" if alert_type == 'critical' else "⚠️")
+    vitals_summary = ", ".join([f"{v[0]}: {v[1]}" for v in critical_vitals[:3]])
 
-    for nurse in active_nurses:
-        nurse_user = getattr(nurse, 'user', None)
-        nurse_email = None
-
-        if nurse_user and nurse_user.email:
-            nurse_email = nurse_user.email
-        elif hasattr(nurse, 'email') and nurse.email:
-            nurse_email = nurse.email
-
-        # Check notification preferences
-        if nurse_user:
-            prefs = get_user_notification_preferences(nurse_user)
-
-            # Send email if enabled
-            if nurse_email and prefs.should_send_email(alert_type):
-                send_vital_alert_email(
-                    nurse_email,
-                    nurse.full_name,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-                nurses_notified += 1
-
-            # Send SMS if enabled
-            if hasattr(nurse, 'phone') and nurse.phone and prefs.should_send_sms(alert_type):
-                send_vital_alert_sms(
-                    nurse.phone,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-
-            # Send WhatsApp if enabled
-            nurse_whatsapp = prefs.whatsapp_number if prefs.whatsapp_number else (nurse.phone if hasattr(nurse, 'phone') else None)
-            if nurse_whatsapp and prefs.should_send_whatsapp(alert_type):
-                send_vital_alert_whatsapp(
-                    nurse_whatsapp,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-
-            # Create dashboard notification for nurse
-            alert_emoji = "🚨" if alert_type == 'emergency' else ("🔴" if alert_type == 'critical' else "⚠️")
-            vitals_summary = ", ".join([f"{v[0]}: {v[1]}" for v in critical_vitals[:3]])
-            create_dashboard_notification(
-                user=nurse_user,
-                title=f"{alert_emoji} Critical Vitals Alert - {patient_name}",
-                message=f"Patient {patient_name} has critical vital signs: {vitals_summary}. Immediate attention required.",
-                notification_type='vital_alert'
-            )
-        else:
-            # No user account, send alerts by default
-            if nurse_email:
-                send_vital_alert_email(
-                    nurse_email,
-                    nurse.full_name,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
-                nurses_notified += 1
-
-            if hasattr(nurse, 'phone') and nurse.phone:
-                send_vital_alert_sms(
-                    nurse.phone,
-                    patient_name,
-                    critical_vitals,
-                    alert_type
-                )
+    dashboard_notifications = []
+
+    for recipient in recipient_resolver.resolve(patient, doctor):
+        messages, notified = build_care_team_alerts(recipient, patient, critical_vitals, alert_type)
+        outbound += messages
+
+        # Dashboard notification for the doctor/nurse
+        follow_up = "Please review immediately." if recipient.role == 'doctor' else "Immediate attention required."
+        dashboard_notifications.append(build_dashboard_notification(
+            user=recipient.user,
+            title=f"{alert_emoji} Critical Vitals Alert - {patient_name}",
+            message=f"Patient {patient_name} has critical vital signs: {vitals_summary}. {follow_up}",
+            notification_type='vital_alert'
+        ))
+
+        if recipient.role == 'doctor':
+            doctor_notified = notified or recipient.user is not None
+        elif notified:
+            nurses_notified += 1
+
+    # Dashboard notification for the patient, if they have an account
+    patient_user = getattr(patient, 'user', None)
+    dashboard_notifications.append(build_dashboard_notification(
+        user=patient_user,
+        title=f"{alert_emoji} Critical Health Alert - Your Vitals",
+        message=f"Your vital signs show critical values: {vitals_summary}. Your doctor and nurses have been notified. If you need emergency services, please respond to the alert message.",
+        notification_type='vital_alert'
+    ))
+
+    # One INSERT for the whole care team and the patient
+    create_dashboard_notifications(dashboard_notifications)
+
+    alert_timing.dispatch_care_team(outbound)
 
     # ============================================================================
     # PATIENT NOTIFICATION: Inform patient and ask if they need EMS/additional help
     # ============================================================================
 
-    # Generate unique response token for patient to request EMS if needed
-    response_token = str(uuid.uuid4())
-
-    # Convert critical_vitals list to JSON-serializable format
-    critical_vitals_json = [
-        {
-            'vital_name': vital[0],
-            'value': str(vital[1]),
-            'color': vital[2],
-            'contact_level': vital[3]
-        }
-        for vital in critical_vitals
-    ]
-
-    # Create alert response record
-    alert_response = VitalSignAlertResponse.objects.create(
-        vital_sign=vital_sign,
-        patient=patient,
-        alert_type=alert_type,
-        critical_vitals_json=critical_vitals_json,
-        response_token=response_token,
-        patient_response_status='pending',
-        timeout_minutes=15,  # Auto-call EMS if emergency and no response
-        # Mark doctor and nurses as already notified
-        doctor_notified=doctor_notified,
-        nurse_notified=(nurses_notified > 0)
-    )
-
     # Update the response to show doctor and nurse were already contacted
+    alert_response.doctor_notified = doctor_notified
+    alert_response.nurse_notified = (nurses_notified > 0)
     alert_response.patient_wants_doctor = True  # Already notified
     alert_response.patient_wants_nurse = True   # Already notified
     alert_response.save()
 
-    # Get patient's user account if exists
-    patient_user = getattr(patient, 'user', None)
+    response_token = str(alert_response.response_token)
+
+    outbound = []
 
     # Send notification to patient (informational + EMS option)
     if patient_user:
@@ -853,63 +676,55 @@ def process_vital_alerts(vital_sign):
 
         # Send email notification if enabled
         if patient.email and prefs.should_send_email(alert_type):
-            send_patient_permission_request_email(
+            outbound.append(build_patient_permission_request_email(
                 patient.email,
                 patient.full_name,
                 critical_vitals,
                 alert_type,
                 response_token
-            )
+            ))
 
         # Send SMS notification if enabled
         if patient.phone and prefs.should_send_sms(alert_type):
-            send_patient_permission_request_sms(
+            outbound.append(build_patient_permission_request_sms(
                 patient.phone,
                 patient_name,
                 critical_vitals,
                 alert_type,
                 response_token
-            )
+            ))
 
         # Send WhatsApp notification if enabled
         whatsapp_num = prefs.whatsapp_number or patient.phone
         if whatsapp_num and prefs.should_send_whatsapp(alert_type):
-            send_patient_permission_request_whatsapp(
+            outbound.append(build_patient_permission_request_whatsapp(
                 whatsapp_num,
                 patient_name,
                 critical_vitals,
                 alert_type,
                 response_token
-            )
-
-        # Create dashboard notification for patient
-        alert_emoji = "🚨" if alert_type == 'emergency' else ("🔴" if alert_type == 'critical' else "⚠️")
-        vitals_summary = ", ".join([f"{v[0]}: {v[1]}" for v in critical_vitals[:3]])
-        create_dashboard_notification(
-            user=patient_user,
-            title=f"{alert_emoji} Critical Health Alert - Your Vitals",
-            message=f"Your vital signs show critical values: {vitals_summary}. Your doctor and nurses have been notified. If you need emergency services, please respond to the alert message.",
-            notification_type='vital_alert'
-        )
+            ))
     else:
         # No user account, send notifications by default
         if patient.email:
-            send_patient_permission_request_email(
+            outbound.append(build_patient_permission_request_email(
                 patient.email,
                 patient.full_name,
                 critical_vitals,
                 alert_type,
                 response_token
-            )
+            ))
 
         if patient.phone:
-            send_patient_permission_request_sms(
+            outbound.append(build_patient_permission_request_sms(
                 patient.phone,
                 patient_name,
                 critical_vitals,
                 alert_type,
                 response_token
-            )
+            ))
+
+    dispatch_notifications(outbound)
 
     # Log the alert
     print(f"✓ Critical vital sign alert processed for patient {patient_name}")
@@ -927,3 +742,5 @@ def process_vital_alerts(vital_sign):
     # 1. Click "Call EMS" -> VitalSignAlertResponse.process_patient_response('approve_ems')
     # 2. Click "I'm okay" -> VitalSignAlertResponse.process_patient_response('decline')
     # 3. No response + emergency -> Auto-escalation task calls EMS after timeout
+
+    return alert_response
@@ -0,0 +1,411 @@
+"""
+Vital Sign Chart Data
+
+Helpers for the vital sign chart pages (provider, nurse and patient views):
+
+    - parse_chart_range() reads the time window from the query string:
+      ?days=N (default 30, at most MAX_CHART_DAYS) or an explicit ?start=...&end=... range
+    - build_chart_series() fetches the vital columns of the window with
+      values_list and classifies them in bulk; ChartSeries.chart_data()
+      returns the Chart.js series, capped at CHART_MAX_POINTS points
+
+Device patients report every minute, so a 30 day window holds ~43k readings
+per vital and a year over 500k, far more than a chart can draw. Downsampling
+splits the window into equal time buckets and keeps, per bucket and per
+series, the lowest and the highest reading in the order they occurred.
+The colour bands only get more severe the further a value is from normal, so
+the most severe reading of a bucket is always its lowest or highest one:
+critical spikes stay visible in the downsampled chart with their colour.
+
+Clicking a point of a downsampled chart reloads the page for the range around
+its bucket; windows with no more than CHART_MAX_POINTS readings are charted
+raw.
+
+Windows of CHART_ROLLUP_MIN_DAYS or more are charted from the hourly or daily
+vital rollups (see vital_rollups) instead of the raw readings: each period's
+min and max make the two points of its bucket, so the page reads one row per
+period whatever the reading rate.
+
+Settings:
+    CHART_MAX_POINTS: Point budget per series (default 600)
+    CHART_ROLLUP_MIN_DAYS: Shortest window charted from rollups (default 3)
+    CHART_HOURLY_ROLLUP_MAX_DAYS: Longest window charted from hourly rollups;
+        longer ones use daily rollups (default 31)
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import VitalSign
+from .vital_classifier import COLORS, VITALS, classify_columns, level_for, np
+from .vital_rollups import empty_summary, load_rollups, merge_summaries, period_length
+
+DEFAULT_CHART_MAX_POINTS = 600
+
+# Longest ?days= window (larger values are clamped; timedelta overflows past ~2.7M days)
+MAX_CHART_DAYS = 3650
+
+# Chart series key -> VitalSign field, in chart order
+CHART_SERIES = (
+    ('heart_rate', 'heart_rate'),
+    ('sbp', 'blood_pressure_systolic'),
+    ('dbp', 'blood_pressure_diastolic'),
+    ('temperature', 'temperature'),
+    ('respiratory_rate', 'respiratory_rate'),
+    ('oxygen_saturation', 'oxygen_saturation'),
+    ('glucose', 'glucose'),
+)
+
+# Point colours by band
+COLOR_MAP = {
+    'blue': 'rgba(33, 150, 243, 0.8)',  # Emergency
+    'red': 'rgba(244, 67, 54, 0.8)',    # Doctor
+    'orange': 'rgba(255, 152, 0, 0.8)', # Nurse
+    'green': 'rgba(76, 175, 80, 0.8)',  # Normal
+}
+
+DATE_FORMAT = '%Y-%m-%d %H:%M'
+
+
+def chart_max_points():
+    """Point budget per chart series"""
+    return max(getattr(settings, 'CHART_MAX_POINTS', DEFAULT_CHART_MAX_POINTS), 2)
+
+
+def _parse_bound(value, end=False):
+    """Aware datetime for a ?start= / ?end= value, or None when invalid"""
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            # A bare end date includes that whole day
+            moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_chart_range(params, default_days=30):
+    """
+    Time window of a chart page
+
+    Args:
+        params: request.GET
+        default_days: Window when neither days nor start is given
+
+    Returns:
+        tuple: (start, end, days) - end is None for "until now"; days is None
+               for an explicit start/end range
+    """
+    start = _parse_bound(params.get('start'))
+    if start is not None:
+        end = _parse_bound(params.get('end'), end=True)
+        if end is not None and end <= start:
+            end = None
+        return start, end, None
+
+    try:
+        days = int(params.get('days', default_days))
+    except (TypeError, ValueError):
+        days = default_days
+    if days < 1:
+        days = default_days
+    days = min(days, MAX_CHART_DAYS)
+    return timezone.now() - timedelta(days=days), None, days
+
+
+def _label(moment):
+    """Chart label of a moment, in local time"""
+    return timezone.localtime(moment).strftime(DATE_FORMAT)
+
+
+def point_color(level):
+    """rgba colour for a band level (missing readings are drawn green)"""
+    return COLOR_MAP.get(COLORS[level + 1], COLOR_MAP['green'])
+
+
+def _bucket_bounds(timestamps, buckets):
+    """Row index ranges [(first, last), ...] of equal time buckets (rows sorted by time)"""
+    first, last = timestamps[0], timestamps[-1]
+    width = (last - first) / buckets
+    if not width:
+        # Every reading at the same time: fall back to equal row counts
+        size = -(-len(timestamps) // buckets)
+        return [(row, min(row + size, len(timestamps)) - 1) for row in range(0, len(timestamps), size)]
+
+    bounds = []
+    bucket_first = 0
+    current = 0
+    for row, moment in enumerate(timestamps):
+        bucket = min(int((moment - first) / width), buckets - 1)
+        if bucket != current:
+            bounds.append((bucket_first, row - 1))
+            bucket_first = row
+            current = bucket
+    bounds.append((bucket_first, len(timestamps) - 1))
+    return bounds
+
+
+def _extremes(values, first, last):
+    """Rows of the lowest and highest value in [first, last], in time order (empty if no data)"""
+    low_row = high_row = None
+    for row in range(first, last + 1):
+        value = values[row]
+        if value is None:
+            continue
+        if low_row is None or value < values[low_row]:
+            low_row = row
+        if high_row is None or value > values[high_row]:
+            high_row = row
+    if low_row is None:
+        return ()
+    return tuple(sorted({low_row, high_row}))
+
+
+def _to_floats(column):
+    """float() every reading of a column, keeping None for missing ones"""
+    return [None if value is None else float(value) for value in column]
+
+
+class ChartSeries:
+    """The readings of a chart window as columns, ready to chart"""
+
+    def __init__(self, timestamps, values, classification):
+        """
+        Args:
+            timestamps: recorded_at of each reading, ascending
+            values: dict of vital -> readings (floats or None; temperature in F)
+            classification: ColumnClassification of the readings
+        """
+        self.timestamps = timestamps
+        self.values = values
+        self.classification = classification
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def critical_count(self):
+        """Readings with at least one orange/red/blue vital"""
+        return self.classification.critical_count() if self.timestamps else 0
+
+    def colors(self, vital):
+        """Point colour of every reading for one vital"""
+        palette = [point_color(level) for level in range(-1, len(COLORS) - 1)]
+        levels = self.classification.levels[vital]
+        if np is not None and isinstance(levels, np.ndarray):
+            return np.array(palette, dtype=object)[levels + 1].tolist()
+        return [palette[level + 1] for level in levels]
+
+    def _sample(self, max_points):
+        """
+        Reading rows behind each chart point
+
+        Returns:
+            tuple: (date rows, zoom ranges or None, dict of vital -> rows)
+        """
+        count = len(self.timestamps)
+        if count <= max_points:
+            rows = list(range(count))
+            return rows, None, {vital: rows for vital in self.values}
+
+        buckets = max_points // 2
+        width = (self.timestamps[-1] - self.timestamps[0]) / buckets
+        date_rows = []
+        ranges = []
+        series_rows = {vital: [] for vital in self.values}
+
+        for first, last in _bucket_bounds(self.timestamps, buckets):
+            points = (first, last) if first != last else (first,)
+            date_rows.extend(points)
+            zoom = [
+                (self.timestamps[first] - width).isoformat(),
+                (self.timestamps[last] + width).isoformat(),
+            ]
+            ranges.extend([zoom] * len(points))
+
+            for vital, values in self.values.items():
+                extremes = _extremes(values, first, last)
+                if not extremes:
+                    series_rows[vital].extend([None] * len(points))
+                elif len(points) == 1 or len(extremes) == 1:
+                    series_rows[vital].extend([extremes[0]] * len(points))
+                else:
+                    series_rows[vital].extend(extremes)
+
+        return date_rows, ranges, series_rows
+
+    def chart_data(self, max_points=None):
+        """
+        Chart.js data: 'dates' and, per CHART_SERIES key, values and colours
+
+        Windows with more readings than max_points are downsampled with
+        min/max bucketing: each time bucket becomes two chart points,
+        labelled with the time of the bucket's first and last reading, that
+        hold per series the bucket's lowest and highest reading in the order
+        they occurred (the same reading twice when the bucket has one value
+        for that vital). A downsampled chart also has 'ranges', the
+        [start, end] ISO times to zoom into for each point.
+
+        Args:
+            max_points: Points per series (default CHART_MAX_POINTS)
+
+        Returns:
+            tuple: (chart_data dict, downsampled)
+        """
+        max_points = max_points or chart_max_points()
+        date_rows, ranges, series_rows = self._sample(max_points)
+
+        chart_data = {'dates': [_label(self.timestamps[row]) for row in date_rows]}
+        for key, vital in CHART_SERIES:
+            values = self.values[vital]
+            colors = self.colors(vital)
+            rows = series_rows[vital]
+            # Zero readings are drawn as gaps, like missing ones
+            chart_data[key] = [None if row is None else values[row] or None for row in rows]
+            chart_data[f'{key}_colors'] = [
+                colors[row] if row is not None and values[row] else COLOR_MAP['green'] for row in rows
+            ]
+
+        if ranges is not None:
+            chart_data['ranges'] = ranges
+        return chart_data, ranges is not None
+
+
+def build_chart_series(vitals, limit=None):
+    """
+    Fetch the vital columns of a chart window and classify them in bulk
+
+    Only recorded_at, the vitals and the temperature unit are fetched (no
+    model instances); Celsius temperatures are converted to Fahrenheit for
+    the whole column at once.
+
+    Args:
+        vitals: VitalSign queryset of the window
+        limit: Only fetch the first `limit` readings
+
+    Returns:
+        ChartSeries
+    """
+    vitals = vitals.order_by('recorded_at', 'vital_signs_id').values_list('recorded_at', *VITALS, 'temperature_unit')
+    rows = list(vitals[:limit] if limit is not None else vitals)
+    columns = list(zip(*rows)) or [()] * (len(VITALS) + 2)
+    timestamps = list(columns[0])
+    values = {vital: _to_floats(columns[index + 1]) for index, vital in enumerate(VITALS)}
+    values['temperature'] = [
+        (value * 9 / 5) + 32 if value is not None and unit == 'C' else value
+        for value, unit in zip(values['temperature'], columns[-1])
+    ]
+
+    return ChartSeries(timestamps, values, classify_columns(values))
+
+
+class RollupChartSeries:
+    """A chart window read from the vital rollups, with the ChartSeries interface"""
+
+    def __init__(self, periods, period):
+        """
+        Args:
+            periods: (period_start, summary) pairs from load_rollups()
+            period: 'hour' or 'day'
+        """
+        self.periods = periods
+        self.period = period
+
+    def __len__(self):
+        return sum(summary['reading_count'] for _, summary in self.periods)
+
+    def critical_count(self):
+        """Readings with at least one orange/red/blue vital"""
+        return sum(summary['critical_count'] for _, summary in self.periods)
+
+    def _buckets(self, buckets):
+        """Merge consecutive periods into at most `buckets` (start, end, summary) buckets"""
+        size = max(-(-len(self.periods) // buckets), 1)
+        length = period_length(self.period)
+        merged = []
+        for index in range(0, len(self.periods), size):
+            group = self.periods[index:index + size]
+            summary = empty_summary()
+            for _, period_summary in group:
+                merge_summaries(summary, period_summary)
+            merged.append((group[0][0], group[-1][0] + length, summary))
+        return merged
+
+    def chart_data(self, max_points=None):
+        """
+        Chart.js data with the same keys as ChartSeries.chart_data()
+
+        Each bucket of periods becomes two chart points, labelled with the
+        bucket start and its last reading, holding per series the lowest and
+        highest reading in the order they occurred.
+
+        Returns:
+            tuple: (chart_data dict, downsampled) - downsampled whenever the
+                   window has readings
+        """
+        max_points = max_points or chart_max_points()
+        chart_data = {'dates': [], 'ranges': []}
+        for key, _ in CHART_SERIES:
+            chart_data[key] = []
+            chart_data[f'{key}_colors'] = []
+
+        for start, end, summary in self._buckets(max_points // 2):
+            width = end - start
+            single = summary['reading_count'] == 1
+            labels = [start] if single else [start, summary['last_recorded_at']]
+            chart_data['dates'].extend(_label(moment) for moment in labels)
+            chart_data['ranges'].extend(
+                [[(start - width).isoformat(), (end + width).isoformat()]] * len(labels)
+            )
+
+            for key, vital in CHART_SERIES:
+                vital_stats = summary['stats'].get(vital)
+                if not vital_stats:
+                    points = [None] * len(labels)
+                elif single:
+                    points = [vital_stats['last']]
+                elif vital_stats['min_at'] <= vital_stats['max_at']:
+                    points = [vital_stats['min'], vital_stats['max']]
+                else:
+                    points = [vital_stats['max'], vital_stats['min']]
+
+                for value in points:
+                    # Zero readings are drawn as gaps, like missing ones
+                    chart_data[key].append(value or None)
+                    chart_data[f'{key}_colors'].append(
+                        point_color(level_for(vital, value)) if value else COLOR_MAP['green']
+                    )
+
+        return chart_data, bool(self.periods)
+
+
+def load_chart_series(patient, start, end=None):
+    """
+    Chart series of a patient's window: rollups for long windows, raw readings otherwise
+
+    Args:
+        patient: Patient
+        start: Window start
+        end: Window end (default: now)
+
+    Returns:
+        ChartSeries or RollupChartSeries
+    """
+    span = (end or timezone.now()) - start
+    if span >= timedelta(days=getattr(settings, 'CHART_ROLLUP_MIN_DAYS', 3)):
+        hourly = span <= timedelta(days=getattr(settings, 'CHART_HOURLY_ROLLUP_MAX_DAYS', 31))
+        period = 'hour' if hourly else 'day'
+        return RollupChartSeries(load_rollups(patient.pk, start, end, period), period)
+
+    vitals = VitalSign.objects.filter(encounter__patient=patient, recorded_at__gte=start)
+    if end is not None:
+        vitals = vitals.filter(recorded_at__lt=end)
+    return build_chart_series(vitals)
@@ -0,0 +1,272 @@
+"""
+Vital Sign Classification Engine
+
+Single source of truth for the colour-coded vital sign bands used by alerts,
+charts and reports:
+
+    blue   - Emergency (level 3)
+    red    - Doctor    (level 2)
+    orange - Nurse     (level 1)
+    green  - Normal    (level 0)
+    none   - No data   (level -1)
+
+VitalSign.get_*_status() classify one reading through classify_value();
+classify_columns() classifies whole columns of readings in one pass, using
+NumPy when it is installed and a plain loop over the same band table when it
+is not. Every path compares float(value) against the same cutoffs, so they
+return identical results.
+"""
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+VITALS = (
+    'heart_rate',
+    'blood_pressure_systolic',
+    'blood_pressure_diastolic',
+    'temperature',
+    'respiratory_rate',
+    'oxygen_saturation',
+    'glucose',
+)
+
+# lows: (blue, red, orange) - a value strictly below a cutoff is at least that level
+# highs: (orange, red, blue) - a value strictly above a cutoff is at least that level
+# Temperature bands are in Fahrenheit; Celsius readings are converted first.
+Band = namedtuple('Band', ['lows', 'highs'])
+
+VITAL_BANDS = {
+    'heart_rate': Band(lows=(40, 50, 60), highs=(100, 130, 150)),
+    'blood_pressure_systolic': Band(lows=(70, 80, 90), highs=(140, 160, 180)),
+    'blood_pressure_diastolic': Band(lows=(40, 50, 60), highs=(90, 100, 110)),
+    'temperature': Band(lows=(94.0, 95.0, 97.0), highs=(100.4, 101.5, 103.0)),
+    'respiratory_rate': Band(lows=(8, 10, 12), highs=(20, 25, 30)),
+    'oxygen_saturation': Band(lows=(90, 92, 95), highs=()),
+    'glucose': Band(lows=(50, 60, 70), highs=(180, 250, 300)),
+}
+
+NO_DATA = -1
+COLORS = ('none', 'green', 'orange', 'red', 'blue')             # indexed by level + 1
+CONTACT_LEVELS = ('No Data', 'Normal', 'Nurse', 'Doctor', 'Emergency')
+ALERT_COLORS = ('blue', 'red', 'orange')
+
+
+def _to_float(value):
+    """float() for a reading, or None when missing"""
+    if value is None or value == '':
+        return None
+    value = float(value)
+    return None if value != value else value  # NaN counts as missing
+
+
+def _fahrenheit(value, unit):
+    """Convert a Celsius reading to Fahrenheit"""
+    if unit == 'C':
+        return (value * 9 / 5) + 32
+    return value
+
+
+def level_for(vital, value):
+    """
+    Band level for one float value
+
+    Args:
+        vital: Key of VITAL_BANDS
+        value: float, or None when missing
+
+    Returns:
+        int: -1 (no data) to 3 (emergency)
+    """
+    if value is None:
+        return NO_DATA
+    band = VITAL_BANDS[vital]
+    low = sum(1 for cutoff in band.lows if value < cutoff)
+    high = sum(1 for cutoff in band.highs if value > cutoff)
+    return max(low, high)
+
+
+def classify_value(vital, value, unit='F'):
+    """
+    Classify a single reading
+
+    Args:
+        vital: Key of VITAL_BANDS
+        value: Reading (int, float, Decimal or None)
+        unit: Temperature unit ('F' or 'C'); ignored for other vitals
+
+    Returns:
+        tuple: (color, contact_level)
+    """
+    value = _to_float(value)
+    if vital == 'temperature' and value is not None:
+        value = _fahrenheit(value, unit)
+    level = level_for(vital, value)
+    return COLORS[level + 1], CONTACT_LEVELS[level + 1]
+
+
+def _levels_python(vital, values, units):
+    levels = []
+    for index, value in enumerate(values):
+        value = _to_float(value)
+        if vital == 'temperature' and value is not None and units is not None:
+            value = _fahrenheit(value, units[index])
+        levels.append(level_for(vital, value))
+    return levels
+
+
+def _levels_numpy(vital, values, units):
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'fiu':
+        array = values.astype(float)
+    else:
+        array = np.array([np.nan if v is None or v == '' else float(v) for v in values], dtype=float)
+
+    if vital == 'temperature' and units is not None:
+        celsius = np.asarray(units) == 'C'
+        array = np.where(celsius, (array * 9 / 5) + 32, array)
+
+    band = VITAL_BANDS[vital]
+    low = np.zeros(array.shape, dtype=np.int8)
+    for cutoff in band.lows:
+        low += array < cutoff
+    high = np.zeros(array.shape, dtype=np.int8)
+    for cutoff in band.highs:
+        high += array > cutoff
+
+    levels = np.maximum(low, high)
+    levels[np.isnan(array)] = NO_DATA
+    return levels
+
+
+def classify_levels(vital, values, units=None, use_numpy=True):
+    """
+    Band levels for a column of readings
+
+    Args:
+        vital: Key of VITAL_BANDS
+        values: Sequence or NumPy array of readings (None/NaN for missing)
+        units: Temperature units per reading (temperature only; default 'F')
+        use_numpy: Use NumPy when available
+
+    Returns:
+        NumPy int8 array, or list of ints without NumPy
+    """
+    if use_numpy and np is not None:
+        return _levels_numpy(vital, values, units)
+    return _levels_python(vital, values, units)
+
+
+class ColumnClassification:
+    """Levels for each vital over a set of readings, with colour/contact lookups"""
+
+    def __init__(self, levels):
+        self.levels = levels  # vital -> array/list of levels
+
+    def colors(self, vital):
+        """Colour names for one vital, as a list"""
+        return [COLORS[level + 1] for level in _as_list(self.levels[vital])]
+
+    def contact_levels(self, vital):
+        """Contact levels for one vital, as a list"""
+        return [CONTACT_LEVELS[level + 1] for level in _as_list(self.levels[vital])]
+
+    def max_levels(self):
+        """Highest level across all vitals for each reading"""
+        columns = list(self.levels.values())
+        if not columns:
+            return []
+        if np is not None and isinstance(columns[0], np.ndarray):
+            return np.max(np.vstack(columns), axis=0)
+        return [max(row) for row in zip(*columns)]
+
+    def critical_mask(self):
+        """True for readings with any vital at orange or above (has_critical_values)"""
+        return [level >= 1 for level in _as_list(self.max_levels())]
+
+    def critical_count(self):
+        """Number of readings with at least one orange/red/blue vital"""
+        max_levels = self.max_levels()
+        if np is not None and isinstance(max_levels, np.ndarray):
+            return int((max_levels >= 1).sum())
+        return sum(1 for level in max_levels if level >= 1)
+
+
+def _as_list(levels):
+    if np is not None and isinstance(levels, np.ndarray):
+        return levels.tolist()
+    return levels
+
+
+def classify_columns(columns, temperature_units=None, use_numpy=True):
+    """
+    Classify all vitals for a set of readings in one pass
+
+    Args:
+        columns: dict of vital name (see VITALS) -> sequence of readings;
+                 vitals that are not present are skipped
+        temperature_units: Sequence of 'F'/'C' per reading (default all 'F')
+        use_numpy: Use NumPy when available
+
+    Returns:
+        ColumnClassification
+    """
+    levels = {}
+    for vital in VITALS:
+        if vital in columns:
+            units = temperature_units if vital == 'temperature' else None
+            levels[vital] = classify_levels(vital, columns[vital], units, use_numpy=use_numpy)
+    return ColumnClassification(levels)
+
+
+def classify_vital_sign(vital_sign):
+    """
+    Classify every vital of one VitalSign
+
+    Returns:
+        dict: vital name -> (color, contact_level)
+    """
+    columns, units = columns_from_vitals([vital_sign])
+    classification = classify_columns(columns, units, use_numpy=False)
+    return {
+        vital: (classification.colors(vital)[0], classification.contact_levels(vital)[0])
+        for vital in VITALS
+    }
+
+
+def columns_from_vitals(vitals, temperature_attr='temperature'):
+    """
+    Build classifier columns from VitalSign objects
+
+    Args:
+        vitals: Iterable of VitalSign objects
+        temperature_attr: Attribute holding the numeric temperature
+
+    Returns:
+        tuple: (columns dict, temperature units list)
+    """
+    columns = {vital: [] for vital in VITALS}
+    units = []
+    for vital_sign in vitals:
+        for vital in VITALS:
+            attr = temperature_attr if vital == 'temperature' else vital
+            columns[vital].append(getattr(vital_sign, attr, None))
+        units.append(vital_sign.temperature_unit)
+    return columns, units
+
+
+def columns_from_queryset(queryset):
+    """
+    Build classifier columns straight from a VitalSign queryset
+
+    Only the vital columns are fetched, so counting critical readings over a
+    long history does not instantiate model objects.
+
+    Returns:
+        tuple: (columns dict, temperature units list)
+    """
+    rows = list(queryset.order_by().values_list(*VITALS, 'temperature_unit'))
+    columns = {vital: [row[index] for row in rows] for index, vital in enumerate(VITALS)}
+    units = [row[-1] for row in rows]
+    return columns, units
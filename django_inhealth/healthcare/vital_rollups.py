@@ -0,0 +1,409 @@
+"""
+Vital Sign Rollups
+
+Per-patient summaries of the vital signs of each hour (vital_rollups_hourly)
+and each day (vital_rollups_daily), so long-range charts and trends read one
+row per period instead of every reading. Each rollup holds, per vital, the
+count, sum (for the mean), min, max and last value with when they were
+recorded, and how many readings were orange or above; temperature is in
+Fahrenheit. Periods follow the local time zone (TIME_ZONE).
+
+update_vital_rollups() folds new readings in incrementally: it reads
+vital_signs in vital_signs_id order from a high-water mark kept in
+vital_rollup_checkpoints, merges them into the rollups and advances the mark,
+all in one transaction per batch. Run it every minute from cron with the
+update_vital_rollups command. Readings recorded in the last
+VITAL_ROLLUP_SETTLE_SECONDS are left for the next run, so a reading whose
+transaction commits after one with a higher vital_signs_id is not skipped.
+
+load_rollups() returns the rollups of a window plus the readings that are not
+rolled up yet, so charts stay current between runs. Edited readings refresh
+their hour and day (see signals.py); after deleting readings or changing
+the time zone, rebuild with update_vital_rollups --rebuild.
+
+Settings:
+    VITAL_ROLLUP_BATCH_SIZE: Readings folded per transaction (default 5000)
+    VITAL_ROLLUP_SETTLE_SECONDS: Age before a reading is rolled up (default 60)
+"""
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import DailyVitalRollup, HourlyVitalRollup, VitalRollupCheckpoint, VitalSign
+from .vital_classifier import VITALS, classify_columns
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_MODELS = {
+    'hour': HourlyVitalRollup,
+    'day': DailyVitalRollup,
+}
+
+CHECKPOINT_NAME = 'vital_rollups'
+
+# Columns read from vital_signs, in this order
+READING_FIELDS = ('vital_signs_id', 'encounter__patient_id', 'recorded_at', *VITALS, 'temperature_unit')
+
+
+def period_start(moment, period):
+    """Start of the local hour or day containing moment"""
+    local = timezone.localtime(moment)
+    if period == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def period_length(period):
+    return timedelta(hours=1) if period == 'hour' else timedelta(days=1)
+
+
+def _iso(moment):
+    """UTC ISO timestamp (sorts like the moment it represents)"""
+    return moment.astimezone(dt_timezone.utc).isoformat()
+
+
+def empty_summary():
+    return {'reading_count': 0, 'critical_count': 0, 'last_recorded_at': None, 'stats': {}}
+
+
+def merge_vital_stats(into, other):
+    """Combine the stats of one vital over two sets of readings (into is updated)"""
+    into['count'] += other['count']
+    into['sum'] += other['sum']
+    into['critical'] += other['critical']
+    if other['min'] < into['min'] or (other['min'] == into['min'] and other['min_at'] < into['min_at']):
+        into['min'], into['min_at'] = other['min'], other['min_at']
+    if other['max'] > into['max'] or (other['max'] == into['max'] and other['max_at'] < into['max_at']):
+        into['max'], into['max_at'] = other['max'], other['max_at']
+    if other['last_at'] > into['last_at']:
+        into['last'], into['last_at'] = other['last'], other['last_at']
+    return into
+
+
+def merge_summaries(into, other):
+    """Combine two period summaries (into is updated)"""
+    into['reading_count'] += other['reading_count']
+    into['critical_count'] += other['critical_count']
+    if other['last_recorded_at'] and (not into['last_recorded_at'] or other['last_recorded_at'] > into['last_recorded_at']):
+        into['last_recorded_at'] = other['last_recorded_at']
+    for vital, vital_stats in other['stats'].items():
+        if vital in into['stats']:
+            merge_vital_stats(into['stats'][vital], vital_stats)
+        else:
+            into['stats'][vital] = dict(vital_stats)
+    return into
+
+
+def summarize_readings(rows):
+    """
+    Summarize readings per patient and period
+
+    Args:
+        rows: vital_signs rows with READING_FIELDS
+
+    Returns:
+        dict: period ('hour'/'day') -> {(patient_id, period_start): summary}
+    """
+    summaries = {period: {} for period in ROLLUP_MODELS}
+    if not rows:
+        return summaries
+
+    columns = list(zip(*rows))
+    values = {
+        vital: [None if value is None else float(value) for value in columns[index + 3]]
+        for index, vital in enumerate(VITALS)
+    }
+    values['temperature'] = [
+        (value * 9 / 5) + 32 if value is not None and unit == 'C' else value
+        for value, unit in zip(values['temperature'], columns[-1])
+    ]
+    classification = classify_columns(values)
+    levels = {vital: classification.levels[vital] for vital in VITALS}
+    critical = classification.critical_mask()
+
+    for row_index, row in enumerate(rows):
+        patient_id, recorded_at = row[1], row[2]
+        at = _iso(recorded_at)
+        reading = empty_summary()
+        reading['reading_count'] = 1
+        reading['critical_count'] = int(critical[row_index])
+        reading['last_recorded_at'] = recorded_at
+        for vital in VITALS:
+            value = values[vital][row_index]
+            if value is None:
+                continue
+            reading['stats'][vital] = {
+                'count': 1, 'sum': value, 'critical': int(levels[vital][row_index] >= 1),
+                'min': value, 'min_at': at, 'max': value, 'max_at': at, 'last': value, 'last_at': at,
+            }
+
+        for period, period_summaries in summaries.items():
+            key = (patient_id, period_start(recorded_at, period))
+            if key in period_summaries:
+                merge_summaries(period_summaries[key], reading)
+            else:
+                period_summaries[key] = merge_summaries(empty_summary(), reading)
+
+    return summaries
+
+
+def _summary_from_rollup(rollup):
+    return {
+        'reading_count': rollup['reading_count'],
+        'critical_count': rollup['critical_count'],
+        'last_recorded_at': rollup['last_recorded_at'],
+        'stats': rollup['stats'],
+    }
+
+
+def save_summaries(summaries):
+    """
+    Merge period summaries into the rollup tables
+
+    Args:
+        summaries: Result of summarize_readings()
+    """
+    now = timezone.now()
+    for period, period_summaries in summaries.items():
+        if not period_summaries:
+            continue
+        model = ROLLUP_MODELS[period]
+        existing = {
+            (rollup.patient_id, rollup.period_start): rollup
+            for rollup in model.objects.filter(
+                patient_id__in={patient_id for patient_id, _ in period_summaries},
+                period_start__in={start for _, start in period_summaries}
+            )
+        }
+
+        created = []
+        updated = []
+        for (patient_id, start), summary in period_summaries.items():
+            rollup = existing.get((patient_id, start))
+            if rollup is None:
+                created.append(model(
+                    patient_id=patient_id,
+                    period_start=start,
+                    reading_count=summary['reading_count'],
+                    critical_count=summary['critical_count'],
+                    stats=summary['stats'],
+                    last_recorded_at=summary['last_recorded_at']
+                ))
+                continue
+
+            merged = merge_summaries(_summary_from_rollup(vars(rollup)), summary)
+            rollup.reading_count = merged['reading_count']
+            rollup.critical_count = merged['critical_count']
+            rollup.stats = merged['stats']
+            rollup.last_recorded_at = merged['last_recorded_at']
+            rollup.updated_at = now
+            updated.append(rollup)
+
+        model.objects.bulk_create(created)
+        model.objects.bulk_update(
+            updated, ['reading_count', 'critical_count', 'stats', 'last_recorded_at', 'updated_at']
+        )
+
+
+def _lock_checkpoint():
+    """The rollup checkpoint row, locked until the end of the transaction"""
+    checkpoint, _ = VitalRollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+    return checkpoint
+
+
+def rolled_up_through():
+    """Highest vital_signs_id already folded into the rollups"""
+    return VitalRollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).values_list(
+        'last_vital_signs_id', flat=True
+    ).first() or 0
+
+
+def update_vital_rollups(batch_size=None, max_batches=None):
+    """
+    Fold readings past the high-water mark into the rollups
+
+    Args:
+        batch_size: Readings per transaction (default VITAL_ROLLUP_BATCH_SIZE)
+        max_batches: Stop after this many batches (default: until caught up)
+
+    Returns:
+        int: Readings folded in
+    """
+    batch_size = batch_size or getattr(settings, 'VITAL_ROLLUP_BATCH_SIZE', 5000)
+    settle = timedelta(seconds=getattr(settings, 'VITAL_ROLLUP_SETTLE_SECONDS', 60))
+
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            checkpoint = _lock_checkpoint()
+            rows = list(
+                VitalSign.objects.filter(vital_signs_id__gt=checkpoint.last_vital_signs_id)
+                .order_by('vital_signs_id')
+                .values_list(*READING_FIELDS)[:batch_size]
+            )
+
+            # Stop at the first reading that is too recent: lower ids may still be uncommitted
+            cutoff = timezone.now() - settle
+            settled = next((index for index, row in enumerate(rows) if row[2] >= cutoff), len(rows))
+            fetched = len(rows)
+            rows = rows[:settled]
+            if not rows:
+                break
+
+            save_summaries(summarize_readings(rows))
+            checkpoint.last_vital_signs_id = rows[-1][0]
+            checkpoint.save(update_fields=['last_vital_signs_id', 'updated_at'])
+
+        processed += len(rows)
+        batches += 1
+        if len(rows) < fetched or fetched < batch_size:
+            break
+
+    if processed:
+        logger.info(f"Folded {processed} vital signs into the rollups")
+    return processed
+
+
+def _recompute(patient_ids, start=None, end=None, batch_size=None):
+    """
+    Rebuild the rollups of some patients from their rolled-up readings
+
+    Runs inside the caller's transaction, with the checkpoint locked.
+    """
+    batch_size = batch_size or getattr(settings, 'VITAL_ROLLUP_BATCH_SIZE', 5000)
+    through = _lock_checkpoint().last_vital_signs_id
+
+    for model in ROLLUP_MODELS.values():
+        rollups = model.objects.filter(patient_id__in=patient_ids)
+        if start is not None:
+            rollups = rollups.filter(period_start__gte=start, period_start__lt=end)
+        rollups.delete()
+
+    readings = VitalSign.objects.filter(encounter__patient_id__in=patient_ids, vital_signs_id__lte=through)
+    if start is not None:
+        readings = readings.filter(recorded_at__gte=start, recorded_at__lt=end)
+
+    last_id = 0
+    while True:
+        rows = list(
+            readings.filter(vital_signs_id__gt=last_id).order_by('vital_signs_id').values_list(*READING_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return
+        save_summaries(summarize_readings(rows))
+        last_id = rows[-1][0]
+
+
+def rebuild_vital_rollups(patient_ids=None, batch_size=None):
+    """
+    Rebuild the rollups from scratch
+
+    Args:
+        patient_ids: Only rebuild these patients (default: everything, from
+            vital_signs_id 0)
+        batch_size: Readings per batch
+
+    Returns:
+        int: Readings folded in (all patients only)
+    """
+    if patient_ids:
+        with transaction.atomic():
+            _recompute(list(patient_ids), batch_size=batch_size)
+        return 0
+
+    with transaction.atomic():
+        checkpoint = _lock_checkpoint()
+        for model in ROLLUP_MODELS.values():
+            model.objects.all().delete()
+        checkpoint.last_vital_signs_id = 0
+        checkpoint.save(update_fields=['last_vital_signs_id', 'updated_at'])
+    return update_vital_rollups(batch_size=batch_size)
+
+
+def refresh_vital_rollups(vital_sign):
+    """Recompute the hour and day of an edited reading that is already rolled up"""
+    if vital_sign.vital_signs_id > rolled_up_through():
+        return
+    start = period_start(vital_sign.recorded_at, 'day')
+    with transaction.atomic():
+        _recompute([vital_sign.encounter.patient_id], start, start + period_length('day'))
+
+
+def load_rollups(patient_id, start, end=None, period='hour'):
+    """
+    Summaries of one patient's periods overlapping [start, end)
+
+    Readings not rolled up yet are summarized on the fly and merged in.
+
+    Args:
+        patient_id: Patient
+        start: Window start (widened to the start of its period)
+        end: Window end (default: now)
+        period: 'hour' or 'day'
+
+    Returns:
+        list: (period_start, summary) pairs in time order
+    """
+    first = period_start(start, period)
+    rollups = ROLLUP_MODELS[period].objects.filter(patient_id=patient_id, period_start__gte=first)
+    readings = VitalSign.objects.filter(
+        encounter__patient_id=patient_id,
+        vital_signs_id__gt=rolled_up_through(),
+        recorded_at__gte=first
+    )
+    if end is not None:
+        rollups = rollups.filter(period_start__lt=end)
+        readings = readings.filter(recorded_at__lt=end)
+
+    summaries = {
+        rollup['period_start']: _summary_from_rollup(rollup)
+        for rollup in rollups.values('period_start', 'reading_count', 'critical_count', 'last_recorded_at', 'stats')
+    }
+    pending = summarize_readings(list(readings.values_list(*READING_FIELDS)))[period]
+    for (_, start_of_period), summary in pending.items():
+        if start_of_period in summaries:
+            merge_summaries(summaries[start_of_period], summary)
+        else:
+            summaries[start_of_period] = summary
+
+    return sorted(summaries.items(), key=lambda item: item[0])
+
+
+def vital_totals(patient_ids):
+    """
+    Reading, critical reading and patient counts over all of some patients' vital signs
+
+    Sums the daily rollups plus the readings not rolled up yet, instead of
+    counting and classifying every reading.
+
+    Args:
+        patient_ids: Patients (ids or a values_list queryset)
+
+    Returns:
+        dict: reading_count, critical_count and patient_count
+    """
+    per_patient = {
+        row['patient_id']: [row['reading_count'], row['critical_count']]
+        for row in DailyVitalRollup.objects.filter(patient_id__in=patient_ids).values('patient_id').annotate(
+            reading_count=Sum('reading_count'), critical_count=Sum('critical_count')
+        )
+    }
+    pending = VitalSign.objects.filter(
+        encounter__patient_id__in=patient_ids,
+        vital_signs_id__gt=rolled_up_through()
+    )
+    for (patient_id, _), summary in summarize_readings(list(pending.values_list(*READING_FIELDS)))['day'].items():
+        totals = per_patient.setdefault(patient_id, [0, 0])
+        totals[0] += summary['reading_count']
+        totals[1] += summary['critical_count']
+
+    return {
+        'reading_count': sum(totals[0] for totals in per_patient.values()),
+        'critical_count': sum(totals[1] for totals in per_patient.values()),
+        'patient_count': sum(1 for totals in per_patient.values() if totals[0]),
+    }
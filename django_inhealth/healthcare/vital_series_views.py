@@ -0,0 +1,151 @@
+"""
+Vital Sign Series API
+JSON chart series of a patient's vital signs, so open chart pages (e.g. on
+ward monitors) can poll for new readings instead of reloading the page:
+
+    GET vitals/series/<patient_id>/?days=30          whole window, same data as the chart page
+    GET vitals/series/<patient_id>/?since=<cursor>   only readings recorded after the cursor
+
+Every response carries the cursor of the patient's latest reading and an
+ETag / Last-Modified derived from that reading's (recorded_at,
+vital_signs_id), so a poll with If-None-Match or If-Modified-Since gets
+304 Not Modified until something new is recorded. Edits of existing readings
+do not change the validators.
+
+Settings:
+    CHART_POLL_SECONDS: How often chart pages with a relative window poll
+        for new readings (default 15, 0 disables polling)
+"""
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+
+from .cursors import decode_cursor, encode_cursor
+from .models import Patient, VitalSign
+from .permissions import can_view_vital_charts
+from .vital_charts import build_chart_series, chart_max_points, load_chart_series, parse_chart_range
+
+
+def latest_reading(patient_id):
+    """(recorded_at, vital_signs_id) of a patient's newest reading, or None"""
+    return VitalSign.objects.filter(
+        encounter__patient_id=patient_id
+    ).order_by('-recorded_at', '-vital_signs_id').values_list('recorded_at', 'vital_signs_id').first()
+
+
+def chart_poll_seconds():
+    """Seconds between chart page polls for new readings (0: no polling)"""
+    return getattr(settings, 'CHART_POLL_SECONDS', 15)
+
+
+def reading_cursor(recorded_at, vital_signs_id):
+    """Cursor for ?since= pointing after one reading"""
+    return encode_cursor(recorded_at, vital_signs_id)
+
+
+def _series_etag(patient_id, latest, query):
+    position = f"{latest[0].isoformat()}:{latest[1]}" if latest else 'none'
+    digest = hashlib.sha1(f"{patient_id}|{position}|{query}".encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def _window_series(request, patient):
+    """Series of the ?days= / ?start=&end= window"""
+    start, end, _ = parse_chart_range(request.GET)
+    series = load_chart_series(patient, start, end)
+    chart_data, downsampled = series.chart_data()
+    return {
+        'reset': True,
+        'downsampled': downsampled,
+        'reading_count': len(series),
+        'critical_readings': series.critical_count(),
+        'chart': chart_data,
+    }
+
+
+def _readings_since(request, patient, since, latest):
+    """
+    Readings after the since cursor, up to the latest reading
+
+    Falls back to the whole window (reset) when more readings arrived than a
+    chart series holds.
+    """
+    recorded_at, vital_signs_id = since
+    readings = VitalSign.objects.filter(encounter__patient=patient).filter(
+        Q(recorded_at__gt=recorded_at) | Q(recorded_at=recorded_at, vital_signs_id__gt=vital_signs_id)
+    )
+    if latest is not None:
+        readings = readings.filter(
+            Q(recorded_at__lt=latest[0]) | Q(recorded_at=latest[0], vital_signs_id__lte=latest[1])
+        )
+
+    max_points = chart_max_points()
+    series = build_chart_series(readings, limit=max_points + 1)
+    if len(series) > max_points:
+        return _window_series(request, patient)
+
+    chart_data, _ = series.chart_data(max_points)
+    return {
+        'reset': False,
+        'downsampled': False,
+        'reading_count': len(series),
+        'critical_readings': series.critical_count(),
+        'chart': chart_data,
+    }
+
+
+@login_required
+@require_GET
+def patient_vitals_series(request, patient_id):
+    """
+    Chart series of a patient's vital signs as JSON
+
+    Query parameters:
+        days / start / end: Window, as on the chart pages (default 30 days)
+        since: Cursor from a previous response; only newer readings are
+            returned (reset is true when the whole window was returned
+            instead)
+
+    Returns:
+        JsonResponse: patient_id, cursor, reset, downsampled, reading_count,
+        critical_readings and chart (the chart page's chartData); 304 when
+        the validators match
+    """
+    patient = get_object_or_404(Patient.objects.select_related('primary_doctor'), patient_id=patient_id)
+    if not can_view_vital_charts(request.user, patient):
+        return JsonResponse({'error': 'You do not have access to this patient.'}, status=403)
+
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = decode_cursor(request.GET['since'], (datetime, int))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid since cursor.'}, status=400)
+
+    latest = latest_reading(patient.pk)
+    etag = _series_etag(patient.pk, latest, request.GET.urlencode())
+    last_modified = int(latest[0].timestamp()) if latest else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if since is not None:
+            data = _readings_since(request, patient, since, latest)
+        else:
+            data = _window_series(request, patient)
+        data['patient_id'] = patient.pk
+        data['cursor'] = reading_cursor(*latest) if latest else None
+        response = JsonResponse(data)
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -6,14 +6,21 @@ Submit vital signs data from IoT devices to InHealth EHR via REST API
 
 Requirements:
     pip install requests
+    pip install msgpack   # optional, for --format msgpack
+    pip install cbor2     # optional, for --format cbor
 
 Configuration:
     Set your API credentials in the script or use environment variables:
     export INHEALTH_API_KEY="your-api-key-here"
     export INHEALTH_API_URL="https://inhealth.eminencetechsolutions.com:8899"
+
+Bandwidth (for metered cellular links):
+    export INHEALTH_PAYLOAD_FORMAT="msgpack"   # json (default), msgpack or cbor
+    export INHEALTH_GZIP="1"                   # gzip-compress request bodies
 """
 
 import requests
+import gzip
 import json
 import sys
 import os
@@ -28,27 +35,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+PAYLOAD_CONTENT_TYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+    'cbor': 'application/cbor',
+}
+
 
 class InHealthIoTClient:
     """Client for submitting IoT vital signs data to InHealth EHR"""
 
-    def __init__(self, api_url, api_key):
+    def __init__(self, api_url, api_key, payload_format='json', compress=False):
         """
         Initialize the IoT client
 
         Args:
             api_url: Base URL of InHealth EHR (e.g., https://inhealth.example.com:8899)
             api_key: API key from InHealth EHR system admin
+            payload_format: Body encoding: 'json', 'msgpack' or 'cbor'
+            compress: gzip-compress request bodies (Content-Encoding: gzip)
         """
+        if payload_format not in PAYLOAD_CONTENT_TYPES:
+            raise ValueError(f"Unknown payload format: {payload_format}")
+
         self.api_url = api_url.rstrip('/')
         self.api_key = api_key
+        self.payload_format = payload_format
+        self.compress = compress
         self.session = requests.Session()
         self.session.headers.update({
             'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json',
+            'Content-Type': PAYLOAD_CONTENT_TYPES[payload_format],
             'User-Agent': 'InHealth-IoT-Client/1.0'
         })
 
+    def encode_payload(self, payload):
+        """
+        Serialize a payload in the configured format
+
+        Args:
+            payload: dict to send
+
+        Returns:
+            bytes: Request body
+        """
+        if self.payload_format == 'msgpack':
+            import msgpack
+            body = msgpack.packb(payload, use_bin_type=True)
+        elif self.payload_format == 'cbor':
+            import cbor2
+            body = cbor2.dumps(payload)
+        else:
+            body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+        if self.compress:
+            body = gzip.compress(body)
+
+        return body
+
     def submit_vitals(self, device_id, vitals_data, max_retries=3):
         """
         Submit vital signs data to InHealth EHR
@@ -85,6 +129,7 @@ class InHealthIoTClient:
         }
 
         endpoint = f"{self.api_url}/api/iot/vitals/"
+        body = self.encode_payload(payload)
 
         # Retry logic with exponential backoff
         for attempt in range(max_retries):
@@ -93,7 +138,8 @@ class InHealthIoTClient:
 
                 response = self.session.post(
                     endpoint,
-                    json=payload,
+                    data=body,
+                    headers={'Content-Encoding': 'gzip'} if self.compress else None,
                     timeout=30,
                     verify=True  # Set to False if using self-signed SSL cert
                 )
@@ -103,8 +149,8 @@ class InHealthIoTClient:
                     result = response.json()
                     if result.get('success'):
                         logger.info(f"✓ Success: {result.get('message', 'Data submitted')}")
-                        if result.get('alerts_triggered'):
-                            logger.warning(f"⚠ {result['alerts_triggered']} critical alert(s) triggered!")
+                        if result.get('alerts_queued'):
+                            logger.debug(f"Alert evaluation queued for {result['alerts_queued']} reading(s)")
                         return result
                     else:
                         logger.error(f"✗ API returned error: {result.get('error', 'Unknown error')}")
@@ -114,7 +160,7 @@ class InHealthIoTClient:
                     logger.error("✗ Authentication failed - check your API key")
                     return None  # Don't retry auth failures
 
-                elif response.status_code == 400:
+                elif response.status_code in (400, 413, 415):
                     logger.error(f"✗ Bad request: {response.text}")
                     return None  # Don't retry bad requests
 
@@ -190,6 +236,8 @@ def main():
     API_URL = os.getenv('INHEALTH_API_URL', 'https://inhealth.eminencetechsolutions.com:8899')
     API_KEY = os.getenv('INHEALTH_API_KEY', '')
     DEVICE_ID = os.getenv('INHEALTH_DEVICE_ID', 'DEV001')
+    PAYLOAD_FORMAT = os.getenv('INHEALTH_PAYLOAD_FORMAT', 'json')
+    COMPRESS = os.getenv('INHEALTH_GZIP', '') in ('1', 'true', 'yes')
 
     if not API_KEY:
         logger.error("ERROR: INHEALTH_API_KEY environment variable not set!")
@@ -197,7 +245,7 @@ def main():
         sys.exit(1)
 
     # Initialize client
-    client = InHealthIoTClient(API_URL, API_KEY)
+    client = InHealthIoTClient(API_URL, API_KEY, payload_format=PAYLOAD_FORMAT, compress=COMPRESS)
 
     # Check API status (optional)
     logger.info("Checking API connectivity...")